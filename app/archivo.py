@@ -0,0 +1,276 @@
+# app/archivo.py
+"""
+Archivo de ventas viejas (y sus devoluciones) en segmentos comprimidos de
+solo anexar, para que el historial no crezca sin límite en memoria.
+
+Cada corrida de archivado escribe un segmento nuevo, `seg-000001.arch`, ...:
+
+    b"SRVTARCH" | bloques zlib... | ids | índice JSON | u64 offset índice | u32 largo | b"SRVTARCH"
+
+Los registros van en bloques de `por_bloque` (JSON compacto + zlib). En
+memoria solo quedan, por segmento, los ids archivados (array de 8 bytes por
+registro), el índice ralo de bloques (primer id, offset, largo) y un resumen
+(cantidad, fechas, total). Leer un registro descomprime su bloque (que queda
+parseado en una cache LRU chica) y arma solo ese registro.
+
+El archivo se escribe primero como .tmp y se renombra: un segmento a medio
+escribir nunca queda visible.
+"""
+import heapq
+import json
+import mmap
+import os
+import sys
+import threading
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .models import Venta, VentaDetalle, Devolucion, DevolucionDetalle
+
+MAGIC = b"SRVTARCH"
+VERSION = 1
+
+_EPOCH = datetime(1970, 1, 1)
+_US = timedelta(microseconds=1)
+_TABLAS = ("ventas", "devoluciones")
+
+
+class ArchivoInvalido(Exception):
+    """Segmento dañado o de otra versión/arquitectura."""
+    pass
+
+
+def _us(fecha: datetime) -> int:
+    return (fecha - _EPOCH) // _US
+
+def _fecha(us: int) -> datetime:
+    return _EPOCH + timedelta(microseconds=us)
+
+def _centavos(valor: Decimal) -> int:
+    return int(valor * 100)
+
+def _dinero(centavos: int) -> Decimal:
+    return Decimal(centavos).scaleb(-2)
+
+
+# ==========================
+# Codificación de registros
+# ==========================
+def _det(d) -> list:
+    return [d.llanta_id, d.cantidad, _centavos(d.precio_unitario), _centavos(d.subtotal)]
+
+def _codificar(tabla: str, o) -> list:
+    if tabla == "ventas":
+        return [o.id, o.cliente_id, o.asesor_id, o.sede_id, _us(o.fecha), _centavos(o.total),
+                [_det(d) for d in getattr(o, "_detalles", [])]]
+    return [o.id, o.venta_id, _us(o.fecha), o.motivo, [_det(d) for d in o.detalles]]
+
+def _decodificar(tabla: str, fila: list):
+    if tabla == "ventas":
+        i, cli, ase, sede, f, tot, dets = fila
+        v = Venta(i, cli, ase, _fecha(f), _dinero(tot), sede)
+        v._detalles = [VentaDetalle(ll, c, _dinero(p), _dinero(s)) for ll, c, p, s in dets]
+        return v
+    i, venta_id, f, motivo, dets = fila
+    return Devolucion(i, venta_id, _fecha(f), motivo, [DevolucionDetalle(ll, c, _dinero(p), _dinero(s))
+                                                       for ll, c, p, s in dets])
+
+
+# ==========================
+# Segmento
+# ==========================
+class Segmento:
+    """Un archivo .arch abierto con mmap: ids e índice ralo en memoria, bloques en disco."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        m = len(MAGIC)
+        if len(self._mm) < 2 * m + 12 or self._mm[:m] != MAGIC or self._mm[-m:] != MAGIC:
+            self._mm.close()
+            raise ArchivoInvalido(f"{path} no es un segmento de archivo")
+        fin = len(self._mm) - m
+        inicio = int.from_bytes(self._mm[fin - 12:fin - 4], "little")
+        largo = int.from_bytes(self._mm[fin - 4:fin], "little")
+        indice = json.loads(self._mm[inicio:inicio + largo])
+        if indice.get("version") != VERSION or indice.get("byteorder") != sys.byteorder:
+            raise ArchivoInvalido(f"{path} es de otra versión o arquitectura")
+        self.resumen: dict = indice["resumen"]
+        self._bloques: Dict[str, List[list]] = indice["bloques"]   # tabla -> [[primer_id, offset, largo]]
+        self._primeros = {t: [b[0] for b in self._bloques[t]] for t in _TABLAS}
+        self.ids: Dict[str, array] = {}
+        for t in _TABLAS:
+            pos, n = indice["ids"][t]
+            ids = array("q")
+            ids.frombytes(self._mm[pos:pos + n * ids.itemsize])
+            self.ids[t] = ids
+
+    def contiene(self, tabla: str, _id: int) -> bool:
+        ids = self.ids[tabla]
+        k = bisect_left(ids, _id)
+        return k < len(ids) and ids[k] == _id
+
+    def bloque_de(self, tabla: str, _id: int) -> int:
+        return bisect_right(self._primeros[tabla], _id) - 1
+
+    def leer_bloque(self, tabla: str, k: int) -> List[list]:
+        _, pos, largo = self._bloques[tabla][k]
+        return json.loads(zlib.decompress(self._mm[pos:pos + largo]))
+
+    def iterar(self, tabla: str) -> Iterator:
+        for k in range(len(self._bloques[tabla])):
+            for fila in self.leer_bloque(tabla, k):
+                yield _decodificar(tabla, fila)
+
+    def cerrar(self):
+        self._mm.close()
+
+
+def escribir_segmento(path: str, ventas: Sequence[Venta], devoluciones: Sequence[Devolucion],
+                      por_bloque: int = 64, nivel: int = 6):
+    """Escribe un segmento con esos registros (cada tabla ordenada por id)."""
+    ventas = sorted(ventas, key=lambda o: o.id)
+    devoluciones = sorted(devoluciones, key=lambda o: o.id)
+    tmp = path + ".tmp"
+    bloques: Dict[str, List[list]] = {}
+    ids_pos: Dict[str, list] = {}
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        for tabla, objetos in zip(_TABLAS, (ventas, devoluciones)):
+            bloques[tabla] = []
+            for i in range(0, len(objetos), por_bloque):
+                trozo = objetos[i:i + por_bloque]
+                datos = zlib.compress(json.dumps([_codificar(tabla, o) for o in trozo],
+                                                 separators=(",", ":")).encode(), nivel)
+                bloques[tabla].append([trozo[0].id, f.tell(), len(datos)])
+                f.write(datos)
+        for tabla, objetos in zip(_TABLAS, (ventas, devoluciones)):
+            f.write(b"\0" * (-f.tell() % 8))
+            ids_pos[tabla] = [f.tell(), len(objetos)]
+            array("q", (o.id for o in objetos)).tofile(f)
+        indice = json.dumps({
+            "version": VERSION,
+            "byteorder": sys.byteorder,
+            "bloques": bloques,
+            "ids": ids_pos,
+            "resumen": {
+                "ventas": len(ventas),
+                "devoluciones": len(devoluciones),
+                "desde": min((v.fecha for v in ventas), default=None),
+                "hasta": max((v.fecha for v in ventas), default=None),
+                "total": str(sum((v.total for v in ventas), Decimal("0.00"))),
+            },
+        }, default=str).encode()
+        inicio = f.tell()
+        f.write(indice)
+        f.write(inicio.to_bytes(8, "little") + len(indice).to_bytes(4, "little") + MAGIC)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+# ==========================
+# Tablas y archivo
+# ==========================
+class TablaArchivada:
+    """
+    Vista de una tabla (ventas o devoluciones) repartida en todos los
+    segmentos. La usan los repos de solo anexar como segundo nivel: lo que no
+    está en memoria se busca acá.
+    """
+
+    def __init__(self, archivo: "ArchivoVentas", tabla: str):
+        self._archivo = archivo
+        self.tabla = tabla
+
+    def _segmento_de(self, _id: int) -> Optional[int]:
+        for n, seg in enumerate(self._archivo.segmentos):
+            ids = seg.ids[self.tabla]
+            if ids and ids[0] <= _id <= ids[-1] and seg.contiene(self.tabla, _id):
+                return n
+        return None
+
+    def __contains__(self, _id: int) -> bool:
+        return self._segmento_de(_id) is not None
+
+    def __len__(self) -> int:
+        return sum(len(seg.ids[self.tabla]) for seg in self._archivo.segmentos)
+
+    def __bool__(self) -> bool:
+        return any(len(seg.ids[self.tabla]) for seg in self._archivo.segmentos)
+
+    def ultimo_id(self) -> int:
+        """Mayor id archivado (0 si no hay ninguno)."""
+        return max((seg.ids[self.tabla][-1] for seg in self._archivo.segmentos if seg.ids[self.tabla]), default=0)
+
+    def get(self, _id: int):
+        n = self._segmento_de(_id)
+        if n is None:
+            return None
+        ids, filas = self._archivo._bloque(n, self.tabla, self._archivo.segmentos[n].bloque_de(self.tabla, _id))
+        # Se decodifica solo la fila pedida, no el bloque entero
+        return _decodificar(self.tabla, filas[bisect_left(ids, _id)])
+
+    def iterar(self) -> Iterator:
+        """Todos los registros en orden de id, bloque a bloque (sin dejarlos en la cache)."""
+        return heapq.merge(*(seg.iterar(self.tabla) for seg in self._archivo.segmentos), key=lambda o: o.id)
+
+
+class ArchivoVentas:
+    """Segmentos de un directorio + cache LRU de bloques descomprimidos."""
+
+    def __init__(self, directorio: str, por_bloque: int = 64, bloques_en_cache: int = 64):
+        self.directorio = directorio
+        self.por_bloque = por_bloque
+        self.bloques_en_cache = bloques_en_cache
+        os.makedirs(directorio, exist_ok=True)
+        self.segmentos: List[Segmento] = [
+            Segmento(os.path.join(directorio, n)) for n in sorted(os.listdir(directorio)) if n.endswith(".arch")
+        ]
+        self._cache: "OrderedDict[tuple, Tuple[List[int], List[list]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.ventas = TablaArchivada(self, "ventas")
+        self.devoluciones = TablaArchivada(self, "devoluciones")
+        self.lecturas_bloque = 0
+
+    def escribir(self, ventas: Sequence[Venta], devoluciones: Sequence[Devolucion]) -> Segmento:
+        """Escribe un segmento nuevo y lo abre, sin publicarlo todavía (ver `publicar`)."""
+        numero = int(os.path.basename(self.segmentos[-1].path)[4:10]) + 1 if self.segmentos else 1
+        path = os.path.join(self.directorio, f"seg-{numero:06d}.arch")
+        escribir_segmento(path, ventas, devoluciones, self.por_bloque)
+        return Segmento(path)
+
+    def publicar(self, segmento: Segmento):
+        # Se reemplaza la lista (no se muta) para que los lectores sin lock vean una u otra
+        self.segmentos = self.segmentos + [segmento]
+
+    def _bloque(self, n: int, tabla: str, k: int) -> Tuple[List[int], List[list]]:
+        """(ids, filas sin decodificar) del bloque k; ambas listas ordenadas por id."""
+        clave = (n, tabla, k)
+        with self._lock:
+            bloque = self._cache.get(clave)
+            if bloque is not None:
+                self._cache.move_to_end(clave)
+                return bloque
+        filas = self.segmentos[n].leer_bloque(tabla, k)
+        bloque = ([f[0] for f in filas], filas)
+        with self._lock:
+            self.lecturas_bloque += 1
+            self._cache[clave] = bloque
+            while len(self._cache) > self.bloques_en_cache:
+                self._cache.popitem(last=False)
+        return bloque
+
+    def resumen(self) -> List[dict]:
+        return [dict(seg.resumen, segmento=os.path.basename(seg.path)) for seg in self.segmentos]
+
+    def cerrar(self):
+        for seg in self.segmentos:
+            seg.cerrar()
+        self._cache.clear()
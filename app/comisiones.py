@@ -0,0 +1,181 @@
+# app/comisiones.py
+import heapq
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .utils import to_money, now_ts
+from .versionado import DictVersionado, VistaDict
+
+# Índices del acumulado [ventas, unidades, volumen, comision] (montos en centavos)
+VENTAS, UNIDADES, VOLUMEN, COMISION = range(4)
+
+
+@dataclass
+class ReglasComision:
+    """
+    - porcentaje_base: comisión sobre el subtotal de cada línea vendida.
+    - porcentaje_por_marca: reemplaza al base para las llantas de esa marca.
+    - tramos: [(volumen neto mensual mínimo, porcentaje extra)], ordenados; el
+      extra del tramo alcanzado se paga sobre todo el volumen del mes.
+    """
+    porcentaje_base: Decimal = Decimal("0.02")
+    porcentaje_por_marca: Dict[str, Decimal] = field(default_factory=dict)
+    tramos: List[Tuple[Decimal, Decimal]] = field(default_factory=list)
+
+    def porcentaje(self, marca: Optional[str]) -> Decimal:
+        return self.porcentaje_por_marca.get(marca, self.porcentaje_base)
+
+    def extra_por_volumen(self, volumen: Decimal) -> Decimal:
+        k = bisect_right([minimo for minimo, _ in self.tramos], volumen)
+        return self.tramos[k - 1][1] if k else Decimal("0")
+
+
+def periodo_de(fecha: datetime) -> str:
+    """Período de liquidación (mes calendario) en formato AAAA-MM."""
+    return f"{fecha.year:04d}-{fecha.month:02d}"
+
+
+def fin_de_periodo(periodo: str) -> datetime:
+    """Último instante del período AAAA-MM: las reglas vigentes entonces fijan su bono."""
+    anio, mes = map(int, periodo.split("-"))
+    return datetime(anio + mes // 12, mes % 12 + 1, 1) - timedelta(microseconds=1)
+
+
+def _centavos(valor: Decimal) -> int:
+    return int(valor * 100)
+
+def _dinero(centavos: int) -> Decimal:
+    return Decimal(centavos).scaleb(-2)
+
+
+class MotorComisiones:
+    """
+    Acumulados por (período, asesor) que se actualizan al registrar cada venta
+    y devolución, así una liquidación es una búsqueda y no un recorrido del
+    historial.
+
+    La comisión de cada línea se calcula con las reglas vigentes al momento de
+    la venta. Una devolución descuenta (clawback) la comisión y el volumen de
+    lo devuelto en el período de la devolución, al asesor de la venta original,
+    con el precio y el porcentaje de la venta: se descuenta lo que se pagó.
+    El bono por tramo depende del volumen neto del mes y se calcula al liquidar,
+    con los tramos vigentes al cierre de ese mes.
+
+    `vista()` congela los acumulados en O(1); el primer cambio de un período
+    después de la vista copia solo ese período (uno por asesor).
+    """
+
+    def __init__(self, reglas: Optional[ReglasComision] = None):
+        # (desde, reglas) en orden; las primeras rigen desde siempre
+        self._reglas: List[Tuple[datetime, ReglasComision]] = [(datetime.min, reglas or ReglasComision())]
+        self._acumulados: Dict[str, Dict[int, List[int]]] = DictVersionado()
+
+    @property
+    def reglas(self) -> ReglasComision:
+        return self._reglas[-1][1]
+
+    @reglas.setter
+    def reglas(self, reglas: ReglasComision):
+        self.cambiar_reglas(reglas)
+
+    def cambiar_reglas(self, reglas: ReglasComision, desde: Optional[datetime] = None):
+        """
+        Reglas para las ventas desde `desde` (por defecto, ahora). Las anteriores
+        se conservan: una devolución descuenta con las de su venta.
+        """
+        desde = desde or now_ts()
+        if desde < self._reglas[-1][0]:
+            raise ValueError("Las reglas nuevas no pueden regir antes que las vigentes")
+        self._reglas.append((desde, reglas))
+
+    def reglas_en(self, fecha: datetime) -> ReglasComision:
+        k = bisect_right([desde for desde, _ in self._reglas], fecha)
+        return self._reglas[k - 1][1]
+
+    def _acumulado(self, periodo: str, asesor_id: int) -> List[int]:
+        por_asesor = self._acumulados.get(periodo)
+        if por_asesor is None:
+            por_asesor = self._acumulados[periodo] = {}
+        elif not self._acumulados.propio(periodo):
+            por_asesor = self._acumulados[periodo] = {a: list(acc) for a, acc in por_asesor.items()}
+        acc = por_asesor.get(asesor_id)
+        if acc is None:
+            acc = por_asesor[asesor_id] = [0, 0, 0, 0]
+        return acc
+
+    # --------- Actualización incremental ---------
+    def registrar_venta(self, venta, detalles, marca_de: Callable[[int], Optional[str]]):
+        reglas = self.reglas_en(venta.fecha)
+        acc = self._acumulado(periodo_de(venta.fecha), venta.asesor_id)
+        acc[VENTAS] += 1
+        for d in detalles:
+            acc[UNIDADES] += d.cantidad
+            acc[VOLUMEN] += _centavos(d.subtotal)
+            acc[COMISION] += _centavos(to_money(d.subtotal * reglas.porcentaje(marca_de(d.llanta_id))))
+
+    def registrar_devolucion(self, devolucion, venta, detalles_venta,
+                             marca_de: Callable[[int], Optional[str]]):
+        """Clawback de lo devuelto al precio unitario y con las reglas de la venta original."""
+        precios = {d.llanta_id: d.precio_unitario for d in detalles_venta}
+        reglas = self.reglas_en(venta.fecha)
+        acc = self._acumulado(periodo_de(devolucion.fecha), venta.asesor_id)
+        for d in devolucion.detalles:
+            subtotal = to_money(Decimal(d.cantidad) * precios[d.llanta_id])
+            acc[UNIDADES] -= d.cantidad
+            acc[VOLUMEN] -= _centavos(subtotal)
+            acc[COMISION] -= _centavos(to_money(subtotal * reglas.porcentaje(marca_de(d.llanta_id))))
+
+    def vista(self) -> "VistaComisiones":
+        return VistaComisiones(list(self._reglas), self._acumulados.vista())
+
+    # --------- Consultas ---------
+    def liquidar(self, asesor_id: int, periodo: str) -> dict:
+        acc = self._acumulados.get(periodo, {}).get(asesor_id, [0, 0, 0, 0])
+        return self._fila(asesor_id, periodo, acc)
+
+    def liquidacion(self, periodo: str) -> List[dict]:
+        """Liquidación de todos los asesores con movimiento en el período."""
+        return [self._fila(a, periodo, acc) for a, acc in sorted(self._acumulados.get(periodo, {}).items())]
+
+    def ranking(self, periodo: str, por: str = "volumen", n: int = 10) -> List[dict]:
+        """Los `n` asesores con mayor `por` (volumen, comision_total, unidades o ventas)."""
+        return heapq.nlargest(n, self.liquidacion(periodo), key=lambda f: f[por])
+
+    def periodos(self) -> List[str]:
+        return sorted(self._acumulados)
+
+    def _fila(self, asesor_id: int, periodo: str, acc: List[int]) -> dict:
+        volumen = _dinero(acc[VOLUMEN])
+        comision = _dinero(acc[COMISION])
+        extra = self.reglas_en(fin_de_periodo(periodo)).extra_por_volumen(volumen)
+        bono = to_money(max(volumen, Decimal("0")) * extra)
+        return {
+            "asesor_id": asesor_id,
+            "periodo": periodo,
+            "ventas": acc[VENTAS],
+            "unidades": acc[UNIDADES],
+            "volumen": volumen,
+            "comision": comision,
+            "porcentaje_extra": extra,
+            "bono": bono,
+            "comision_total": comision + bono,
+        }
+
+
+class VistaComisiones:
+    """Acumulados congelados en el momento de `MotorComisiones.vista()` (mismas consultas)."""
+
+    def __init__(self, reglas: List[Tuple[datetime, ReglasComision]], acumulados: VistaDict):
+        self._reglas = reglas
+        self._acumulados = acumulados
+
+    reglas = property(MotorComisiones.reglas.fget)
+    reglas_en = MotorComisiones.reglas_en
+    liquidar = MotorComisiones.liquidar
+    liquidacion = MotorComisiones.liquidacion
+    ranking = MotorComisiones.ranking
+    periodos = MotorComisiones.periodos
+    _fila = MotorComisiones._fila
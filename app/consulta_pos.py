@@ -0,0 +1,122 @@
+# app/consulta_pos.py
+import threading
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+
+@dataclass(frozen=True)
+class PrecioStock:
+    """Lo que pregunta el POS por una llanta: precio y stock (todas las sedes)."""
+    llanta_id: int
+    sku: str
+    marca: str
+    modelo: str
+    medida: str
+    precio: Decimal
+    stock: int                           # unidades físicas
+    disponible: int                      # físicas menos reservadas
+    por_sede: Tuple[Tuple[int, int], ...]  # (sede_id, disponible)
+
+
+class CachePrecioStock:
+    """
+    Tabla de lectura llanta_id -> PrecioStock (inmutable), con índice sku ->
+    llanta_id. Cada registro se arma la primera vez que se pide y queda
+    guardado hasta que una escritura que cambia precio o stock de esa llanta
+    llama a `invalidar(llanta_id)`.
+
+    Las lecturas no toman el lock del store: un registro armado mientras
+    ocurría una invalidación no se guarda (contador `_generacion`), así la
+    cache nunca se queda con un valor viejo.
+
+    - armar(llanta_id): el registro actual, o None si la llanta no existe.
+    - llantas(): el repo de llantas actual. Las llantas no se borran y el sku
+      no cambia, así que el índice por sku solo crece (y solo se toca si
+      cambió la cantidad de llantas).
+    """
+
+    def __init__(self, armar: Callable[[int], Optional[PrecioStock]], llantas: Callable[[], object]):
+        self._armar = armar
+        self._llantas = llantas
+        self._registros: Dict[int, PrecioStock] = {}
+        self._por_sku: Dict[str, int] = {}
+        self._indexadas = 0
+        self._generacion = 0
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def __len__(self) -> int:
+        return len(self._registros)
+
+    # --------- Lectura ---------
+    def obtener(self, llanta_id: int) -> Optional[PrecioStock]:
+        reg = self._registros.get(llanta_id)
+        if reg is not None:
+            self.aciertos += 1
+            return reg
+        self.fallos += 1
+        generacion = self._generacion
+        reg = self._armar(llanta_id)
+        if reg is not None:
+            with self._lock:
+                if generacion == self._generacion:
+                    self._registros[llanta_id] = reg
+        return reg
+
+    def por_sku(self, sku: str) -> Optional[PrecioStock]:
+        llanta_id = self.llanta_de(sku)
+        return self.obtener(llanta_id) if llanta_id is not None else None
+
+    def lote(self, skus: Sequence[str]) -> Tuple[Dict[str, PrecioStock], List[str]]:
+        """({sku: registro} de los encontrados, [skus que no existen])."""
+        encontrados: Dict[str, PrecioStock] = {}
+        faltantes: List[str] = []
+        for sku in skus:
+            reg = self.por_sku(sku)
+            if reg is None:
+                faltantes.append(sku)
+            else:
+                encontrados[sku] = reg
+        return encontrados, faltantes
+
+    def llanta_de(self, sku: str) -> Optional[int]:
+        sku = sku.strip()
+        llanta_id = self._por_sku.get(sku)
+        if llanta_id is None and len(self._llantas()) != self._indexadas:
+            self._indexar()
+            llanta_id = self._por_sku.get(sku)
+        return llanta_id
+
+    def _indexar(self):
+        # Solo las llantas registradas desde la última vez; si el sku se repite, manda la primera
+        with self._lock:
+            llantas = self._llantas().list()
+            for ll in llantas[self._indexadas:]:
+                self._por_sku.setdefault(ll.sku.strip(), ll.id)
+            self._indexadas = len(llantas)
+
+    # --------- Invalidación ---------
+    def invalidar(self, *llanta_ids: int):
+        """Descarta los registros de esas llantas (llamar después de aplicar el cambio)."""
+        with self._lock:
+            self._generacion += 1
+            for llanta_id in llanta_ids:
+                self._registros.pop(llanta_id, None)
+
+    def limpiar(self):
+        with self._lock:
+            self._generacion += 1
+            self._registros.clear()
+            self._por_sku.clear()
+            self._indexadas = 0
+
+    def estadisticas(self) -> dict:
+        total = self.aciertos + self.fallos
+        return {
+            "registros": len(self._registros),
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "tasa_aciertos": round(self.aciertos / total, 4) if total else 0.0,
+        }
@@ -0,0 +1,154 @@
+# app/idempotencia.py
+import heapq
+import itertools
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+
+class ClaveIdempotenciaReutilizada(Exception):
+    """La misma clave llegó con un contenido distinto al de la petición original."""
+    pass
+
+
+class _EnCurso:
+    __slots__ = ("evento", "huella", "resultado", "error")
+
+    def __init__(self, huella):
+        self.evento = threading.Event()
+        self.huella = huella
+        self.resultado = None
+        self.error: Optional[BaseException] = None
+
+
+class CacheIdempotencia:
+    """
+    Cache clave -> resultado, acotada (LRU) y con vencimiento (TTL), para que un
+    reintento de la misma operación devuelva el resultado original sin volver a
+    ejecutarla.
+
+    Duplicados concurrentes: el primero ejecuta, los demás esperan su resultado.
+    Los errores no se guardan: si la operación falla, un reintento vuelve a
+    ejecutarla.
+
+    Los vencimientos van en un heap por fecha de expiración (el orden LRU no
+    sirve: un acierto mueve la entrada al final) y el tamaño aproximado se
+    lleva como un total acumulado, así que ninguna operación recorre la cache.
+    """
+
+    def __init__(self, max_entradas: int = 10000, ttl_segundos: float = 24 * 3600,
+                 reloj: Callable[[], float] = time.monotonic):
+        self.max_entradas = max_entradas
+        self.ttl_segundos = ttl_segundos
+        self._reloj = reloj
+        self._lock = threading.Lock()
+        self._datos: "OrderedDict[Hashable, tuple]" = OrderedDict()  # clave -> (expira, huella, resultado)
+        self._en_curso: Dict[Hashable, _EnCurso] = {}
+        self._vencimientos: List[Tuple[float, int, Hashable]] = []  # heap (expira, seq, clave)
+        self._seq = itertools.count()
+        self._bytes = 0  # claves + tuplas de entrada guardadas
+        self.aciertos = 0
+        self.fallos = 0
+        self.esperas = 0
+
+    def __len__(self) -> int:
+        return len(self._datos)
+
+    def ejecutar(self, clave: Hashable, huella: Any, fn: Callable[[], Any]):
+        """
+        Devuelve el resultado guardado para `clave` o ejecuta `fn` una sola vez.
+        `huella` identifica el contenido de la petición (p. ej. los ítems).
+        """
+        with self._lock:
+            ahora = self._reloj()
+            self._purgar_vencidos(ahora)
+            guardado = self._datos.get(clave)
+            if guardado is not None and guardado[0] <= ahora:
+                self._quitar(clave)
+                guardado = None
+            if guardado is not None:
+                _, huella_orig, resultado = guardado
+                self._validar_huella(clave, huella_orig, huella)
+                self._datos.move_to_end(clave)
+                self.aciertos += 1
+                return resultado
+            pendiente = self._en_curso.get(clave)
+            duenio = pendiente is None
+            if duenio:
+                pendiente = self._en_curso[clave] = _EnCurso(huella)
+            else:
+                self._validar_huella(clave, pendiente.huella, huella)
+                self.esperas += 1
+
+        if not duenio:
+            pendiente.evento.wait()
+            if pendiente.error is not None:
+                raise pendiente.error
+            with self._lock:
+                self.aciertos += 1
+            return pendiente.resultado
+
+        try:
+            resultado = fn()
+        except BaseException as e:
+            pendiente.error = e
+            with self._lock:
+                del self._en_curso[clave]
+            pendiente.evento.set()
+            raise
+
+        with self._lock:
+            self._guardar(clave, (self._reloj() + self.ttl_segundos, huella, resultado))
+            while len(self._datos) > self.max_entradas:
+                self._quitar(next(iter(self._datos)))  # LRU
+            del self._en_curso[clave]
+            self.fallos += 1
+        pendiente.resultado = resultado
+        pendiente.evento.set()
+        return resultado
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                "entradas": len(self._datos),
+                "max_entradas": self.max_entradas,
+                "en_curso": len(self._en_curso),
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "esperas_concurrentes": self.esperas,
+                "tasa_aciertos": round(self.aciertos / consultas, 4) if consultas else 0.0,
+                "bytes_aprox": sys.getsizeof(self._datos) + self._bytes,
+            }
+
+    # --------- Internos ---------
+    @staticmethod
+    def _validar_huella(clave, original, nueva):
+        if original != nueva:
+            raise ClaveIdempotenciaReutilizada(f"La clave {clave!r} ya se usó con otro contenido")
+
+    def _guardar(self, clave: Hashable, entrada: tuple):
+        if clave in self._datos:
+            self._quitar(clave)
+        self._datos[clave] = entrada
+        # Los resultados se comparten con los repos: solo se cuentan claves y tuplas
+        self._bytes += sys.getsizeof(clave) + sys.getsizeof(entrada)
+        heapq.heappush(self._vencimientos, (entrada[0], next(self._seq), clave))
+        if len(self._vencimientos) > 2 * len(self._datos) + 64:
+            # Demasiadas marcas de entradas ya desalojadas por LRU: se reconstruye
+            self._vencimientos = [(e[0], next(self._seq), c) for c, e in self._datos.items()]
+            heapq.heapify(self._vencimientos)
+
+    def _quitar(self, clave: Hashable):
+        entrada = self._datos.pop(clave)
+        self._bytes -= sys.getsizeof(clave) + sys.getsizeof(entrada)
+
+    def _purgar_vencidos(self, ahora: float):
+        # Una marca del heap es vieja si la clave ya se quitó o se volvió a guardar
+        while self._vencimientos and self._vencimientos[0][0] <= ahora:
+            expira, _, clave = heapq.heappop(self._vencimientos)
+            guardado = self._datos.get(clave)
+            if guardado is not None and guardado[0] == expira:
+                self._quitar(clave)
@@ -0,0 +1,79 @@
+# app/items.py
+"""
+Parser único de ítems de venta/devolución en texto: "1x2, 3x1" -> [(1, 2), (3, 1)].
+
+Acepta lo que llega del formulario, de la consola o de un pegado masivo desde
+una planilla:
+  - separadores entre ítems: coma, punto y coma o salto de línea
+  - entre llanta y cantidad: "x", "X", "*" o un tabulador ("12\t4")
+  - espacios libres alrededor de cada número
+
+Los ids repetidos se suman (conservando el orden de primera aparición). El
+texto válido se procesa con dos pasadas de regex en C (fullmatch + findall);
+solo si falla se recorre ítem por ítem para ubicar el error con precisión.
+"""
+import re
+from typing import Dict, List, Optional, Tuple
+
+# Ningún espacio puede caer en dos partes del patrón: así un texto inválido
+# falla en tiempo lineal, sin backtracking exponencial
+_ITEM = r"(\d+)[ \t]*(?:[xX*]|\t)[ \t]*(\d+)"
+_SEP = r"[ \t\r]*[,;\n][\s,;]*"
+_PAR = re.compile(_ITEM)
+_VALIDO = re.compile(rf"[\s,;]*{_ITEM}(?:{_SEP}{_ITEM})*[\s,;]*")
+_BLANCO = re.compile(r"[\s,;]*")
+_ESPACIOS = re.compile(r"[ \t\r]*")
+
+
+class ItemsInvalidos(ValueError):
+    """Texto de ítems mal formado. `posicion` es el offset (desde 0) del problema."""
+
+    def __init__(self, mensaje: str, texto: str = "", posicion: int = 0):
+        self.posicion = posicion
+        self.linea = texto.count("\n", 0, posicion) + 1
+        self.columna = posicion - (texto.rfind("\n", 0, posicion) + 1) + 1
+        fragmento = texto[posicion:posicion + 12].split("\n", 1)[0]
+        donde = f" en línea {self.linea}, columna {self.columna}" if texto else ""
+        cerca = f" (cerca de «{fragmento}»)" if fragmento.strip() else ""
+        super().__init__(f"{mensaje}{donde}{cerca}")
+
+
+def parsear_items(texto: str, max_items: Optional[int] = None) -> List[Tuple[int, int]]:
+    """
+    Lista de (llanta_id, cantidad) con ids repetidos sumados. Lanza
+    ItemsInvalidos si el texto está vacío, mal formado, tiene cantidades en 0
+    o (con `max_items`) supera esa cantidad de líneas.
+    """
+    if texto is None or not texto.strip(" \t\r\n,;"):
+        raise ItemsInvalidos("No hay ítems")
+    if _VALIDO.fullmatch(texto) is None:
+        _ubicar_error(texto)
+
+    totales: Dict[int, int] = {}
+    pares = _PAR.findall(texto)
+    if max_items is not None and len(pares) > max_items:
+        raise ItemsInvalidos(f"Demasiados ítems ({len(pares)} > {max_items})")
+    for ll, cant in pares:
+        ll, cant = int(ll), int(cant)
+        if cant <= 0:
+            break
+        totales[ll] = totales.get(ll, 0) + cant
+    else:
+        return list(totales.items())
+    _ubicar_error(texto)  # hay una cantidad en 0: buscar dónde
+
+
+def _ubicar_error(texto: str):
+    pos = _BLANCO.match(texto).end()
+    while pos < len(texto):
+        m = _PAR.match(texto, pos)
+        if m is None:
+            raise ItemsInvalidos("Formato de ítem inválido (se espera ID x CANTIDAD)", texto, pos)
+        if int(m.group(2)) <= 0:
+            raise ItemsInvalidos("La cantidad debe ser mayor que 0", texto, m.start(2))
+        fin = _ESPACIOS.match(texto, m.end()).end()
+        if fin < len(texto) and texto[fin] not in ",;\n":
+            raise ItemsInvalidos("Falta separador entre ítems (coma, punto y coma o salto de línea)",
+                                 texto, fin)
+        pos = _BLANCO.match(texto, fin).end()
+    raise ItemsInvalidos("Formato de ítem inválido", texto, pos)  # pragma: no cover - no debería ocurrir
@@ -0,0 +1,198 @@
+# app/kardex.py
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from heapq import merge
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .utils import now_ts
+from .versionado import DictVersionado, VistaDict
+
+# Tipos de movimiento (se guardan como código de 1 byte)
+AJUSTE = 1
+VENTA = 2
+DEVOLUCION = 3
+TRANSFERENCIA = 4
+
+TIPOS = {
+    AJUSTE: "ajuste",
+    VENTA: "venta",
+    DEVOLUCION: "devolucion",
+    TRANSFERENCIA: "transferencia",
+}
+
+CSV_HEADER = "fecha,sede_id,llanta_id,tipo,cantidad,saldo,referencia\n"
+
+
+class _Serie:
+    """
+    Movimientos de una llanta en una sede, en arrays paralelos compactos
+    (~33 bytes por movimiento en vez de un dict/dataclass por fila).
+    `saldos[i]` es el stock físico después del movimiento i.
+    """
+    __slots__ = ("ts", "tipos", "cantidades", "saldos", "refs")
+
+    def __init__(self):
+        self.ts = array("d")          # epoch en segundos, no decreciente
+        self.tipos = array("b")
+        self.cantidades = array("q")  # delta con signo
+        self.saldos = array("q")
+        self.refs = array("q")        # id de venta/devolución/sede contraparte (0 = sin ref)
+
+    def saldo(self) -> int:
+        return self.saldos[-1] if self.saldos else 0
+
+    def copia(self) -> "_Serie":
+        otra = _Serie()
+        for destino, origen in zip((otra.ts, otra.tipos, otra.cantidades, otra.saldos, otra.refs),
+                                   (self.ts, self.tipos, self.cantidades, self.saldos, self.refs)):
+            destino.extend(origen)
+        return otra
+
+    def insertar(self, ts: float, tipo: int, cantidad: int, referencia: int) -> int:
+        """
+        Movimiento fuera de orden: va después de los de igual o menor fecha y
+        corre los saldos siguientes. O(n - i); lo normal es anexar al final.
+        """
+        i = bisect_right(self.ts, ts)
+        saldo = (self.saldos[i - 1] if i else 0) + cantidad
+        self.ts.insert(i, ts)
+        self.tipos.insert(i, tipo)
+        self.cantidades.insert(i, cantidad)
+        self.saldos.insert(i, saldo)
+        self.refs.insert(i, referencia)
+        for k in range(i + 1, len(self.saldos)):
+            self.saldos[k] += cantidad
+        return saldo
+
+
+class _LecturaKardex:
+    """
+    Consultas comunes a Kardex y VistaKardex. Cada serie se lee como
+    (serie, largo): la vista solo ve los movimientos que existían al tomarla.
+    """
+    _series: Dict[Tuple[int, int], Tuple[_Serie, int]]
+    _sedes_por_llanta: Dict[int, List[int]]
+
+    def __len__(self) -> int:
+        return sum(n for _, n in list(self._series.values()))
+
+    def saldo_a_fecha(self, llanta_id: int, fecha: datetime, sede_id: Optional[int] = None) -> int:
+        """Stock físico al cierre de `fecha` (incluye movimientos con esa marca de tiempo)."""
+        sedes = [sede_id] if sede_id is not None else list(self._sedes_por_llanta.get(llanta_id, []))
+        ts = fecha.timestamp()
+        total = 0
+        for sid in sedes:
+            par = self._series.get((sid, llanta_id))
+            if par is None:
+                continue
+            serie, n = par
+            i = bisect_right(serie.ts, ts, 0, n)
+            if i:
+                total += serie.saldos[i - 1]
+        return total
+
+    def movimientos(self, llanta_id: int, sede_id: int, desde: Optional[datetime] = None,
+                    hasta: Optional[datetime] = None) -> Iterator[dict]:
+        """Movimientos de una serie en [desde, hasta], localizados por búsqueda binaria."""
+        par = self._series.get((sede_id, llanta_id))
+        if par is None:
+            return
+        serie, n = par
+        i = bisect_left(serie.ts, desde.timestamp(), 0, n) if desde else 0
+        j = bisect_right(serie.ts, hasta.timestamp(), 0, n) if hasta else n
+        for k in range(i, j):
+            yield self._fila(sede_id, llanta_id, serie, k)
+
+    def exportar_csv(self, llanta_id: Optional[int] = None) -> Iterator[str]:
+        """
+        Kardex en CSV, línea a línea y en orden cronológico (merge de las series),
+        sin materializar el historial completo en memoria.
+        """
+        yield CSV_HEADER
+        series = [(k, par) for k, par in list(self._series.items()) if llanta_id is None or k[1] == llanta_id]
+        flujos = [self._iter_serie(k, *par) for k, par in sorted(series, key=lambda x: x[0])]
+        for _, linea in merge(*flujos):
+            yield linea
+
+    # --------- Internos ---------
+    @staticmethod
+    def _fila(sede_id: int, llanta_id: int, serie: _Serie, k: int) -> dict:
+        return {
+            "fecha": datetime.fromtimestamp(serie.ts[k]),
+            "sede_id": sede_id,
+            "llanta_id": llanta_id,
+            "tipo": TIPOS[serie.tipos[k]],
+            "cantidad": serie.cantidades[k],
+            "saldo": serie.saldos[k],
+            "referencia": serie.refs[k],
+        }
+
+    @staticmethod
+    def _iter_serie(key: Tuple[int, int], serie: _Serie, n: int) -> Iterator[Tuple[float, str]]:
+        sede_id, llanta_id = key
+        for k in range(n):
+            fecha = datetime.fromtimestamp(serie.ts[k]).isoformat(sep=" ")
+            yield serie.ts[k], (
+                f"{fecha},{sede_id},{llanta_id},{TIPOS[serie.tipos[k]]},"
+                f"{serie.cantidades[k]},{serie.saldos[k]},{serie.refs[k]}\n"
+            )
+
+
+class Kardex(_LecturaKardex):
+    """
+    Libro de movimientos de inventario, solo de anexar. Una serie por
+    (sede, llanta) con saldo acumulado, así que "stock a fecha" es una
+    búsqueda binaria (O(log n)) y no un replay del historial.
+
+    `vista()` congela el kardex en O(1): las series crecen en sitio y la vista
+    recuerda su largo; un movimiento fuera de orden reemplaza la serie por una
+    copia con la inserción, así ninguna vista ve cambiar lo que ya leía.
+    """
+
+    def __init__(self):
+        self._series: Dict[Tuple[int, int], Tuple[_Serie, int]] = DictVersionado()
+        self._sedes_por_llanta: Dict[int, List[int]] = {}
+
+    def registrar(self, sede_id: int, llanta_id: int, tipo: int, cantidad: int,
+                  referencia: int = 0, fecha: Optional[datetime] = None) -> int:
+        """
+        Anexa un movimiento y devuelve el saldo resultante. Si la fecha es
+        anterior al último movimiento de la serie (p. ej. un reloj que se
+        atrasó), se inserta en su lugar y se recalculan los saldos siguientes.
+        """
+        if tipo not in TIPOS:
+            raise ValueError(f"Tipo de movimiento desconocido: {tipo}")
+        key = (sede_id, llanta_id)
+        par = self._series.get(key)
+        if par is None:
+            serie, n = _Serie(), 0
+            self._sedes_por_llanta.setdefault(llanta_id, []).append(sede_id)
+        else:
+            serie, n = par
+
+        ts = (fecha or now_ts()).timestamp()
+        if n and ts < serie.ts[-1]:
+            if self._series.versiones.hay_vistas():
+                serie = serie.copia()  # alguna vista puede estar leyendo esta serie
+            saldo = serie.insertar(ts, tipo, cantidad, referencia)
+        else:
+            saldo = serie.saldo() + cantidad
+            serie.ts.append(ts)
+            serie.tipos.append(tipo)
+            serie.cantidades.append(cantidad)
+            serie.saldos.append(saldo)
+            serie.refs.append(referencia)
+        self._series[key] = (serie, n + 1)
+        return saldo
+
+    def vista(self) -> "VistaKardex":
+        return VistaKardex(self._series.vista(), self._sedes_por_llanta)
+
+
+class VistaKardex(_LecturaKardex):
+    """Kardex congelado en el momento de `Kardex.vista()` (solo lectura, sin copiar)."""
+
+    def __init__(self, series: VistaDict, sedes_por_llanta: Dict[int, List[int]]):
+        self._series = series
+        self._sedes_por_llanta = sedes_por_llanta
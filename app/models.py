@@ -14,11 +14,35 @@ class Llanta:
     precio_venta: Decimal
     precio_historial: List[dict] = field(default_factory=list)  # [{fecha, anterior, nuevo}]
 
+@dataclass
+class Sede:
+    id: int
+    nombre: str
+    direccion: Optional[str] = None
+
 @dataclass
 class Inventario:
     llanta_id: int
     cantidad_disponible: int
     umbral_minimo: int
+    cantidad_reservada: int = 0  # unidades apartadas por reservas activas
+    sede_id: int = 1              # bodega/sede dueña de las unidades
+
+    @property
+    def disponible(self) -> int:
+        """Unidades vendibles: físicas menos reservadas (O(1))."""
+        return self.cantidad_disponible - self.cantidad_reservada
+
+@dataclass
+class Reserva:
+    id: int
+    llanta_id: int
+    cantidad: int
+    creada: datetime
+    expira: datetime
+    estado: str = "activa"  # activa | convertida | liberada | expirada
+    venta_id: Optional[int] = None
+    sede_id: int = 1
 
 @dataclass
 class Cliente:
@@ -49,6 +73,20 @@ class Venta:
     asesor_id: int
     fecha: datetime
     total: Decimal
+    sede_id: int = 1
+
+@dataclass
+class Cotizacion:
+    id: int
+    cliente_id: int
+    asesor_id: int
+    creada: datetime
+    vence: datetime
+    total: Decimal
+    detalles: List[VentaDetalle] = field(default_factory=list)  # precios congelados al cotizar
+    sede_id: int = 1
+    estado: str = "vigente"  # vigente | convertida | vencida | anulada
+    venta_id: Optional[int] = None
 
 @dataclass
 class DevolucionDetalle:
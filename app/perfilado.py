@@ -0,0 +1,145 @@
+# app/perfilado.py
+"""
+Captura bajo demanda de perfiles de CPU (cProfile) y de memoria (tracemalloc).
+
+    with perfilar("reporte_periodo"):
+        store.reporte_periodo()
+
+Cada captura escribe en `directorio`:
+  - <fecha>-<nombre>.prof     estadísticas de cProfile (abrir con pstats/snakeviz)
+  - <fecha>-<nombre>.mem.txt  líneas que más memoria asignaron durante la captura
+
+Solo se guardan las últimas `max_capturas`; las más viejas se borran. Si no se
+llama, no hay costo: nada queda instalado fuera de `capturar`.
+"""
+import cProfile
+import io
+import os
+import pstats
+import random
+import re
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Optional
+
+_EXTENSIONES = (".prof", ".mem.txt")
+
+# Que las asignaciones del propio perfilado no aparezcan en el reporte de memoria
+_SIN_RUIDO = [tracemalloc.Filter(False, m.__file__) for m in (cProfile, tracemalloc, pstats)] + [
+    tracemalloc.Filter(False, __file__),
+]
+
+
+class Perfilador:
+    """Capturas a disco con tope de archivos; `muestrear()` decide por fracción."""
+
+    def __init__(self, directorio: str = "perfiles", muestreo: float = 0.0,
+                 max_capturas: int = 50, memoria: bool = True, top_memoria: int = 25):
+        self.directorio = directorio
+        self.muestreo = muestreo          # fracción de solicitudes a perfilar (0..1)
+        self.max_capturas = max_capturas
+        self.memoria = memoria
+        self.top_memoria = top_memoria
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._usuarios_tracemalloc = 0
+        self._tracemalloc_propio = False
+
+    def muestrear(self) -> bool:
+        """¿Perfilar esta solicitud? (según la fracción de muestreo)."""
+        return self.muestreo > 0 and random.random() < self.muestreo
+
+    # --------- Captura ---------
+    @contextmanager
+    def capturar(self, nombre: str, memoria: Optional[bool] = None):
+        """
+        Perfila el bloque en el hilo actual. Anidado dentro de otra captura del
+        mismo hilo no hace nada (la externa ya lo incluye). Devuelve la ruta base
+        de los archivos generados (sin extensión), o None si no capturó.
+        """
+        if getattr(self._local, "activo", False):
+            yield None
+            return
+        self._local.activo = True
+        base = os.path.join(self.directorio, f"{datetime.now():%Y%m%d-%H%M%S-%f}-{_limpiar(nombre)}")
+        memoria = self.memoria if memoria is None else memoria
+        inicio_mem = self._iniciar_tracemalloc() if memoria else None
+        prof = cProfile.Profile()
+        try:
+            try:
+                prof.enable()
+            except ValueError:  # Python 3.12+: solo un perfilador activo a la vez
+                prof = None
+            try:
+                yield base
+            finally:
+                if prof is not None:
+                    prof.disable()
+            os.makedirs(self.directorio, exist_ok=True)
+            if prof is not None:
+                prof.dump_stats(base + ".prof")
+            if inicio_mem is not None:
+                fin_mem = tracemalloc.take_snapshot().filter_traces(_SIN_RUIDO)
+                with open(base + ".mem.txt", "w", encoding="utf-8") as f:
+                    f.write(f"# {nombre}: asignaciones netas durante la captura (top {self.top_memoria})\n")
+                    for st in fin_mem.compare_to(inicio_mem, "lineno")[:self.top_memoria]:
+                        f.write(f"{st}\n")
+            self._rotar()
+        finally:
+            if inicio_mem is not None:
+                self._detener_tracemalloc()
+            self._local.activo = False
+
+    def _iniciar_tracemalloc(self):
+        # tracemalloc es global al proceso: se enciende con la primera captura y
+        # se apaga con la última (si no estaba encendido desde antes)
+        with self._lock:
+            if self._usuarios_tracemalloc == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._tracemalloc_propio = True
+            self._usuarios_tracemalloc += 1
+        return tracemalloc.take_snapshot().filter_traces(_SIN_RUIDO)
+
+    def _detener_tracemalloc(self):
+        with self._lock:
+            self._usuarios_tracemalloc -= 1
+            if self._usuarios_tracemalloc == 0 and self._tracemalloc_propio:
+                tracemalloc.stop()
+                self._tracemalloc_propio = False
+
+    def _rotar(self):
+        with self._lock:
+            capturas = sorted({
+                n[:-len(ext)] for n in os.listdir(self.directorio)
+                for ext in _EXTENSIONES if n.endswith(ext)
+            })
+            for vieja in capturas[:max(0, len(capturas) - self.max_capturas)]:
+                for ext in _EXTENSIONES:
+                    try:
+                        os.remove(os.path.join(self.directorio, vieja + ext))
+                    except FileNotFoundError:
+                        pass
+
+
+def _limpiar(nombre: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", nombre).strip("_")[:60] or "captura"
+
+
+def resumen(ruta_prof: str, n: int = 15, orden: str = "cumulative") -> str:
+    """Las `n` funciones más costosas de un .prof, como texto."""
+    out = io.StringIO()
+    pstats.Stats(ruta_prof, stream=out).sort_stats(orden).print_stats(n)
+    return out.getvalue()
+
+
+_perfiladores: dict = {}
+
+
+def perfilar(nombre: str, directorio: str = "perfiles", memoria: bool = True):
+    """Atajo para perfilar un bloque (p. ej. una llamada al StoreService)."""
+    perfilador = _perfiladores.get(directorio)
+    if perfilador is None:
+        perfilador = _perfiladores.setdefault(directorio, Perfilador(directorio))
+    return perfilador.capturar(nombre, memoria)
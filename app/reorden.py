@@ -0,0 +1,158 @@
+# app/reorden.py
+import math
+from array import array
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from .versionado import Versiones, previos
+
+try:  # NumPy es opcional: si no está, se usa el cálculo en Python puro
+    import numpy as np
+except ImportError:  # pragma: no cover - depende del entorno
+    np = None
+
+_SEG_POR_DIA = 86400.0
+
+
+class MotorReorden:
+    """
+    Velocidad de venta por llanta como media móvil exponencial (EWMA) en tiempo
+    continuo, actualizada en O(1) en cada venta/devolución:
+
+        v = v * exp(-dt / tau) + unidades / tau      (unidades por día)
+
+    El estado vive en dos arrays indexados por llanta_id (velocidad y fecha del
+    último evento), así que el cálculo de sugerencias sobre todo el catálogo es
+    una sola pasada vectorizada (NumPy si está disponible). `vista()` congela
+    el estado en O(1): cada llanta anota su (v, t) previo al primer cambio.
+    """
+
+    def __init__(self, tau_dias: float = 14.0, dias_entrega: int = 7,
+                 dias_cobertura: int = 14, dias_seguridad: int = 3):
+        if tau_dias <= 0:
+            raise ValueError("tau_dias debe ser > 0")
+        self.tau_dias = tau_dias
+        self.dias_entrega = dias_entrega        # lead time del proveedor
+        self.dias_cobertura = dias_cobertura    # días que debe cubrir cada pedido
+        self.dias_seguridad = dias_seguridad    # colchón de stock de seguridad
+        self._v = array("d")   # velocidad (uds/día) en el instante _t
+        self._t = array("d")   # epoch (días) del último evento
+        self._versiones = Versiones()
+
+    def _asegurar(self, llanta_id: int):
+        faltan = llanta_id + 1 - len(self._v)
+        if faltan > 0:
+            self._v.extend([0.0] * faltan)
+            self._t.extend([0.0] * faltan)
+
+    # --------- Actualización incremental ---------
+    def registrar(self, llanta_id: int, unidades: int, fecha: datetime):
+        """Suma una venta (unidades > 0) o descuenta una devolución (unidades < 0)."""
+        self._asegurar(llanta_id)
+        b = self._versiones.por_anotar(llanta_id)
+        if b is not None:
+            b.previos[llanta_id] = (self._v[llanta_id], self._t[llanta_id])
+        t = fecha.timestamp() / _SEG_POR_DIA
+        t0 = self._t[llanta_id]
+        v = self._v[llanta_id]
+        if t0 and t > t0:
+            v *= math.exp(-(t - t0) / self.tau_dias)
+        self._v[llanta_id] = max(0.0, v + unidades / self.tau_dias)
+        self._t[llanta_id] = max(t, t0)
+
+    def velocidad(self, llanta_id: int, ahora: datetime) -> float:
+        """Unidades/día estimadas para la llanta en `ahora`."""
+        if llanta_id >= len(self._v) or not self._t[llanta_id]:
+            return 0.0
+        dt = max(0.0, ahora.timestamp() / _SEG_POR_DIA - self._t[llanta_id])
+        return self._v[llanta_id] * math.exp(-dt / self.tau_dias)
+
+    def copia(self) -> "MotorReorden":
+        """
+        Motor independiente con el estado actual (copia de los arrays). El store
+        la toma bajo su lock y calcula sobre ella: `calcular` no debe leer los
+        arrays vivos mientras una venta los hace crecer.
+        """
+        otro = MotorReorden(self.tau_dias, self.dias_entrega, self.dias_cobertura, self.dias_seguridad)
+        otro._v = array("d", self._v)
+        otro._t = array("d", self._t)
+        return otro
+
+    def vista(self) -> "VistaReorden":
+        return VistaReorden(self, self._versiones.nueva_epoca())
+
+    # --------- Cálculo masivo ---------
+    def calcular(self, stocks: Dict[int, int], ahora: datetime,
+                 usar_numpy: Optional[bool] = None) -> List[dict]:
+        """
+        Para cada llanta en `stocks` ({llanta_id: unidades en stock}) devuelve
+        velocidad, días de cobertura, umbral recomendado y cantidad sugerida.
+        Sobre un motor compartido, llamar a `copia().calcular(...)`.
+        """
+        if usar_numpy is None:
+            usar_numpy = np is not None
+        ids = list(stocks)
+        if not ids:
+            return []
+        self._asegurar(max(ids))
+        hoy = ahora.timestamp() / _SEG_POR_DIA
+        if usar_numpy:
+            cols = self._calcular_numpy(ids, [stocks[i] for i in ids], hoy)
+        else:
+            cols = self._calcular_python(ids, [stocks[i] for i in ids], hoy)
+        vel, cobertura, umbral, sugerida = cols
+        return [
+            {
+                "llanta_id": ids[k],
+                "stock": stocks[ids[k]],
+                "velocidad_diaria": round(float(vel[k]), 3),
+                "dias_cobertura": None if vel[k] <= 0 else round(float(cobertura[k]), 1),
+                "umbral_recomendado": int(umbral[k]),
+                "cantidad_sugerida": int(sugerida[k]),
+            }
+            for k in range(len(ids))
+        ]
+
+    def _calcular_numpy(self, ids, disponibles, hoy):
+        idx = np.asarray(ids, dtype=np.int64)
+        stock = np.asarray(disponibles, dtype=np.float64)
+        v = np.frombuffer(self._v, dtype=np.float64)[idx]
+        t = np.frombuffer(self._t, dtype=np.float64)[idx]
+        dt = np.where(t > 0, np.maximum(hoy - t, 0.0), 0.0)
+        vel = v * np.exp(-dt / self.tau_dias)
+        with np.errstate(divide="ignore"):
+            cobertura = np.where(vel > 0, stock / np.where(vel > 0, vel, 1.0), np.inf)
+        umbral = np.ceil(vel * (self.dias_entrega + self.dias_seguridad))
+        objetivo = np.ceil(vel * (self.dias_entrega + self.dias_cobertura + self.dias_seguridad))
+        sugerida = np.where(stock <= umbral, np.maximum(objetivo - stock, 0.0), 0.0)
+        return vel, cobertura, umbral, sugerida
+
+    def _calcular_python(self, ids, disponibles, hoy):
+        vel, cobertura, umbral, sugerida = [], [], [], []
+        for llanta_id, stock in zip(ids, disponibles):
+            t = self._t[llanta_id]
+            v = self._v[llanta_id] * math.exp(-max(hoy - t, 0.0) / self.tau_dias) if t else 0.0
+            u = math.ceil(v * (self.dias_entrega + self.dias_seguridad))
+            objetivo = math.ceil(v * (self.dias_entrega + self.dias_cobertura + self.dias_seguridad))
+            vel.append(v)
+            cobertura.append(stock / v if v > 0 else math.inf)
+            umbral.append(u)
+            sugerida.append(max(objetivo - stock, 0) if stock <= u else 0)
+        return vel, cobertura, umbral, sugerida
+
+
+class VistaReorden:
+    """Velocidades congeladas en el momento de `MotorReorden.vista()` (sin copiar los arrays)."""
+
+    def __init__(self, motor: MotorReorden, bitacora):
+        self._motor = motor
+        self._bitacora = bitacora
+
+    def copia(self) -> MotorReorden:
+        """Motor con el estado de la vista: copia los arrays vivos y repone lo que cambió después."""
+        otro = self._motor.copia()
+        for llanta_id, (v, t) in previos(self._bitacora):
+            otro._asegurar(llanta_id)
+            otro._v[llanta_id] = v
+            otro._t[llanta_id] = t
+        return otro
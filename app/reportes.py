@@ -0,0 +1,281 @@
+# app/reportes.py
+"""
+Reportes de período (ventas netas de devoluciones) calculados en paralelo.
+
+El historial se mantiene en columnas int64 (`array("q")`) que se actualizan de
+forma incremental: ventas y devoluciones solo se anexan, así que cada reporte
+agrega únicamente las filas nuevas desde el anterior. Para calcular, las
+columnas se copian a un bloque de memoria compartida y cada proceso del pool
+agrega un rango de filas leyéndolo directo (memoryview, sin pickle de
+dataclasses) con NumPy si está instalado; el proceso principal solo suma los
+parciales.
+
+Las particiones son rangos de id de venta (nunca parten una venta). Las
+devoluciones cuentan en la fecha de la devolución y en la sede de la venta.
+"""
+import os
+import threading
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from decimal import Decimal
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+
+try:  # NumPy es opcional: si no está, cada proceso agrega en Python puro
+    import numpy as np
+except ImportError:  # pragma: no cover - depende del entorno
+    np = None
+
+_EPOCH = datetime(1970, 1, 1)
+_US = timedelta(microseconds=1)
+
+# Por debajo de esto el pool cuesta más de lo que ahorra
+MIN_FILAS_PARALELO = 200_000
+
+# Columnas de cada tabla (todas int64): montos en centavos, fechas en µs
+COLUMNAS_VENTAS = ("venta_id", "fecha", "sede_id", "llanta_id", "cantidad", "subtotal")
+COLUMNAS_DEVOLUCIONES = ("fecha", "sede_id", "llanta_id", "cantidad", "subtotal")
+
+
+def _us(fecha: datetime) -> int:
+    return (fecha - _EPOCH) // _US
+
+def _centavos(valor: Decimal) -> int:
+    return int(valor * 100)
+
+def _dinero(centavos: int) -> Decimal:
+    return Decimal(centavos).scaleb(-2)
+
+
+# ==========================
+# Agregación (corre en los procesos del pool)
+# ==========================
+def _agregar(cols_v, cols_d, rango_v, rango_d, desde: int, hasta: int,
+             usar_numpy: bool) -> Tuple[list, dict, dict]:
+    """
+    Agrega filas [a, b) de ventas y devoluciones dentro de [desde, hasta).
+    Cada acumulador es [ventas, unidades, ingresos, unidades_devueltas, monto_devuelto].
+    """
+    if usar_numpy:
+        return _agregar_numpy(cols_v, cols_d, rango_v, rango_d, desde, hasta)
+    return _agregar_python(cols_v, cols_d, rango_v, rango_d, desde, hasta)
+
+
+def _agregar_python(cols_v, cols_d, rango_v, rango_d, desde, hasta):
+    totales = [0, 0, 0, 0, 0]
+    por_llanta: Dict[int, list] = {}
+    por_sede: Dict[int, list] = {}
+
+    a, b = rango_v
+    ultima = None
+    for vid, f, sede, ll, cant, sub in zip(*(c[a:b] for c in cols_v)):
+        if f < desde or f >= hasta:
+            continue
+        if vid != ultima:
+            ultima = vid
+            totales[0] += 1
+            por_sede.setdefault(sede, [0, 0, 0, 0, 0])[0] += 1
+        for acc in (totales, por_llanta.setdefault(ll, [0, 0, 0, 0, 0]), por_sede.setdefault(sede, [0, 0, 0, 0, 0])):
+            acc[1] += cant
+            acc[2] += sub
+
+    a, b = rango_d
+    for f, sede, ll, cant, sub in zip(*(c[a:b] for c in cols_d)):
+        if f < desde or f >= hasta:
+            continue
+        for acc in (totales, por_llanta.setdefault(ll, [0, 0, 0, 0, 0]), por_sede.setdefault(sede, [0, 0, 0, 0, 0])):
+            acc[3] += cant
+            acc[4] += sub
+    return totales, por_llanta, por_sede
+
+
+def _agregar_numpy(cols_v, cols_d, rango_v, rango_d, desde, hasta):
+    (a, b), (c, d) = rango_v, rango_d
+    vid, f, sede, ll, cant, sub = (np.frombuffer(col, dtype=np.int64)[a:b] for col in cols_v)
+    m = (f >= desde) & (f < hasta)
+    vid, sede, ll, cant, sub = vid[m], sede[m], ll[m], cant[m], sub[m]
+    nueva = np.ones(len(vid), dtype=bool)  # primera fila de cada venta
+    nueva[1:] = vid[1:] != vid[:-1]
+
+    f_d, sede_d, ll_d, cant_d, sub_d = (np.frombuffer(col, dtype=np.int64)[c:d] for col in cols_d)
+    m = (f_d >= desde) & (f_d < hasta)
+    sede_d, ll_d, cant_d, sub_d = sede_d[m], ll_d[m], cant_d[m], sub_d[m]
+
+    totales = [int(nueva.sum()), int(cant.sum()), int(sub.sum()), int(cant_d.sum()), int(sub_d.sum())]
+    por_llanta = _grupos(ll, ll_d, None, cant, sub, cant_d, sub_d)
+    por_sede = _grupos(sede, sede_d, nueva, cant, sub, cant_d, sub_d)
+    return totales, por_llanta, por_sede
+
+
+def _grupos(claves, claves_d, nueva, cant, sub, cant_d, sub_d) -> Dict[int, list]:
+    """Acumuladores por clave (ids chicos y densos: llanta o sede) con sumas exactas en int64."""
+    n = int(max(claves.max(initial=0), claves_d.max(initial=0))) + 1
+    acc = np.zeros((5, n), dtype=np.int64)
+    if nueva is not None:
+        np.add.at(acc[0], claves[nueva], 1)
+    np.add.at(acc[1], claves, cant)
+    np.add.at(acc[2], claves, sub)
+    np.add.at(acc[3], claves_d, cant_d)
+    np.add.at(acc[4], claves_d, sub_d)
+    usadas = np.flatnonzero(np.bincount(claves, minlength=n) + np.bincount(claves_d, minlength=n))
+    return {int(k): acc[:, k].tolist() for k in usadas}
+
+
+def _columnas(buf: memoryview, inicio: int, n: int, nombres) -> list:
+    return [buf[inicio + k * n: inicio + (k + 1) * n] for k in range(len(nombres))]
+
+
+def _trabajo(nombre_shm: str, n_v: int, n_d: int, rango_v, rango_d, desde: int, hasta: int,
+             usar_numpy: bool):
+    """Punto de entrada del worker: abre la memoria compartida y agrega su rango."""
+    shm = shared_memory.SharedMemory(name=nombre_shm)
+    # El bloque lo crea y lo libera (unlink) el proceso principal; el worker solo lo lee
+    buf = shm.buf.cast("q")
+    try:
+        cols_v = _columnas(buf, 0, n_v, COLUMNAS_VENTAS)
+        cols_d = _columnas(buf, n_v * len(COLUMNAS_VENTAS), n_d, COLUMNAS_DEVOLUCIONES)
+        out = _agregar(cols_v, cols_d, rango_v, rango_d, desde, hasta, usar_numpy)
+        del cols_v, cols_d  # soltar las vistas antes de cerrar el bloque
+        return out
+    finally:
+        buf.release()
+        shm.close()
+
+
+def _sumar(destino: dict, origen: dict):
+    for k, acc in origen.items():
+        d = destino.setdefault(k, [0, 0, 0, 0, 0])
+        for i in range(5):
+            d[i] += acc[i]
+
+
+# ==========================
+# Motor
+# ==========================
+class MotorReportes:
+    """Columnas del historial + cálculo particionado en un ProcessPoolExecutor."""
+
+    def __init__(self):
+        self._v = {c: array("q") for c in COLUMNAS_VENTAS}
+        self._d = {c: array("q") for c in COLUMNAS_DEVOLUCIONES}
+        self._ult_venta = 0
+        self._ult_devolucion = 0
+        # Las columnas no pueden crecer mientras se copian a memoria compartida
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._v["venta_id"]) + len(self._d["fecha"])
+
+    # --------- Carga incremental ---------
+    def sincronizar(self, ventas, devoluciones):
+        """Anexa a las columnas las ventas/devoluciones nuevas desde la última vez."""
+        with self._lock:
+            self._sincronizar(ventas, devoluciones)
+
+    def _sincronizar(self, ventas, devoluciones):
+        for vid in range(self._ult_venta + 1, len(ventas) + 1):
+            v = ventas.get(vid)
+            if v is None:
+                continue
+            f = _us(v.fecha)
+            for d in getattr(v, "_detalles", []):
+                for col, val in zip(self._v.values(), (v.id, f, v.sede_id, d.llanta_id, d.cantidad, _centavos(d.subtotal))):
+                    col.append(val)
+            self._ult_venta = vid
+        for did in range(self._ult_devolucion + 1, len(devoluciones) + 1):
+            dev = devoluciones.get(did)
+            if dev is None:
+                continue
+            venta = ventas.get(dev.venta_id)
+            sede = venta.sede_id if venta else 0
+            f = _us(dev.fecha)
+            for d in dev.detalles:
+                for col, val in zip(self._d.values(), (f, sede, d.llanta_id, d.cantidad, _centavos(d.subtotal))):
+                    col.append(val)
+            self._ult_devolucion = did
+
+    # --------- Cálculo ---------
+    def _particiones(self, partes: int) -> List[Tuple[Tuple[int, int], Tuple[int, int]]]:
+        ids = self._v["venta_id"]
+        n_v, n_d = len(ids), len(self._d["fecha"])
+        cortes_v, cortes_d = [0], [0]
+        for k in range(1, partes):
+            c = max(cortes_v[-1], n_v * k // partes)
+            while 0 < c < n_v and ids[c] == ids[c - 1]:
+                c += 1  # no partir una venta entre dos procesos
+            cortes_v.append(c)
+            cortes_d.append(n_d * k // partes)
+        cortes_v.append(n_v)
+        cortes_d.append(n_d)
+        return [((cortes_v[k], cortes_v[k + 1]), (cortes_d[k], cortes_d[k + 1])) for k in range(partes)]
+
+    def calcular(self, desde: Optional[datetime] = None, hasta: Optional[datetime] = None,
+                 procesos: Optional[int] = None, usar_numpy: Optional[bool] = None) -> dict:
+        """
+        Totales, por llanta y por sede en [desde, hasta). `procesos=None` usa
+        todos los núcleos; con pocas filas (o procesos=1) calcula en el proceso
+        actual.
+        """
+        if usar_numpy is None:
+            usar_numpy = np is not None
+        lo = _us(desde) if desde else -(1 << 63)
+        hi = _us(hasta) if hasta else (1 << 63) - 1
+        procesos = procesos or os.cpu_count() or 1
+        with self._lock:
+            if procesos <= 1 or len(self) < MIN_FILAS_PARALELO:
+                procesos = 1
+                n_v, n_d = len(self._v["venta_id"]), len(self._d["fecha"])
+                parciales = [_agregar(list(self._v.values()), list(self._d.values()),
+                                      (0, n_v), (0, n_d), lo, hi, usar_numpy)]
+            else:
+                parciales = self._calcular_pool(procesos, lo, hi, usar_numpy)
+
+        totales = [0, 0, 0, 0, 0]
+        por_llanta: Dict[int, list] = {}
+        por_sede: Dict[int, list] = {}
+        for t, ll, s in parciales:
+            for i in range(5):
+                totales[i] += t[i]
+            _sumar(por_llanta, ll)
+            _sumar(por_sede, s)
+        return {
+            "desde": desde,
+            "hasta": hasta,
+            "procesos": procesos,
+            **_fila(totales),
+            "por_llanta": {k: _fila(v) for k, v in sorted(por_llanta.items())},
+            "por_sede": {k: _fila(v) for k, v in sorted(por_sede.items())},
+        }
+
+    def _calcular_pool(self, procesos: int, lo: int, hi: int, usar_numpy: bool) -> list:
+        n_v, n_d = len(self._v["venta_id"]), len(self._d["fecha"])
+        cols = list(self._v.values()) + list(self._d.values())
+        shm = shared_memory.SharedMemory(create=True, size=max(8, sum(len(c) for c in cols) * 8))
+        try:
+            buf = shm.buf.cast("q")
+            pos = 0
+            for c in cols:
+                buf[pos:pos + len(c)] = c  # memcpy, sin convertir fila por fila
+                pos += len(c)
+            buf.release()
+            # Más particiones que procesos para repartir mejor la carga
+            partes = self._particiones(procesos * 4)
+            with ProcessPoolExecutor(max_workers=procesos) as pool:
+                futuros = [pool.submit(_trabajo, shm.name, n_v, n_d, rv, rd, lo, hi, usar_numpy) for rv, rd in partes]
+                return [f.result() for f in futuros]
+        finally:
+            shm.close()
+            shm.unlink()
+
+
+def _fila(acc) -> dict:
+    ventas, unidades, ingresos, u_dev, m_dev = acc
+    return {
+        "ventas": ventas,
+        "unidades": unidades,
+        "ingresos": _dinero(ingresos),
+        "unidades_devueltas": u_dev,
+        "monto_devuelto": _dinero(m_dev),
+        "neto": _dinero(ingresos - m_dev),
+    }
@@ -1,10 +1,25 @@
 # app/repositories.py
-from typing import Dict, List, Optional
-from .models import Llanta, Inventario, Cliente, Asesor, Venta, VentaDetalle, Devolucion
+import copy
+import heapq
+import itertools
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from .models import Llanta, Inventario, Cliente, Asesor, Venta, VentaDetalle, Devolucion, Reserva, Sede, Cotizacion
+from .versionado import DictVersionado, VistaDict
+
+# Sede creada por defecto; las llamadas sin sede operan sobre ella
+SEDE_PRINCIPAL = 1
 
 class InMemoryRepo:
+    """
+    Repo en memoria con copy-on-write por clave para vistas de solo lectura:
+    `vista()` es O(1) y no copia nada; cada escritura posterior anota solo el
+    valor previo de ese id (ver app/versionado.py), y `para_modificar` clona
+    el objeto antes de mutarlo, así la vista nunca ve cambios posteriores.
+    """
     def __init__(self):
-        self._data: Dict[int, object] = {}
+        self._data: Dict[int, object] = DictVersionado()
         self._auto = 1
 
     def add(self, obj):
@@ -19,25 +34,415 @@ class InMemoryRepo:
     def list(self):
         return list(self._data.values())
 
+    def __len__(self) -> int:
+        return len(self._data)
+
     def set(self, _id: int, obj):
         self._data[_id] = obj
 
+    def para_modificar(self, _id: int):
+        """Objeto listo para mutar en sitio (clonado si alguna vista lo comparte)."""
+        obj = self._data.get(_id)
+        if obj is None or self._data.propio(_id):
+            return obj
+        obj = copy.deepcopy(obj)
+        self.set(_id, obj)
+        return obj
+
+    def vista(self) -> "VistaRepo":
+        return VistaRepo(self._data.vista())
+
+class VistaRepo:
+    """Vista inmutable de un InMemoryRepo en el momento en que se tomó."""
+    def __init__(self, data: VistaDict):
+        self._data = data
+
+    def get(self, _id: int):
+        return self._data.get(_id)
+
+    def list(self):
+        return list(self._data.values())
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+class _SoloAnexar:
+    """
+    Repos donde los registros no se modifican después de creados (ventas,
+    devoluciones): la vista solo recuerda el último id, sin copiar nada nunca.
+
+    Los registros viejos se pueden pasar a un archivo en disco (`archivar`,
+    ver app/archivo.py): salen de memoria pero `get`/`list`/`len` los siguen
+    viendo, leyéndolos del archivo cuando se piden.
+    """
+    _archivados = None  # TablaArchivada con los registros que ya no están en memoria
+
+    def vista(self) -> "VistaSoloAnexar":
+        return VistaSoloAnexar(self, self._auto - 1, len(self))
+
+    def get(self, _id: int):
+        obj = self._data.get(_id)
+        if obj is None and self._archivados is not None:
+            obj = self._archivados.get(_id)
+        return obj
+
+    def list(self):
+        vivos = list(self._data.values())
+        if not self._archivados:
+            return vivos
+        return list(heapq.merge(self._archivados.iterar(), vivos, key=lambda o: o.id))
+
+    def list_en_memoria(self):
+        """Solo los registros no archivados (lo reciente), sin tocar el disco."""
+        return list(self._data.values())
+
+    def ultimos_en_memoria(self, n: int) -> list:
+        """Los `n` registros más nuevos que siguen en memoria."""
+        return list(self._data.values())[-n:] if n > 0 else []
+
+    def __len__(self) -> int:
+        return len(self._data) + (len(self._archivados) if self._archivados is not None else 0)
+
+    def ids_en_memoria(self) -> Iterable[int]:
+        return list(self._data)
+
+    def archivar(self, tabla, ids: Iterable[int]):
+        """Saca de memoria los registros `ids`, que ya están escritos en `tabla`."""
+        self._archivados = tabla
+        for _id in ids:
+            self._data.pop(_id, None)
+
+class VistaSoloAnexar:
+    def __init__(self, repo, tope: int, largo: int):
+        self._repo = repo
+        self._tope = tope
+        self._largo = largo
+
+    def get(self, _id: int):
+        return self._repo.get(_id) if _id <= self._tope else None
+
+    def list(self):
+        # Los ids crecen en orden de inserción: basta cortar en el tope
+        out = self._repo.list()
+        return out[:self._largo] if len(out) > self._largo else out
+
+    def list_en_memoria(self):
+        return [o for o in self._repo.list_en_memoria() if o.id <= self._tope]
+
+    def ultimos_en_memoria(self, n: int) -> list:
+        # Los ids son correlativos: se piden de más los agregados después de la vista
+        posteriores = self._repo._auto - 1 - self._tope
+        return [o for o in self._repo.ultimos_en_memoria(n + posteriores) if o.id <= self._tope][-n:] if n > 0 else []
+
+    def __len__(self) -> int:
+        return self._largo
+
+class RepoPerezoso(_SoloAnexar, InMemoryRepo):
+    """
+    Repo respaldado por un snapshot (ver app/snapshot.py): las filas del archivo
+    se decodifican recién cuando se piden y quedan cacheadas en `_data`.
+    `ids` es la columna de ids del snapshot (ordenada), `decodificar(k)` arma el
+    objeto de la fila k. Lo que se agregue después vive solo en memoria.
+    `archivados` es la tabla de lo que ya estaba archivado al guardar el
+    snapshot (esas filas no están en el snapshot).
+    """
+    def __init__(self, ids: Sequence[int], decodificar: Callable[[int], object], archivados=None):
+        super().__init__()
+        self._ids = ids
+        self._decodificar = decodificar
+        self._nuevos = 0
+        self._archivados = archivados
+        self._previos = len(archivados) if archivados is not None else 0
+        ultimo = ids[-1] if len(ids) else 0
+        self._auto = max(ultimo, archivados.ultimo_id() if archivados is not None else 0) + 1
+
+    def add(self, obj):
+        self._nuevos += 1
+        return super().add(obj)
+
+    def get(self, _id: int):
+        obj = self._data.get(_id)
+        if obj is None:
+            if self._archivados is not None and _id in self._archivados:
+                return self._archivados.get(_id)
+            k = bisect_left(self._ids, _id)
+            if k < len(self._ids) and self._ids[k] == _id:
+                obj = self._data[_id] = self._decodificar(k)
+        return obj
+
+    def list(self):
+        vivos = self.list_en_memoria()
+        if not self._archivados:
+            return vivos
+        return list(heapq.merge(self._archivados.iterar(), vivos, key=lambda o: o.id))
+
+    def _leer(self, _id: int):
+        """Como `get` para un id no archivado, pero sin cachear lo decodificado (recorridos masivos)."""
+        obj = self._data.get(_id)
+        if obj is None:
+            k = bisect_left(self._ids, _id)
+            if k < len(self._ids) and self._ids[k] == _id:
+                obj = self._decodificar(k)
+        return obj
+
+    def list_en_memoria(self):
+        # Recorrer todo no llena la cache: lo del snapshot se sigue leyendo del mmap
+        return [self._leer(_id) for _id in self.ids_en_memoria()]
+
+    def ultimos_en_memoria(self, n: int) -> list:
+        """Los `n` registros más nuevos no archivados: decodifica solo esos."""
+        out = []
+        archivados = self._archivados
+        for _id in itertools.chain(reversed(self._ids_nuevos()), reversed(self._ids)):
+            if len(out) >= n:
+                break
+            if not (archivados and _id in archivados):
+                out.append(self._leer(_id))
+        out.reverse()
+        return out
+
+    def ids_en_memoria(self) -> Iterable[int]:
+        # Las filas del snapshot cuentan como "en memoria": están en el mmap, no archivadas
+        archivados = self._archivados
+        ids = itertools.chain(self._ids, self._ids_nuevos())
+        return [i for i in ids if i not in archivados] if archivados else list(ids)
+
+    def _ids_nuevos(self) -> List[int]:
+        # Agregados después de cargar y todavía en memoria (lo archivado sale de _data)
+        desde = self._ids[-1] if len(self._ids) else 0
+        return [_id for _id in list(self._data) if _id > desde]
+
+    def __len__(self) -> int:
+        return self._previos + len(self._ids) + self._nuevos
+
 class RepoLlantas(InMemoryRepo): ...
 class RepoClientes(InMemoryRepo): ...
 class RepoAsesores(InMemoryRepo): ...
-class RepoVentas(InMemoryRepo): ...
-class RepoDevoluciones(InMemoryRepo): ...
+class RepoVentas(_SoloAnexar, InMemoryRepo): ...
+class RepoDevoluciones(_SoloAnexar, InMemoryRepo): ...
+class RepoReservas(InMemoryRepo): ...
+class RepoSedes(InMemoryRepo): ...
+
+class RepoCotizaciones(InMemoryRepo):
+    """
+    Cotizaciones con un índice de las vigentes (ids en orden de creación):
+    listarlas cuesta O(vigentes), no O(todas las emitidas). El índice es
+    copy-on-write por clave igual que los datos.
+    """
+    def __init__(self):
+        super().__init__()
+        self._vigentes: Dict[int, None] = DictVersionado()
+
+    def add(self, obj: Cotizacion):
+        obj = super().add(obj)
+        if obj.estado == "vigente":
+            self._vigentes[obj.id] = None
+        return obj
+
+    def set(self, _id: int, obj: Cotizacion):
+        super().set(_id, obj)
+        if obj.estado == "vigente":
+            self._vigentes[_id] = None
+
+    def cerrar(self, _id: int):
+        """Saca la cotización del índice de vigentes (convertida, vencida o anulada)."""
+        self._vigentes.pop(_id, None)
+
+    def vigentes(self) -> List[Cotizacion]:
+        return [self._data[i] for i in list(self._vigentes)]
+
+    def vista(self) -> "VistaCotizaciones":
+        return VistaCotizaciones(self._data.vista(), self._vigentes.vista())
+
+class VistaCotizaciones(VistaRepo):
+    def __init__(self, data: VistaDict, vigentes: VistaDict):
+        super().__init__(data)
+        self._vigentes = vigentes
+
+    vigentes = RepoCotizaciones.vigentes
 
 class RepoInventarios:
+    """
+    Inventario por (sede, llanta). Mantiene además un índice llanta -> {sede: inv}
+    y el total físico por llanta, para responder disponibilidad entre sedes en
+    O(sedes) sin recorrer todas las filas. Soporta vistas copy-on-write por
+    clave igual que InMemoryRepo: una escritura copia solo la fila y el
+    {sede: inv} de esa llanta.
+    """
     def __init__(self):
-        self._by_llanta: Dict[int, Inventario] = {}
+        self._by_key: Dict[Tuple[int, int], Inventario] = DictVersionado()
+        self._by_llanta: Dict[int, Dict[int, Inventario]] = DictVersionado()
+        self._totales: Dict[int, int] = DictVersionado()
+        # Última cantidad vista por fila, para actualizar el total con el delta
+        self._ultimo: Dict[Tuple[int, int], int] = {}
+
+    def _por_sede(self, llanta_id: int) -> Dict[int, Inventario]:
+        """{sede: inv} de la llanta listo para mutar (se copia si una vista lo comparte)."""
+        por_sede = self._by_llanta.get(llanta_id)
+        if por_sede is None:
+            por_sede = self._by_llanta[llanta_id] = {}
+        elif not self._by_llanta.propio(llanta_id):
+            por_sede = self._by_llanta[llanta_id] = dict(por_sede)
+        return por_sede
 
-    def get(self, llanta_id: int) -> Optional[Inventario]:
-        return self._by_llanta.get(llanta_id)
+    def get(self, llanta_id: int, sede_id: int = SEDE_PRINCIPAL) -> Optional[Inventario]:
+        return self._by_key.get((sede_id, llanta_id))
+
+    def para_modificar(self, llanta_id: int, sede_id: int = SEDE_PRINCIPAL) -> Optional[Inventario]:
+        """Inventario listo para mutar en sitio (clonado si alguna vista lo comparte)."""
+        key = (sede_id, llanta_id)
+        inv = self._by_key.get(key)
+        if inv is None or self._by_key.propio(key):
+            return inv
+        inv = copy.copy(inv)
+        self._by_key[key] = inv
+        self._por_sede(llanta_id)[sede_id] = inv
+        return inv
 
     def create_or_update(self, inv: Inventario):
-        self._by_llanta[inv.llanta_id] = inv
+        key = (inv.sede_id, inv.llanta_id)
+        self._by_key[key] = inv
+        self._por_sede(inv.llanta_id)[inv.sede_id] = inv
+        previo = self._ultimo.get(key, 0)
+        self._totales[inv.llanta_id] = self._totales.get(inv.llanta_id, 0) + inv.cantidad_disponible - previo
+        self._ultimo[key] = inv.cantidad_disponible
         return inv
 
     def list(self) -> List[Inventario]:
-        return list(self._by_llanta.values())
+        return list(self._by_key.values())
+
+    def por_llanta(self, llanta_id: int) -> Dict[int, Inventario]:
+        """Inventarios de una llanta en todas las sedes ({sede_id: inv})."""
+        return self._by_llanta.get(llanta_id, {})
+
+    def total(self, llanta_id: int) -> int:
+        """Unidades físicas de la llanta sumando todas las sedes (O(1))."""
+        return self._totales.get(llanta_id, 0)
+
+    def vista(self) -> "VistaInventarios":
+        return VistaInventarios(self._by_key.vista(), self._by_llanta.vista(), self._totales.vista())
+
+class VistaInventarios:
+    """Vista inmutable de RepoInventarios (misma interfaz de lectura)."""
+    def __init__(self, by_key, by_llanta, totales):
+        self._by_key = by_key
+        self._by_llanta = by_llanta
+        self._totales = totales
+
+    get = RepoInventarios.get
+    list = RepoInventarios.list
+    por_llanta = RepoInventarios.por_llanta
+    total = RepoInventarios.total
+
+_SIN_BASE = ((), (), ())
+
+class IndiceClientes:
+    """
+    Índices para el historial de compras, todos de solo anexar:
+    documento -> cliente_id, cliente_id -> ids de venta y venta_id -> ids de
+    devolución. Los ids se guardan en arrays en orden creciente, así que una
+    página del historial cuesta lo mismo sin importar cuántas ventas haya.
+
+    Al cargar un snapshot los índices llegan como columnas mapeadas (claves
+    ordenadas, inicios, ids; ver `columnas`) y no se reconstruyen: una clave
+    se copia a un array propio recién cuando se le anexa un id.
+    """
+    def __init__(self):
+        self._por_documento: Dict[str, int] = {}
+        self._ventas: Dict[int, array] = {}
+        self._devoluciones: Dict[int, array] = {}
+        self._base_ventas = _SIN_BASE
+        self._base_devoluciones = _SIN_BASE
+
+    def cargar_base(self, ventas: tuple, devoluciones: tuple):
+        """Usa como base las columnas (claves, inicios, ids) de un snapshot."""
+        self._base_ventas = ventas
+        self._base_devoluciones = devoluciones
+
+    def agregar_cliente(self, cliente_id: int, documento: str):
+        # Si el documento se repite, manda el primer cliente registrado
+        self._por_documento.setdefault(documento.strip(), cliente_id)
+
+    def agregar_venta(self, cliente_id: int, venta_id: int):
+        _anexar(self._ventas, self._base_ventas, cliente_id, venta_id)
+
+    def agregar_devolucion(self, venta_id: int, devolucion_id: int):
+        _anexar(self._devoluciones, self._base_devoluciones, venta_id, devolucion_id)
+
+    def cliente_por_documento(self, documento: str) -> Optional[int]:
+        return self._por_documento.get(documento.strip())
+
+    def ventas_de(self, cliente_id: int) -> Sequence[int]:
+        ids = self._ventas.get(cliente_id)
+        return ids if ids is not None else _en_base(self._base_ventas, cliente_id)
+
+    def devoluciones_de(self, venta_id: int) -> Sequence[int]:
+        ids = self._devoluciones.get(venta_id)
+        return ids if ids is not None else _en_base(self._base_devoluciones, venta_id)
+
+    def columnas(self, tope_venta: Optional[int] = None, tope_devolucion: Optional[int] = None) -> dict:
+        """
+        Índices de ventas y devoluciones como columnas para el snapshot:
+        {"ventas": (claves, inicios, ids), "devoluciones": ...}, con las claves
+        ordenadas y los ids de la clave k en ids[inicios[k]:inicios[k + 1]].
+        """
+        return {
+            "ventas": _csr(self._base_ventas, self._ventas, tope_venta),
+            "devoluciones": _csr(self._base_devoluciones, self._devoluciones, tope_devolucion),
+        }
+
+    def vista(self, tope_cliente: int, tope_venta: int, tope_devolucion: int) -> "VistaIndiceClientes":
+        return VistaIndiceClientes(self, tope_cliente, tope_venta, tope_devolucion)
+
+def _en_base(base: tuple, clave: int) -> Sequence[int]:
+    claves, inicios, ids = base
+    k = bisect_left(claves, clave)
+    if k < len(claves) and claves[k] == clave:
+        return ids[inicios[k]:inicios[k + 1]]
+    return ()
+
+def _anexar(propios: Dict[int, array], base: tuple, clave: int, _id: int):
+    ids = propios.get(clave)
+    if ids is None:
+        ids = array("q")
+        ids.frombytes(bytes(_en_base(base, clave)))
+        ids.append(_id)
+        propios[clave] = ids  # se publica ya completo: una vista nunca lo ve a medias
+    else:
+        ids.append(_id)
+
+def _csr(base: tuple, propios: Dict[int, array], tope: Optional[int]) -> Tuple[array, array, array]:
+    propios = dict(propios)  # copia atómica: se puede llamar sin el lock del store
+    claves, inicios, ids = array("q"), array("q"), array("q")
+    for clave in sorted(set(base[0]).union(propios)):
+        serie = propios.get(clave)
+        if serie is None:
+            serie = _en_base(base, clave)
+        n = bisect_right(serie, tope) if tope is not None else len(serie)
+        if n:
+            claves.append(clave)
+            inicios.append(len(ids))
+            ids.frombytes(bytes(serie[:n]))
+    inicios.append(len(ids))
+    return claves, inicios, ids
+
+class VistaIndiceClientes:
+    """Vista de IndiceClientes acotada a los ids que existían al tomarla (sin copiar)."""
+    def __init__(self, indice: IndiceClientes, tope_cliente: int, tope_venta: int, tope_devolucion: int):
+        self._indice = indice
+        self._topes = (tope_cliente, tope_venta, tope_devolucion)
+
+    def cliente_por_documento(self, documento: str) -> Optional[int]:
+        cliente_id = self._indice.cliente_por_documento(documento)
+        return cliente_id if cliente_id is not None and cliente_id <= self._topes[0] else None
+
+    def ventas_de(self, cliente_id: int) -> Sequence[int]:
+        ids = self._indice.ventas_de(cliente_id)
+        return ids[:bisect_right(ids, self._topes[1])]
+
+    def devoluciones_de(self, venta_id: int) -> Sequence[int]:
+        ids = self._indice.devoluciones_de(venta_id)
+        return ids[:bisect_right(ids, self._topes[2])]
+
+    def columnas(self) -> dict:
+        return self._indice.columnas(self._topes[1], self._topes[2])
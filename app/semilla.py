@@ -0,0 +1,331 @@
+# app/semilla.py
+"""
+Generador determinístico de datos sintéticos: catálogo de llantas (medidas y
+marcas reales), clientes, asesores por sede y un historial de ventas y
+devoluciones en el tiempo. La popularidad de los SKUs sigue una ley de Zipf
+(pocas llantas venden mucho, la mayoría poco).
+
+    resumen = generar("tienda.snap", ventas=1_000_000, semilla=7)
+    store = StoreService.load("tienda.snap")
+
+No pasa por registrar_venta (validaciones, lock y objetos por venta): escribe
+directamente las columnas del snapshot binario (app/snapshot.py). Inventario,
+kardex, velocidades de reorden y acumulados de comisiones quedan coherentes
+con el historial. Con la misma semilla y los mismos parámetros el archivo sale
+idéntico.
+"""
+import heapq
+import random
+import unicodedata
+from datetime import datetime, timedelta
+from decimal import Decimal
+from itertools import accumulate
+from typing import Dict, List, Optional
+
+from .comisiones import ReglasComision, periodo_de, VENTAS, UNIDADES, VOLUMEN, COMISION
+from .kardex import AJUSTE, VENTA, DEVOLUCION, _Serie
+from .reorden import MotorReorden
+from .repositories import IndiceClientes
+from .snapshot import _Escritor, _escribir_indice, _escribir_kardex, _escribir_comisiones, _us
+from .utils import to_money
+
+# Fin del historial por defecto (excluido): fijo, para que la salida no dependa del día
+HASTA = datetime(2026, 1, 1)
+
+# marca: (factor de precio, modelos)
+_MARCAS = {
+    "Michelin": (1.45, ("Primacy 4", "Pilot Sport 4", "LTX Force", "Energy XM2")),
+    "Bridgestone": (1.35, ("Turanza T005", "Potenza Sport", "Dueler H/T")),
+    "Pirelli": (1.40, ("Cinturato P7", "P Zero", "Scorpion Verde")),
+    "Continental": (1.35, ("PremiumContact 6", "SportContact 7", "CrossContact LX")),
+    "Goodyear": (1.30, ("EfficientGrip", "Eagle F1", "Wrangler AT")),
+    "Yokohama": (1.05, ("BluEarth", "Advan Sport", "Geolandar")),
+    "Hankook": (1.00, ("Kinergy Eco", "Ventus Prime", "Dynapro HT")),
+    "Kumho": (0.90, ("Ecowing ES31", "Ecsta PS71", "Crugen HP71")),
+    "General": (0.85, ("Altimax One", "Grabber AT3")),
+    "Westlake": (0.70, ("RP18", "SA07", "SL369")),
+}
+_MEDIDAS = (
+    "155/80 R13", "175/70 R13", "165/70 R14", "185/65 R14", "185/60 R15", "195/65 R15",
+    "195/55 R16", "205/55 R16", "205/60 R16", "215/60 R16", "265/70 R16", "215/55 R17",
+    "225/45 R17", "225/65 R17", "265/65 R17", "215/45 R18", "235/60 R18", "245/45 R18",
+    "255/55 R19", "275/40 R20",
+)
+_SEDES = ("Principal", "Norte", "Sur", "Occidente", "Oriente", "Centro", "Autopista", "Aeropuerto")
+_NOMBRES = ("María", "José", "Luis", "Ana", "Carlos", "Laura", "Jorge", "Paula", "Andrés", "Camila",
+            "Juan", "Sofía", "Diego", "Valentina", "Felipe", "Daniela", "Miguel", "Natalia")
+_APELLIDOS = ("López", "García", "Rodríguez", "Martínez", "Pérez", "Gómez", "Sánchez", "Díaz",
+              "Ramírez", "Torres", "Castro", "Rojas", "Vargas", "Moreno", "Herrera", "Jiménez")
+_MOTIVOS = ("Defecto de fábrica", "Medida equivocada", "Cliente desistió", "Desgaste irregular")
+
+_LINEAS = ((1, 2, 3), (70, 95, 100))       # líneas por venta (pesos acumulados)
+_CANTIDADES = ((1, 2, 4), (20, 65, 100))   # se venden sueltas, por par o por juego
+_PESO_DIA = (1.0, 1.0, 1.0, 1.05, 1.15, 1.35, 0.3)   # lunes..domingo
+_APERTURA_US = 8 * 3600 * 10 ** 6
+_JORNADA_US = 10 * 3600 * 10 ** 6                    # ventas entre las 8 y las 18
+_DIA_US = 86400 * 10 ** 6
+
+
+def _ascii(texto: str) -> str:
+    return unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode().lower()
+
+
+def _repartir(total: int, pesos: List[float]) -> List[int]:
+    """Reparte `total` en enteros proporcionales a `pesos` (suman exactamente `total`)."""
+    acumulados = list(accumulate(pesos))
+    cortes = [round(total * a / acumulados[-1]) for a in acumulados]
+    return [b - a for a, b in zip([0] + cortes, cortes)]
+
+
+def generar(path: str, ventas: int, semilla: int = 7, llantas: int = 400, clientes: Optional[int] = None,
+            asesores: int = 12, sedes: int = 3, dias: int = 365, hasta: Optional[datetime] = None,
+            tasa_devolucion: float = 0.02, zipf: float = 1.1) -> dict:
+    """
+    Escribe en `path` un snapshot con `ventas` ventas repartidas en los `dias`
+    anteriores a `hasta` (excluido), y devuelve un resumen de lo generado.
+    `clientes` por defecto es una vigésima parte de las ventas (mínimo 20).
+    """
+    conteos = {"ventas": ventas, "llantas": llantas, "asesores": asesores, "sedes": sedes, "dias": dias}
+    for nombre, valor in conteos.items():
+        if not isinstance(valor, int) or isinstance(valor, bool):
+            raise TypeError(f"{nombre} debe ser un entero, no {valor!r}")
+    if ventas < 0 or llantas <= 0 or asesores < sedes or sedes <= 0 or dias <= 0:
+        raise ValueError("Parámetros inválidos: ventas >= 0, llantas > 0, dias > 0 y al menos un asesor por sede")
+    rnd = random.Random(semilla)
+    hasta = (hasta or HASTA).replace(hour=0, minute=0, second=0, microsecond=0)
+    desde = hasta - timedelta(days=dias)
+    clientes = clientes or max(20, ventas // 20)
+    w = _Escritor()
+
+    # --------- Catálogo ---------
+    precios = [0] * (llantas + 1)   # centavos
+    marcas: List[str] = [""] * (llantas + 1)
+    nombres_marca = list(_MARCAS)
+    for i in range(1, llantas + 1):
+        marca = rnd.choice(nombres_marca)
+        factor, modelos = _MARCAS[marca]
+        medida = rnd.choice(_MEDIDAS)
+        ancho, resto = medida.split("/")
+        perfil, rin = resto.split(" R")
+        precios[i] = round(int(ancho) * int(rin) / 25 * factor * rnd.uniform(0.95, 1.05)) * 100
+        marcas[i] = marca
+        w.col("llantas.id", "q").append(i)
+        w.col("llantas.sku", "i").append(w.s(f"{marca[:3].upper()}-{ancho}{perfil}{rin}-{i:05d}"))
+        w.col("llantas.marca", "i").append(w.s(marca))
+        w.col("llantas.modelo", "i").append(w.s(rnd.choice(modelos)))
+        w.col("llantas.medida", "i").append(w.s(medida))
+        w.col("llantas.precio", "q").append(precios[i])
+
+    # Rango de popularidad k (1 = la más vendida) -> llanta al azar; peso 1/k^zipf
+    por_popularidad = list(range(1, llantas + 1))
+    rnd.shuffle(por_popularidad)
+    peso_llanta = list(accumulate(1 / k ** zipf for k in range(1, llantas + 1)))
+
+    for i in range(1, sedes + 1):
+        w.col("sedes.id", "q").append(i)
+        w.col("sedes.nombre", "i").append(w.s(_SEDES[i - 1] if i <= len(_SEDES) else f"Sede {i}"))
+        w.col("sedes.direccion", "i").append(w.s(f"Calle {rnd.randint(1, 150)} # {rnd.randint(1, 99)}-{rnd.randint(1, 99)}"))
+    peso_sede = list(accumulate([2] + [1] * (sedes - 1)))  # la principal vende el doble
+
+    for i in range(1, clientes + 1):
+        nombre, apellido = rnd.choice(_NOMBRES), rnd.choice(_APELLIDOS)
+        w.col("clientes.id", "q").append(i)
+        w.col("clientes.nombre", "i").append(w.s(f"{nombre} {apellido} {rnd.choice(_APELLIDOS)}"))
+        w.col("clientes.documento", "i").append(w.s(str(10_000_000 + i)))
+        w.col("clientes.telefono", "i").append(w.s(f"3{rnd.randrange(10 ** 9):09d}"))
+        w.col("clientes.email", "i").append(
+            w.s(_ascii(f"{nombre}.{apellido}{i}@correo.com")) if rnd.random() < 0.6 else -1)
+
+    asesores_sede: Dict[int, List[int]] = {s: [] for s in range(1, sedes + 1)}
+    for i in range(1, asesores + 1):
+        asesores_sede[(i - 1) % sedes + 1].append(i)
+        w.col("asesores.id", "q").append(i)
+        w.col("asesores.nombre", "i").append(w.s(f"{rnd.choice(_NOMBRES)} {rnd.choice(_APELLIDOS)}"))
+        w.col("asesores.documento", "i").append(w.s(str(80_000_000 + i)))
+        w.col("asesores.email", "i").append(w.s(f"asesor{i}@serviteca.com"))
+
+    # --------- Historial ---------
+    v_id, v_fecha, v_ini, v_n = (w.col(f"ventas.{c}", "q") for c in ("id", "fecha", "det_inicio", "det_n"))
+    v_cli, v_ase, v_sede, v_total = (w.col(f"ventas.{c}", "q") for c in ("cliente_id", "asesor_id", "sede_id", "total"))
+    vd_ll, vd_cant, vd_precio, vd_sub = (w.col(f"ventas_det.{c}", "q") for c in ("llanta_id", "cantidad", "precio", "subtotal"))
+    d_id, d_fecha, d_ini, d_n, d_venta, d_motivo = (
+        w.col(f"devoluciones.{c}", "q" if c != "motivo" else "i")
+        for c in ("id", "fecha", "det_inicio", "det_n", "venta_id", "motivo"))
+    dd_ll, dd_cant, dd_precio, dd_sub = (w.col(f"devoluciones_det.{c}", "q") for c in ("llanta_id", "cantidad", "precio", "subtotal"))
+    motivos = [w.s(m) for m in _MOTIVOS]
+
+    series: Dict[tuple, _Serie] = {}
+    reglas = ReglasComision()
+    comision_linea: Dict[tuple, int] = {}   # (llanta_id, cantidad) -> centavos de comisión
+    acumulados: Dict[str, Dict[int, List[int]]] = {}
+    reorden = MotorReorden()
+    pendientes: list = []                   # devoluciones futuras: (fecha_us, venta_id, llanta, cant, sede, asesor)
+    hasta_us = _us(hasta)
+    azar = rnd.random
+    n_venta = n_devolucion = 0
+
+    def comision(ll: int, cant: int) -> int:
+        c = comision_linea.get((ll, cant))
+        if c is None:
+            pct = reglas.porcentaje(marcas[ll])
+            c = comision_linea[(ll, cant)] = int(to_money(Decimal(cant * precios[ll]).scaleb(-2) * pct) * 100)
+        return c
+
+    def serie(sede_id: int, ll: int) -> _Serie:
+        s = series.get((sede_id, ll))
+        if s is None:
+            s = series[(sede_id, ll)] = _Serie()
+        return s
+
+    for d, cuota in enumerate(_repartir(ventas, [_PESO_DIA[(desde + timedelta(days=k)).weekday()]
+                                                 for k in range(dias)])):
+        dia = desde + timedelta(days=d)
+        dia_us, dia_ts = _us(dia), dia.timestamp()
+        periodo = periodo_de(dia)
+        por_asesor = acumulados.setdefault(periodo, {})
+        vendidas: Dict[int, int] = {}
+        devueltas: Dict[int, int] = {}
+
+        horas = sorted([int(azar() * _JORNADA_US) for _ in range(cuota)])
+        n_lineas = rnd.choices(_LINEAS[0], cum_weights=_LINEAS[1], k=cuota)
+        productos = iter(rnd.choices(por_popularidad, cum_weights=peso_llanta, k=sum(n_lineas)))
+        cantidades = iter(rnd.choices(_CANTIDADES[0], cum_weights=_CANTIDADES[1], k=sum(n_lineas)))
+        sedes_venta = rnd.choices(range(1, sedes + 1), cum_weights=peso_sede, k=cuota)
+        fin_dia = dia_us + _DIA_US
+
+        for k in range(cuota + 1):
+            fecha_us = dia_us + _APERTURA_US + horas[k] if k < cuota else fin_dia
+            # Primero las devoluciones que tocan antes de esta venta
+            while pendientes and pendientes[0][0] <= fecha_us and pendientes[0][0] < fin_dia:
+                f_us, venta_id, ll, cant, sede_id, asesor_id = heapq.heappop(pendientes)
+                n_devolucion += 1
+                sub = cant * precios[ll]
+                d_id.append(n_devolucion)
+                d_fecha.append(f_us)
+                d_ini.append(len(dd_ll))
+                d_n.append(1)
+                d_venta.append(venta_id)
+                d_motivo.append(rnd.choice(motivos))
+                dd_ll.append(ll)
+                dd_cant.append(cant)
+                dd_precio.append(precios[ll])
+                dd_sub.append(sub)
+                s = serie(sede_id, ll)
+                s.ts.append(dia_ts + (f_us - dia_us) / 1e6)
+                s.tipos.append(DEVOLUCION)
+                s.cantidades.append(cant)
+                s.refs.append(n_devolucion)
+                acc = por_asesor.get(asesor_id) or por_asesor.setdefault(asesor_id, [0, 0, 0, 0])
+                acc[UNIDADES] -= cant
+                acc[VOLUMEN] -= sub
+                acc[COMISION] -= comision(ll, cant)
+                devueltas[ll] = devueltas.get(ll, 0) + cant
+            if k == cuota:
+                break
+
+            n_venta += 1
+            sede_id = sedes_venta[k]
+            candidatos = asesores_sede[sede_id]
+            asesor_id = candidatos[int(azar() * len(candidatos))]
+            ts = dia_ts + (fecha_us - dia_us) / 1e6
+            items: Dict[int, int] = {}
+            for _ in range(n_lineas[k]):
+                ll = next(productos)
+                items[ll] = items.get(ll, 0) + next(cantidades)
+            acc = por_asesor.get(asesor_id) or por_asesor.setdefault(asesor_id, [0, 0, 0, 0])
+            acc[VENTAS] += 1
+            v_ini.append(len(vd_ll))
+            total = 0
+            for ll, cant in items.items():
+                sub = cant * precios[ll]
+                total += sub
+                vd_ll.append(ll)
+                vd_cant.append(cant)
+                vd_precio.append(precios[ll])
+                vd_sub.append(sub)
+                s = serie(sede_id, ll)
+                s.ts.append(ts)
+                s.tipos.append(VENTA)
+                s.cantidades.append(-cant)
+                s.refs.append(n_venta)
+                acc[UNIDADES] += cant
+                acc[VOLUMEN] += sub
+                acc[COMISION] += comision(ll, cant)
+                vendidas[ll] = vendidas.get(ll, 0) + cant
+            v_id.append(n_venta)
+            v_fecha.append(fecha_us)
+            v_n.append(len(items))
+            v_cli.append(int(azar() * clientes) + 1)
+            v_ase.append(asesor_id)
+            v_sede.append(sede_id)
+            v_total.append(total)
+
+            if azar() < tasa_devolucion:
+                ll = rnd.choice(list(items))
+                f_us = (dia_us + rnd.randint(1, 30) * _DIA_US + _APERTURA_US + rnd.randrange(_JORNADA_US))
+                if f_us < hasta_us:
+                    heapq.heappush(pendientes, (f_us, n_venta, ll, rnd.randint(1, items[ll]), sede_id, asesor_id))
+
+        # Velocidad de venta: un registro por llanta y día (la EWMA es de días)
+        cierre = dia + timedelta(hours=18)
+        for ll, u in vendidas.items():
+            reorden.registrar(ll, u, cierre)
+        for ll, u in devueltas.items():
+            reorden.registrar(ll, -u, cierre)
+
+    # --------- Inventario y kardex ---------
+    # Stock final al azar alrededor del umbral (algunas alertas de bajo stock);
+    # el ajuste inicial es lo justo para que el saldo nunca quede negativo.
+    desde_ts = desde.timestamp()
+    completas: Dict[tuple, _Serie] = {}
+    for sede_id in range(1, sedes + 1):
+        for ll in range(1, llantas + 1):
+            umbral = rnd.choice((4, 4, 8))
+            final = rnd.randint(umbral // 2, umbral * 6)
+            movs = series.get((sede_id, ll)) or _Serie()
+            corrido = list(accumulate(movs.cantidades))
+            neto = corrido[-1] if corrido else 0
+            inicial = max(final - neto, -min(corrido, default=0))
+            s = _Serie()
+            if inicial:
+                s.ts.append(desde_ts)
+                s.tipos.append(AJUSTE)
+                s.cantidades.append(inicial)
+                s.saldos.append(inicial)
+                s.refs.append(0)
+            s.ts.extend(movs.ts)
+            s.tipos.extend(movs.tipos)
+            s.cantidades.extend(movs.cantidades)
+            s.saldos.extend(inicial + c for c in corrido)
+            s.refs.extend(movs.refs)
+            if s.ts:
+                completas[(sede_id, ll)] = s
+            w.col("inventario.sede_id", "q").append(sede_id)
+            w.col("inventario.llanta_id", "q").append(ll)
+            w.col("inventario.cantidad", "q").append(inicial + neto)
+            w.col("inventario.umbral", "q").append(umbral)
+    # --------- Índices del historial ---------
+    indice = IndiceClientes()
+    for cliente_id, venta_id in zip(v_cli, v_id):
+        indice.agregar_venta(cliente_id, venta_id)
+    for venta_id, dev_id in zip(d_venta, d_id):
+        indice.agregar_devolucion(venta_id, dev_id)
+    _escribir_indice(w, indice.columnas())
+    _escribir_kardex(w, {k: (s, len(s.ts)) for k, s in completas.items()})
+    w.columnas["reorden.v"] = reorden._v
+    w.columnas["reorden.t"] = reorden._t
+    _escribir_comisiones(w, acumulados)
+    w.escribir(path)
+
+    return {
+        "llantas": llantas,
+        "clientes": clientes,
+        "asesores": asesores,
+        "sedes": sedes,
+        "ventas": n_venta,
+        "devoluciones": n_devolucion,
+        "lineas": len(vd_ll),
+        "desde": desde,
+        "hasta": hasta,
+        "total": Decimal(sum(v_total)).scaleb(-2),
+    }
@@ -1,20 +1,51 @@
 # app/services.py
+import heapq
+import os
+import threading
+from functools import wraps
 from typing import List, Tuple
 from decimal import Decimal
+from datetime import datetime, timedelta
 
 # Modelos (las dataclasses viven aquí)
 from .models import (
     Llanta, Inventario, Cliente, Asesor,
     Venta, VentaDetalle,
-    Devolucion, DevolucionDetalle
+    Devolucion, DevolucionDetalle,
+    Reserva, Sede, Cotizacion
 )
 
 # Repos (persistencia simple en memoria)
 from .repositories import (
     RepoLlantas, RepoClientes, RepoAsesores, RepoInventarios,
-    RepoVentas, RepoDevoluciones
+    RepoVentas, RepoDevoluciones, RepoReservas, RepoSedes, RepoCotizaciones, IndiceClientes,
+    SEDE_PRINCIPAL
 )
 
+# Kardex (libro de movimientos de inventario)
+from .kardex import Kardex, AJUSTE, VENTA, DEVOLUCION, TRANSFERENCIA
+
+# Velocidad de venta y sugerencias de reorden
+from .reorden import MotorReorden
+
+# Reportes de período en paralelo
+from .reportes import MotorReportes
+
+# Comisiones de asesores
+from .comisiones import MotorComisiones, periodo_de
+
+# Precio + stock para el POS (cache de lectura)
+from .consulta_pos import CachePrecioStock, PrecioStock
+
+# Reintentos seguros de ventas/devoluciones
+from .idempotencia import CacheIdempotencia
+
+# Archivo en disco de ventas viejas
+from .archivo import ArchivoVentas
+
+# Snapshot binario (dump/load)
+from . import snapshot
+
 # Utilidades
 from .utils import to_money, now_ts
 
@@ -30,6 +61,10 @@ class LlantaNoEncontrada(Exception):
     """Llanta no registrada."""
     pass
 
+class ClienteNoEncontrado(Exception):
+    """Cliente no registrado (por id o por documento)."""
+    pass
+
 class VentaNoEncontrada(Exception):
     """Venta no registrada."""
     pass
@@ -38,14 +73,234 @@ class DevolucionInvalida(Exception):
     """Reglas incumplidas en devolución (sin motivo, cantidades inválidas, etc.)."""
     pass
 
+class ReservaInvalida(Exception):
+    """Reserva inexistente, vencida o ya cerrada (convertida/liberada)."""
+    pass
+
+class CotizacionInvalida(Exception):
+    """Cotización inexistente, vencida o ya cerrada (convertida/anulada), o sin ítems válidos."""
+    pass
+
+class SedeNoEncontrada(Exception):
+    """Sede/bodega no registrada."""
+    pass
+
+
+# ==========================
+# Consultas (lectura)
+# ==========================
+class _Consultas:
+    """
+    Consultas de solo lectura sobre los repos. Las comparten StoreService (datos
+    vivos) y VistaStore (snapshot inmutable tomado con StoreService.snapshot()).
+    """
+
+    def _antes_de_leer(self):
+        pass
+
+    # --------- Inventario ---------
+    def consultar_inventario(self, sede_id: int | None = None) -> List[dict]:
+        self._antes_de_leer()
+        filas: List[dict] = []
+        for inv in self.inventarios.list():
+            if sede_id is not None and inv.sede_id != sede_id:
+                continue
+            ll = self.llantas.get(inv.llanta_id)
+            filas.append({
+                "sede_id": inv.sede_id,
+                "sede": self.sedes.get(inv.sede_id).nombre,
+                "llanta_id": ll.id,
+                "sku": ll.sku,
+                "marca": ll.marca,
+                "modelo": ll.modelo,
+                "medida": ll.medida,
+                "cantidad": inv.cantidad_disponible,
+                "reservado": inv.cantidad_reservada,
+                "disponible": inv.disponible,
+                "umbral_minimo": inv.umbral_minimo,
+                "alerta": inv.disponible <= inv.umbral_minimo
+            })
+        return filas
+
+    # Reporte: bajo stock (disponible = cantidad - reservado ≤ umbral de la sede)
+    def reporte_bajo_stock(self, sede_id: int | None = None) -> List[dict]:
+        return [f for f in self.consultar_inventario(sede_id) if f["alerta"]]
+
+    # --------- Multi-sede ---------
+    def disponibilidad(self, llanta_id: int) -> dict:
+        """
+        Stock de una llanta en todas las sedes. Usa el índice por llanta del repo:
+        O(sedes), independiente del número total de filas de inventario.
+        """
+        if not self.llantas.get(llanta_id):
+            raise LlantaNoEncontrada(f"Llanta {llanta_id} no existe")
+        self._antes_de_leer()
+        por_sede = [
+            {
+                "sede_id": sede_id,
+                "sede": self.sedes.get(sede_id).nombre,
+                "cantidad": inv.cantidad_disponible,
+                "reservado": inv.cantidad_reservada,
+                "disponible": inv.disponible,
+                "umbral_minimo": inv.umbral_minimo,
+            }
+            for sede_id, inv in self.inventarios.por_llanta(llanta_id).items()
+        ]
+        return {"llanta_id": llanta_id, "total": self.inventarios.total(llanta_id), "sedes": por_sede}
+
+    def sedes_con_stock(self, llanta_id: int, cantidad: int) -> List[dict]:
+        """Sedes que pueden vender `cantidad` unidades de la llanta ahora mismo."""
+        return [s for s in self.disponibilidad(llanta_id)["sedes"] if s["disponible"] >= cantidad]
+
+    # --------- Reservas ---------
+    def listar_reservas(self, solo_activas: bool = False) -> List[Reserva]:
+        self._antes_de_leer()
+        rs = self.reservas.list()
+        return [r for r in rs if r.estado == "activa"] if solo_activas else rs
+
+    # --------- Cotizaciones ---------
+    def listar_cotizaciones(self, solo_vigentes: bool = True, cliente_id: int | None = None) -> List[Cotizacion]:
+        """Vigentes (índice del repo, sin recorrer las cerradas) o todas; opcionalmente de un cliente."""
+        self._antes_de_leer()
+        cs = self.cotizaciones.vigentes() if solo_vigentes else self.cotizaciones.list()
+        return [c for c in cs if c.cliente_id == cliente_id] if cliente_id is not None else cs
+
+    # --------- Ventas / Devoluciones ---------
+    def listar_ventas(self, incluir_archivadas: bool = True) -> List[Tuple[Venta, List[VentaDetalle]]]:
+        """Todas las ventas (las archivadas se leen del disco) o solo las que siguen en memoria."""
+        out: List[Tuple[Venta, List[VentaDetalle]]] = []
+        for v in (self.ventas.list() if incluir_archivadas else self.ventas.list_en_memoria()):
+            dets = getattr(v, "_detalles", [])
+            out.append((v, dets))
+        return out
+
+    def listar_devoluciones(self, incluir_archivadas: bool = True) -> List[Devolucion]:
+        return self.devoluciones.list() if incluir_archivadas else self.devoluciones.list_en_memoria()
+
+    def ultimas_ventas(self, n: int = 50) -> List[Tuple[Venta, List[VentaDetalle]]]:
+        """Las `n` ventas más recientes (para el panel): no recorre ni decodifica el resto."""
+        return [(v, getattr(v, "_detalles", [])) for v in self.ventas.ultimos_en_memoria(n)]
+
+    def ultimas_devoluciones(self, n: int = 50) -> List[Devolucion]:
+        return self.devoluciones.ultimos_en_memoria(n)
+
+    # --------- Precio ---------
+    def historial_precios(self, llanta_id: int) -> List[dict]:
+        ll = self.llantas.get(llanta_id)
+        if not ll:
+            raise LlantaNoEncontrada(f"Llanta {llanta_id} no existe")
+        return ll.precio_historial
+
+    # --------- Historial de cliente ---------
+    def historial_cliente(self, cliente_id: int | None = None, documento: str | None = None,
+                          pagina: int = 1, por_pagina: int = 20) -> dict:
+        """
+        Compras de un cliente (por id o documento), de la más reciente a la más
+        antigua, con sus detalles y devoluciones. Usa el índice por cliente: el
+        costo depende del tamaño de la página, no del total de ventas.
+        """
+        if cliente_id is None and documento is not None:
+            cliente_id = self.indice_clientes.cliente_por_documento(documento)
+        cliente = self.clientes.get(cliente_id) if cliente_id is not None else None
+        if not cliente:
+            raise ClienteNoEncontrado(f"Cliente {documento if documento is not None else cliente_id} no existe")
+        pagina, por_pagina = max(1, pagina), max(1, por_pagina)
+
+        ids = self.indice_clientes.ventas_de(cliente.id)
+        fin = max(0, len(ids) - (pagina - 1) * por_pagina)
+        compras = []
+        for venta_id in reversed(ids[max(0, fin - por_pagina):fin]):
+            v = self.ventas.get(venta_id)
+            compras.append({
+                "venta": v,
+                "detalles": getattr(v, "_detalles", []),
+                "devoluciones": [self.devoluciones.get(d) for d in self.indice_clientes.devoluciones_de(venta_id)],
+            })
+        return {
+            "cliente": cliente,
+            "pagina": pagina,
+            "por_pagina": por_pagina,
+            "total_ventas": len(ids),
+            "paginas": max(1, -(-len(ids) // por_pagina)),
+            "compras": compras,
+        }
+
+    # --------- Kardex ---------
+    def stock_a_fecha(self, llanta_id: int, fecha, sede_id: int | None = None) -> int:
+        """Stock físico de la llanta en `fecha` (todas las sedes si sede_id es None)."""
+        if not self.llantas.get(llanta_id):
+            raise LlantaNoEncontrada(f"Llanta {llanta_id} no existe")
+        return self.kardex.saldo_a_fecha(llanta_id, fecha, sede_id)
+
+    def kardex_csv(self, llanta_id: int | None = None):
+        """Generador de líneas CSV del kardex (para exportar en streaming)."""
+        return self.kardex.exportar_csv(llanta_id)
+
+    # --------- Reorden ---------
+    def sugerencias_reorden(self, solo_necesarias: bool = True, ahora=None) -> List[dict]:
+        """
+        Velocidad de venta (EWMA), días de cobertura, umbral recomendado y
+        cantidad sugerida por llanta, con el stock total de todas las sedes.
+        """
+        ahora = ahora or now_ts()
+        llantas, stocks, motor = self._estado_reorden()
+        filas = motor.calcular(stocks, ahora)
+        por_id = {ll.id: ll for ll in llantas}
+        out: List[dict] = []
+        for f in filas:
+            if solo_necesarias and f["cantidad_sugerida"] <= 0:
+                continue
+            ll = por_id[f["llanta_id"]]
+            f.update(sku=ll.sku, marca=ll.marca, modelo=ll.modelo, medida=ll.medida)
+            out.append(f)
+        return out
+
+    def _estado_reorden(self):
+        """Llantas, stock total por llanta y un motor propio (copia) sobre el que calcular."""
+        llantas = self.llantas.list()
+        stocks = {ll.id: self.inventarios.total(ll.id) for ll in llantas}
+        return llantas, stocks, self.reorden.copia()
+
+    # --------- Comisiones ---------
+    def liquidacion_comisiones(self, periodo: str | None = None) -> List[dict]:
+        """Comisión + bono por tramo de cada asesor en el período (AAAA-MM, por defecto el actual)."""
+        return self._con_nombre(self.comisiones.liquidacion(periodo or periodo_de(now_ts())))
+
+    def ranking_asesores(self, periodo: str | None = None, por: str = "volumen", n: int = 10) -> List[dict]:
+        return self._con_nombre(self.comisiones.ranking(periodo or periodo_de(now_ts()), por, n))
+
+    def _con_nombre(self, filas: List[dict]) -> List[dict]:
+        for f in filas:
+            a = self.asesores.get(f["asesor_id"])
+            f["asesor"] = a.nombre if a else None
+        return filas
+
+    # --------- Compatibilidad con tests antiguos ---------
+    def get_inventario_por_llanta(self, llanta_id: int) -> Inventario | None:
+        """Helper de compatibilidad: algunos tests viejos llamaban a este nombre."""
+        return self.inventarios.get(llanta_id)
+
+
+def _escritura(metodo):
+    """Serializa las escrituras con el lock del store y marca el estado como cambiado."""
+    @wraps(metodo)
+    def envoltura(self, *args, **kwargs):
+        with self._lock:
+            self._version += 1
+            return metodo(self, *args, **kwargs)
+    return envoltura
+
 
 # ==========================
 # Servicio principal
 # ==========================
-class StoreService:
+class StoreService(_Consultas):
     """
     Orquesta la lógica de negocio y usa repos in-memory como persistencia simple.
     Compatible con la interfaz anterior (se añade get_inventario_por_llanta).
+
+    Las escrituras toman un lock del store (una venta se aplica completa o no se
+    ve); los reportes largos deberían leer de `snapshot()`, que no bloquea ventas.
     """
 
     def __init__(self):
@@ -55,8 +310,48 @@ class StoreService:
         self.inventarios = RepoInventarios()
         self.ventas = RepoVentas()
         self.devoluciones = RepoDevoluciones()
+        self.reservas = RepoReservas()
+        self.cotizaciones = RepoCotizaciones()
+        self.sedes = RepoSedes()
+        self.sedes.add(Sede(0, "Principal"))  # id = SEDE_PRINCIPAL
+        self.indice_clientes = IndiceClientes()
+        self.kardex = Kardex()
+        self.reorden = MotorReorden()
+        self.reportes = MotorReportes()
+        self.comisiones = MotorComisiones()
+        self.idempotencia = CacheIdempotencia()
+        self.precios_stock = CachePrecioStock(self._armar_precio_stock, lambda: self.llantas)
+        # Heap (expira, reserva_id) para vencer reservas sin recorrerlas todas
+        self._vencimientos: List[Tuple[datetime, int]] = []
+        # Ídem (vence, cotizacion_id) para cotizaciones
+        self._vencimientos_cotizaciones: List[Tuple[datetime, int]] = []
+        self._lock = threading.RLock()
+        self.archivo: ArchivoVentas | None = None
+        self._archivando = threading.Lock()     # una corrida de archivado a la vez
+        self._version = 0                        # se incrementa en cada escritura
+        self._vista: "VistaStore | None" = None  # último snapshot, reutilizable si no hubo cambios
+        self._snapshot = None                    # lector del snapshot cargado (mmap), ver snapshot.cargar
+        self._generacion = 0                     # de snapshots guardados: cargar abre el más nuevo
+
+    def _antes_de_leer(self):
+        self.expirar_reservas()
+        self.expirar_cotizaciones()
+
+    # --------- Snapshot de lectura ---------
+    def snapshot(self) -> "VistaStore":
+        """
+        Vista inmutable y consistente del estado actual, en O(1): los repos se
+        comparten copy-on-write, así que las escrituras posteriores no la afectan.
+        """
+        with self._lock:
+            self.expirar_reservas()
+            self.expirar_cotizaciones()
+            if self._vista is None or self._vista.version != self._version:
+                self._vista = VistaStore(self)
+            return self._vista
 
     # --------- Altas ---------
+    @_escritura
     def registrar_llanta(self, sku, marca, modelo, medida, precio_venta) -> Llanta:
         ll = Llanta(
             id=0,
@@ -69,82 +364,297 @@ class StoreService:
         )
         return self.llantas.add(ll)
 
+    @_escritura
     def registrar_cliente(self, nombre, documento, telefono=None, email=None) -> Cliente:
-        return self.clientes.add(Cliente(0, nombre, documento, telefono, email))
+        cliente = self.clientes.add(Cliente(0, nombre, documento, telefono, email))
+        self.indice_clientes.agregar_cliente(cliente.id, documento)
+        return cliente
 
+    @_escritura
     def registrar_asesor(self, nombre, documento, email=None) -> Asesor:
         return self.asesores.add(Asesor(0, nombre, documento, email))
 
+    @_escritura
+    def registrar_sede(self, nombre, direccion=None) -> Sede:
+        return self.sedes.add(Sede(0, nombre, direccion))
+
+    def _validar_sede(self, sede_id: int) -> Sede:
+        sede = self.sedes.get(sede_id)
+        if not sede:
+            raise SedeNoEncontrada(f"Sede {sede_id} no existe")
+        return sede
+
     # --------- Inventario ---------
-    def ajustar_inventario(self, llanta_id: int, delta: int, umbral_minimo: int | None = None) -> Inventario:
+    @_escritura
+    def ajustar_inventario(self, llanta_id: int, delta: int, umbral_minimo: int | None = None,
+                           sede_id: int = SEDE_PRINCIPAL) -> Inventario:
         ll = self.llantas.get(llanta_id)
         if not ll:
             raise LlantaNoEncontrada(f"Llanta {llanta_id} no existe")
+        self._validar_sede(sede_id)
 
-        inv = self.inventarios.get(llanta_id)
+        inv = self.inventarios.para_modificar(llanta_id, sede_id)
         if inv is None:
-            # Crear inventario nuevo: requiere delta>0 y umbral_minimo
+            # Crear inventario nuevo: requiere delta>0 y umbral_minimo (el umbral es por sede)
             if delta <= 0 or umbral_minimo is None:
                 raise ValueError("Para crear inventario: delta > 0 y umbral_minimo requerido.")
-            inv = Inventario(llanta_id=llanta_id, cantidad_disponible=delta, umbral_minimo=umbral_minimo)
+            inv = Inventario(llanta_id=llanta_id, cantidad_disponible=delta, umbral_minimo=umbral_minimo,
+                             sede_id=sede_id)
         else:
             nueva = inv.cantidad_disponible + delta
             if nueva < 0:
                 raise ValueError("No puede quedar negativo.")
+            if nueva < inv.cantidad_reservada:
+                raise ValueError(f"No puede quedar por debajo de lo reservado ({inv.cantidad_reservada}).")
             inv.cantidad_disponible = nueva
             if umbral_minimo is not None:
                 inv.umbral_minimo = umbral_minimo
 
-        return self.inventarios.create_or_update(inv)
-
-    def consultar_inventario(self) -> List[dict]:
-        filas: List[dict] = []
-        for inv in self.inventarios.list():
-            ll = self.llantas.get(inv.llanta_id)
-            filas.append({
-                "llanta_id": ll.id,
-                "sku": ll.sku,
-                "marca": ll.marca,
-                "modelo": ll.modelo,
-                "medida": ll.medida,
-                "cantidad": inv.cantidad_disponible,
-                "umbral_minimo": inv.umbral_minimo,
-                "alerta": inv.cantidad_disponible <= inv.umbral_minimo
-            })
-        return filas
-
-    # Reporte: bajo stock (cantidad ≤ umbral)
-    def reporte_bajo_stock(self) -> List[dict]:
-        return [f for f in self.consultar_inventario() if f["cantidad"] <= f["umbral_minimo"]]
+        if delta:
+            self.kardex.registrar(sede_id, llanta_id, AJUSTE, delta)
+        inv = self.inventarios.create_or_update(inv)
+        self.precios_stock.invalidar(llanta_id)
+        return inv
+
+    # --------- Multi-sede ---------
+    @_escritura
+    def transferir_stock(self, llanta_id: int, sede_origen: int, sede_destino: int, cantidad: int):
+        """Mueve unidades entre sedes; valida todo antes de tocar inventario (todo o nada)."""
+        if not self.llantas.get(llanta_id):
+            raise LlantaNoEncontrada(f"Llanta {llanta_id} no existe")
+        self._validar_sede(sede_origen)
+        self._validar_sede(sede_destino)
+        if sede_origen == sede_destino:
+            raise ValueError("La sede de origen y destino deben ser distintas.")
+        if cantidad <= 0:
+            raise ValueError("Cantidad a transferir debe ser > 0")
+        self.expirar_reservas()
+        origen = self.inventarios.para_modificar(llanta_id, sede_origen)
+        if origen is None or origen.disponible < cantidad:
+            raise StockInsuficiente(f"Sede {sede_origen} sin stock de llanta {llanta_id} para {cantidad} uds")
+
+        destino = self.inventarios.para_modificar(llanta_id, sede_destino)
+        if destino is None:
+            # si la sede destino no tenía la llanta, se crea con umbral 0
+            destino = Inventario(llanta_id=llanta_id, cantidad_disponible=0, umbral_minimo=0,
+                                 sede_id=sede_destino)
+        origen.cantidad_disponible -= cantidad
+        destino.cantidad_disponible += cantidad
+        self.inventarios.create_or_update(origen)
+        self.inventarios.create_or_update(destino)
+        # referencia = sede contraparte
+        self.kardex.registrar(sede_origen, llanta_id, TRANSFERENCIA, -cantidad, sede_destino)
+        self.kardex.registrar(sede_destino, llanta_id, TRANSFERENCIA, cantidad, sede_origen)
+        self.precios_stock.invalidar(llanta_id)
+        return origen, destino
+
+    # --------- Reorden ---------
+    def _estado_reorden(self):
+        with self._lock:  # stock y velocidades del mismo instante; se calcula fuera del lock
+            return super()._estado_reorden()
+
+    # --------- Precio y stock para el POS ---------
+    def precio_stock(self, sku: str) -> PrecioStock:
+        """Precio y stock de una llanta por sku, desde la cache (sin lock ni render)."""
+        self._vencer_reservas_pendientes()
+        reg = self.precios_stock.por_sku(sku)
+        if reg is None:
+            raise LlantaNoEncontrada(f"Llanta {sku} no existe")
+        return reg
+
+    def precio_stock_lote(self, skus: List[str]) -> Tuple[dict, List[str]]:
+        """({sku: PrecioStock}, [skus inexistentes]) para muchas llantas en una llamada."""
+        self._vencer_reservas_pendientes()
+        return self.precios_stock.lote(skus)
+
+    def _vencer_reservas_pendientes(self):
+        # Mirar la cabeza del heap sin lock: casi siempre no hay nada que vencer
+        if self._vencimientos and self._vencimientos[0][0] <= now_ts():
+            self.expirar_reservas()
+
+    def _armar_precio_stock(self, llanta_id: int) -> PrecioStock | None:
+        ll = self.llantas.get(llanta_id)
+        if ll is None:
+            return None
+        por_sede = sorted(self.inventarios.por_llanta(llanta_id).items())
+        return PrecioStock(
+            llanta_id=ll.id,
+            sku=ll.sku,
+            marca=ll.marca,
+            modelo=ll.modelo,
+            medida=ll.medida,
+            precio=ll.precio_venta,
+            stock=sum(inv.cantidad_disponible for _, inv in por_sede),
+            disponible=sum(inv.disponible for _, inv in por_sede),
+            por_sede=tuple((sede_id, inv.disponible) for sede_id, inv in por_sede),
+        )
 
-    # --------- Compatibilidad con tests antiguos ---------
-    def get_inventario_por_llanta(self, llanta_id: int) -> Inventario | None:
-        """Helper de compatibilidad: algunos tests viejos llamaban a este nombre."""
-        return self.inventarios.get(llanta_id)
+    # --------- Reportes ---------
+    def reporte_periodo(self, desde=None, hasta=None, procesos: int | None = None) -> dict:
+        """
+        Ventas netas de devoluciones en [desde, hasta): totales, por llanta y por
+        sede. Ver app/reportes.py (columnas incrementales + pool de procesos).
+        """
+        vista = self.snapshot()
+        self.reportes.sincronizar(vista.ventas, vista.devoluciones)
+        rep = self.reportes.calcular(desde, hasta, procesos)
+        for llanta_id, fila in rep["por_llanta"].items():
+            ll = vista.llantas.get(llanta_id)
+            fila["sku"] = ll.sku if ll else None
+        for sede_id, fila in rep["por_sede"].items():
+            sede = vista.sedes.get(sede_id)
+            fila["sede"] = sede.nombre if sede else None
+        return rep
+
+    # --------- Comisiones ---------
+    def _marca_de(self, llanta_id: int) -> str | None:
+        ll = self.llantas.get(llanta_id)
+        return ll.marca if ll else None
+
+    # --------- Reservas ---------
+    @_escritura
+    def reservar_stock(self, llanta_id: int, cantidad: int, ttl_segundos: int = 900,
+                       ahora: datetime | None = None, sede_id: int = SEDE_PRINCIPAL) -> Reserva:
+        """Aparta `cantidad` unidades durante `ttl_segundos` (p. ej. mientras se monta/balancea)."""
+        ahora = ahora or now_ts()
+        self._validar_sede(sede_id)
+        self.expirar_reservas(ahora)
+        if cantidad <= 0:
+            raise ReservaInvalida("Cantidad a reservar debe ser > 0")
+        if ttl_segundos <= 0:
+            raise ReservaInvalida("El TTL de la reserva debe ser > 0")
+        inv = self.inventarios.para_modificar(llanta_id, sede_id)
+        if inv is None or inv.disponible < cantidad:
+            raise StockInsuficiente(f"Llanta {llanta_id} sin stock para reservar {cantidad} uds")
+
+        inv.cantidad_reservada += cantidad
+        self.inventarios.create_or_update(inv)
+        r = self.reservas.add(Reserva(
+            id=0,
+            llanta_id=llanta_id,
+            cantidad=cantidad,
+            creada=ahora,
+            expira=ahora + timedelta(seconds=ttl_segundos),
+            sede_id=sede_id,
+        ))
+        heapq.heappush(self._vencimientos, (r.expira, r.id))
+        self.precios_stock.invalidar(llanta_id)
+        return r
+
+    def _cerrar_reserva(self, r: Reserva, estado: str) -> Reserva:
+        inv = self.inventarios.para_modificar(r.llanta_id, r.sede_id)
+        inv.cantidad_reservada -= r.cantidad
+        self.inventarios.create_or_update(inv)
+        self.precios_stock.invalidar(r.llanta_id)
+        r = self.reservas.para_modificar(r.id)
+        r.estado = estado
+        return r
+
+    def _reserva_activa(self, reserva_id: int) -> Reserva:
+        r = self.reservas.get(reserva_id)
+        if r is None:
+            raise ReservaInvalida(f"Reserva {reserva_id} no existe")
+        if r.estado != "activa":
+            raise ReservaInvalida(f"Reserva {reserva_id} no está activa ({r.estado})")
+        return r
+
+    @_escritura
+    def liberar_reserva(self, reserva_id: int) -> Reserva:
+        self.expirar_reservas()
+        r = self._cerrar_reserva(self._reserva_activa(reserva_id), "liberada")
+        # La entrada del heap queda huérfana; expirar_reservas la descarta al salir.
+        return r
+
+    def expirar_reservas(self, ahora: datetime | None = None) -> List[Reserva]:
+        """
+        Vence las reservas cuyo TTL pasó. Solo mira la cabeza del heap, así que
+        el costo es O(k log n) con k = reservas vencidas (O(1) si no hay ninguna).
+        """
+        ahora = ahora or now_ts()
+        vencidas: List[Reserva] = []
+        with self._lock:
+            while self._vencimientos and self._vencimientos[0][0] <= ahora:
+                _, rid = heapq.heappop(self._vencimientos)
+                r = self.reservas.get(rid)
+                if r is not None and r.estado == "activa":
+                    vencidas.append(self._cerrar_reserva(r, "expirada"))
+            if vencidas:
+                self._version += 1
+        return vencidas
+
+    @_escritura
+    def convertir_reservas(self, reserva_ids: List[int], cliente_id: int, asesor_id: int) -> Venta:
+        """Convierte reservas activas en una venta (todo o nada)."""
+        self.expirar_reservas()
+        if not reserva_ids:
+            raise ReservaInvalida("No hay reservas para convertir")
+        if len(set(reserva_ids)) != len(reserva_ids):
+            raise ReservaInvalida("Reservas repetidas")
+        rs = [self._reserva_activa(rid) for rid in reserva_ids]
+        if len({r.sede_id for r in rs}) != 1:
+            raise ReservaInvalida("Las reservas a convertir deben ser de la misma sede")
+
+        # Se sueltan las unidades apartadas y se venden en el mismo paso;
+        # si la venta falla se vuelven a apartar.
+        rs = [self._cerrar_reserva(r, "convertida") for r in rs]
+        try:
+            venta = self.registrar_venta(cliente_id, asesor_id, [(r.llanta_id, r.cantidad) for r in rs],
+                                         sede_id=rs[0].sede_id)
+        except Exception:
+            for r in rs:
+                self.inventarios.para_modificar(r.llanta_id, r.sede_id).cantidad_reservada += r.cantidad
+                r.estado = "activa"
+                heapq.heappush(self._vencimientos, (r.expira, r.id))
+            self.precios_stock.invalidar(*(r.llanta_id for r in rs))
+            raise
+        for r in rs:
+            r.venta_id = venta.id
+        return venta
 
     # --------- Ventas ---------
-    def registrar_venta(self, cliente_id: int, asesor_id: int, items: List[tuple[int, int]]) -> Venta:
+    def registrar_venta(self, cliente_id: int, asesor_id: int, items: List[tuple[int, int]],
+                        sede_id: int = SEDE_PRINCIPAL, clave_idempotencia: str | None = None) -> Venta:
+        if clave_idempotencia is not None:
+            # Un reintento con la misma clave devuelve la venta original sin re-ejecutar
+            return self.idempotencia.ejecutar(
+                ("venta", clave_idempotencia),
+                (cliente_id, asesor_id, tuple(map(tuple, items)), sede_id),
+                lambda: self._registrar_venta(cliente_id, asesor_id, items, sede_id),
+            )
+        return self._registrar_venta(cliente_id, asesor_id, items, sede_id)
+
+    @_escritura
+    def _registrar_venta(self, cliente_id: int, asesor_id: int, items: List[tuple[int, int]],
+                         sede_id: int) -> Venta:
         if not self.clientes.get(cliente_id):
             raise ValueError("Cliente inválido")
         if not self.asesores.get(asesor_id):
             raise ValueError("Asesor inválido")
+        self._validar_sede(sede_id)
 
-        # Validación previa: stock suficiente para todos los ítems (transaccional)
+        # Validación previa: stock suficiente para todos los ítems (transaccional).
+        # Lo reservado por otras cotizaciones no se puede vender.
+        self._validar_stock(items, sede_id)
+        detalles, total = self._preciar(items)
+        return self._aplicar_venta(cliente_id, asesor_id, detalles, total, sede_id)
+
+    def _validar_stock(self, items, sede_id: int):
+        # Las líneas repetidas de una llanta se validan por la suma
+        pedidos: dict[int, int] = {}
         for ll_id, cant in items:
-            inv = self.inventarios.get(ll_id)
-            if inv is None or inv.cantidad_disponible < cant:
+            pedidos[ll_id] = pedidos.get(ll_id, 0) + cant
+        self.expirar_reservas()
+        for ll_id, cant in pedidos.items():
+            inv = self.inventarios.get(ll_id, sede_id)
+            if inv is None or inv.disponible < cant:
                 raise StockInsuficiente(f"Llanta {ll_id} sin stock para {cant} uds")
 
-        # Descuentos y armado de detalles
+    def _preciar(self, items) -> Tuple[List[VentaDetalle], Decimal]:
+        """Detalles con el precio de venta actual de cada llanta, y el total."""
         detalles: List[VentaDetalle] = []
         total = Decimal("0.00")
-
         for ll_id, cant in items:
             ll = self.llantas.get(ll_id)
-            inv = self.inventarios.get(ll_id)
-            inv.cantidad_disponible -= cant
-            self.inventarios.create_or_update(inv)
-
             # subtotal = cantidad * precio
             subtotal = to_money(Decimal(cant) * ll.precio_venta)
             detalles.append(VentaDetalle(
@@ -154,29 +664,145 @@ class StoreService:
                 subtotal=subtotal
             ))
             total += subtotal
+        return detalles, to_money(total)
+
+    def _aplicar_venta(self, cliente_id: int, asesor_id: int, detalles: List[VentaDetalle],
+                       total: Decimal, sede_id: int) -> Venta:
+        """Descuenta stock y registra la venta con detalles ya validados y con precio."""
+        for d in detalles:
+            inv = self.inventarios.para_modificar(d.llanta_id, sede_id)
+            inv.cantidad_disponible -= d.cantidad
+            self.inventarios.create_or_update(inv)
 
         venta = Venta(
             id=0,
             cliente_id=cliente_id,
             asesor_id=asesor_id,
             fecha=now_ts(),
-            total=to_money(total)
+            total=total,
+            sede_id=sede_id
         )
         venta = self.ventas.add(venta)
         # Guardamos detalles adheridos en memoria (no hay BD)
         venta._detalles = detalles  # atributo auxiliar
+        self.indice_clientes.agregar_venta(cliente_id, venta.id)
+        for d in detalles:
+            self.kardex.registrar(sede_id, d.llanta_id, VENTA, -d.cantidad, venta.id, venta.fecha)
+            self.reorden.registrar(d.llanta_id, d.cantidad, venta.fecha)
+        self.comisiones.registrar_venta(venta, detalles, self._marca_de)
+        self.precios_stock.invalidar(*(d.llanta_id for d in detalles))
 
         return venta
 
-    def listar_ventas(self) -> List[Tuple[Venta, List[VentaDetalle]]]:
-        out: List[Tuple[Venta, List[VentaDetalle]]] = []
-        for v in self.ventas.list():
-            dets = getattr(v, "_detalles", [])
-            out.append((v, dets))
-        return out
+    # --------- Cotizaciones ---------
+    @_escritura
+    def cotizar(self, cliente_id: int, asesor_id: int, items: List[tuple[int, int]], dias_validez: int = 15,
+                sede_id: int = SEDE_PRINCIPAL, ahora: datetime | None = None) -> Cotizacion:
+        """
+        Cotización con el precio de venta vigente de cada llanta, válida por
+        `dias_validez` días. No aparta stock (para eso están las reservas).
+        """
+        ahora = ahora or now_ts()
+        if not self.clientes.get(cliente_id):
+            raise ValueError("Cliente inválido")
+        if not self.asesores.get(asesor_id):
+            raise ValueError("Asesor inválido")
+        self._validar_sede(sede_id)
+        if not items:
+            raise CotizacionInvalida("La cotización no tiene ítems")
+        if dias_validez <= 0:
+            raise CotizacionInvalida("La validez de la cotización debe ser > 0 días")
+        # Una línea por llanta: las repetidas se suman
+        lineas: dict[int, int] = {}
+        for ll_id, cant in items:
+            if not self.llantas.get(ll_id):
+                raise LlantaNoEncontrada(f"Llanta {ll_id} no existe")
+            if cant <= 0:
+                raise CotizacionInvalida("Cantidad a cotizar debe ser > 0")
+            lineas[ll_id] = lineas.get(ll_id, 0) + cant
+        self.expirar_cotizaciones(ahora)
+
+        detalles, total = self._preciar(list(lineas.items()))
+        c = self.cotizaciones.add(Cotizacion(
+            id=0,
+            cliente_id=cliente_id,
+            asesor_id=asesor_id,
+            creada=ahora,
+            vence=ahora + timedelta(days=dias_validez),
+            total=total,
+            detalles=detalles,
+            sede_id=sede_id,
+        ))
+        heapq.heappush(self._vencimientos_cotizaciones, (c.vence, c.id))
+        return c
+
+    def _cotizacion_vigente(self, cotizacion_id: int) -> Cotizacion:
+        c = self.cotizaciones.get(cotizacion_id)
+        if c is None:
+            raise CotizacionInvalida(f"Cotización {cotizacion_id} no existe")
+        if c.estado != "vigente":
+            raise CotizacionInvalida(f"Cotización {cotizacion_id} no está vigente ({c.estado})")
+        return c
+
+    def _cerrar_cotizacion(self, c: Cotizacion, estado: str) -> Cotizacion:
+        c = self.cotizaciones.para_modificar(c.id)
+        c.estado = estado
+        self.cotizaciones.cerrar(c.id)
+        # La entrada del heap queda huérfana; expirar_cotizaciones la descarta al salir.
+        return c
+
+    @_escritura
+    def convertir_cotizacion(self, cotizacion_id: int, asesor_id: int | None = None,
+                             ahora: datetime | None = None) -> Venta:
+        """
+        Venta a partir de una cotización vigente, al precio cotizado: reutiliza
+        sus líneas ya validadas y con precio, solo se revisa el stock (que no se
+        apartó al cotizar). Por defecto la venta queda a nombre del asesor que cotizó.
+        """
+        self.expirar_cotizaciones(ahora)
+        c = self._cotizacion_vigente(cotizacion_id)
+        asesor_id = c.asesor_id if asesor_id is None else asesor_id
+        if not self.asesores.get(asesor_id):
+            raise ValueError("Asesor inválido")
+        self._validar_stock([(d.llanta_id, d.cantidad) for d in c.detalles], c.sede_id)
+
+        venta = self._aplicar_venta(c.cliente_id, asesor_id, list(c.detalles), c.total, c.sede_id)
+        c = self._cerrar_cotizacion(c, "convertida")
+        c.venta_id = venta.id
+        return venta
+
+    @_escritura
+    def anular_cotizacion(self, cotizacion_id: int) -> Cotizacion:
+        self.expirar_cotizaciones()
+        return self._cerrar_cotizacion(self._cotizacion_vigente(cotizacion_id), "anulada")
+
+    def expirar_cotizaciones(self, ahora: datetime | None = None) -> List[Cotizacion]:
+        """Vence las cotizaciones cuya validez pasó; igual que expirar_reservas, O(k log n)."""
+        ahora = ahora or now_ts()
+        vencidas: List[Cotizacion] = []
+        with self._lock:
+            while self._vencimientos_cotizaciones and self._vencimientos_cotizaciones[0][0] <= ahora:
+                _, cid = heapq.heappop(self._vencimientos_cotizaciones)
+                c = self.cotizaciones.get(cid)
+                if c is not None and c.estado == "vigente":
+                    vencidas.append(self._cerrar_cotizacion(c, "vencida"))
+            if vencidas:
+                self._version += 1
+        return vencidas
 
     # --------- Devoluciones ---------
-    def registrar_devolucion(self, venta_id: int, items: List[tuple[int, int]], motivo: str) -> Devolucion:
+    def registrar_devolucion(self, venta_id: int, items: List[tuple[int, int]], motivo: str,
+                             clave_idempotencia: str | None = None) -> Devolucion:
+        if clave_idempotencia is not None:
+            return self.idempotencia.ejecutar(
+                ("devolucion", clave_idempotencia),
+                (venta_id, tuple(map(tuple, items)), motivo),
+                lambda: self._registrar_devolucion(venta_id, items, motivo),
+            )
+        return self._registrar_devolucion(venta_id, items, motivo)
+
+    @_escritura
+    def _registrar_devolucion(self, venta_id: int, items: List[tuple[int, int]], motivo: str) -> Devolucion:
         v = self.ventas.get(venta_id)
         if not v:
             raise VentaNoEncontrada(f"Venta {venta_id} no existe")
@@ -196,14 +822,14 @@ class StoreService:
                     f"No puede devolver {cant_dev} si solo se vendió {vendidos.get(ll_id,0)} (llanta {ll_id})"
                 )
 
-        # Reingresar stock + armar detalles de devolución
+        # Reingresar stock (en la sede donde se vendió) + armar detalles de devolución
         detalles: List[DevolucionDetalle] = []
         for ll_id, cant in items:
             ll = self.llantas.get(ll_id)
-            inv = self.inventarios.get(ll_id)
+            inv = self.inventarios.para_modificar(ll_id, v.sede_id)
             if inv is None:
                 # si no había inventario registrado, créalo con umbral 0
-                inv = Inventario(llanta_id=ll_id, cantidad_disponible=0, umbral_minimo=0)
+                inv = Inventario(llanta_id=ll_id, cantidad_disponible=0, umbral_minimo=0, sede_id=v.sede_id)
 
             inv.cantidad_disponible += cant
             self.inventarios.create_or_update(inv)
@@ -223,14 +849,116 @@ class StoreService:
             motivo=motivo.strip(),
             detalles=detalles
         )
-        return self.devoluciones.add(dev)
-
-    def listar_devoluciones(self) -> List[Devolucion]:
-        return self.devoluciones.list()
+        dev = self.devoluciones.add(dev)
+        self.indice_clientes.agregar_devolucion(v.id, dev.id)
+        for d in detalles:
+            self.kardex.registrar(v.sede_id, d.llanta_id, DEVOLUCION, d.cantidad, dev.id, dev.fecha)
+            self.reorden.registrar(d.llanta_id, -d.cantidad, dev.fecha)
+        self.comisiones.registrar_devolucion(dev, v, getattr(v, "_detalles", []), self._marca_de)
+        self.precios_stock.invalidar(*(d.llanta_id for d in detalles))
+        return dev
+
+    # --------- Archivo de ventas viejas ---------
+    def archivar_ventas(self, antes_de: datetime, directorio: str = "archivo") -> dict:
+        """
+        Mueve a un segmento comprimido en `directorio` las ventas con fecha
+        anterior a `antes_de`, junto con sus devoluciones (ver app/archivo.py).
+        Siguen visibles para listar_ventas, devoluciones e historial de cliente,
+        que las leen del disco cuando hace falta.
+
+        Elegir y escribir el segmento no toma el lock del store; solo el paso
+        final (sacar los registros de memoria) lo toma, y cuesta O(archivados).
+        Las ventas se numeran en orden de fecha: se recorren desde la más vieja
+        y se corta en la primera que no entra. Las devoluciones que llegaron
+        después de archivar su venta se archivan en la corrida siguiente.
+        """
+        with self._archivando:
+            if self.archivo is None:
+                self.archivo = ArchivoVentas(directorio)
+            elif os.path.abspath(self.archivo.directorio) != os.path.abspath(directorio):
+                raise ValueError(f"El store ya archiva en {self.archivo.directorio}")
+            archivo = self.archivo
+
+            ventas, devoluciones = [], []      # a escribir en el segmento nuevo
+            ids_ventas, ids_devoluciones = [], []  # a sacar de memoria
+            for venta_id in self.ventas.ids_en_memoria():
+                v = self.ventas.get(venta_id)
+                if v.fecha >= antes_de:
+                    break
+                ids_ventas.append(venta_id)
+                if venta_id not in archivo.ventas:  # p. ej. ya archivada antes de recargar un snapshot
+                    ventas.append(v)
+                for dev_id in self.indice_clientes.devoluciones_de(venta_id):
+                    ids_devoluciones.append(dev_id)
+                    if dev_id not in archivo.devoluciones:
+                        devoluciones.append(self.devoluciones.get(dev_id))
+            # Devoluciones registradas después de archivar su venta en una corrida anterior
+            recogidas = set(ids_devoluciones)
+            for dev_id in self.devoluciones.ids_en_memoria():
+                if dev_id in recogidas:
+                    continue
+                dev = self.devoluciones.get(dev_id)
+                if dev.venta_id in archivo.ventas:
+                    ids_devoluciones.append(dev_id)
+                    if dev_id not in archivo.devoluciones:
+                        devoluciones.append(dev)
+
+            segmento = archivo.escribir(ventas, devoluciones) if ventas or devoluciones else None
+            with self._lock:
+                if segmento is not None:
+                    archivo.publicar(segmento)
+                self.ventas.archivar(archivo.ventas, ids_ventas)
+                self.devoluciones.archivar(archivo.devoluciones, ids_devoluciones)
+                self._version += 1  # las vistas nuevas ven el archivo (lo usa dump)
+        return {
+            "ventas": len(ids_ventas),
+            "devoluciones": len(ids_devoluciones),
+            "segmento": segmento.path if segmento is not None else None,
+        }
+
+    # --------- Snapshot ---------
+    def dump(self, path: str):
+        """
+        Guarda el estado en un snapshot binario por columnas (ver app/snapshot.py).
+        Bajo el lock solo se toma la vista (O(1)); codificar y escribir el
+        archivo corre fuera, así las ventas no esperan al disco. Sí excluye al
+        archivado, para que lo que está en memoria y el archivo no cambien a medias.
+
+        Si `path` es el snapshot que este store tiene mapeado, se escribe en
+        `<path>.alt` (y viceversa); `load(path)` abre el más nuevo de los dos.
+        """
+        with self._archivando:
+            mapeado = self._snapshot.path if self._snapshot is not None else None
+            destino, viejo = snapshot.destino(path, mapeado)
+            self._generacion += 1
+            snapshot.guardar(self.snapshot(), destino, self._generacion)
+            if viejo is not None and os.path.exists(viejo):
+                os.remove(viejo)  # de otra corrida: no debe ganarle al recién escrito
+
+    @classmethod
+    def load(cls, path: str) -> "StoreService":
+        """
+        Abre un snapshot con mmap. Ventas y devoluciones se decodifican recién
+        cuando se accede a ellas, así que abrir un historial grande es inmediato.
+        """
+        return snapshot.cargar(cls(), path)
+
+    # --------- Estadísticas ---------
+    def estadisticas(self) -> dict:
+        return {
+            "llantas": len(self.llantas),
+            "ventas": len(self.ventas),
+            "devoluciones": len(self.devoluciones),
+            "ventas_archivadas": len(self.archivo.ventas) if self.archivo is not None else 0,
+            "movimientos_kardex": len(self.kardex),
+            "idempotencia": self.idempotencia.estadisticas(),
+            "precios_stock": self.precios_stock.estadisticas(),
+        }
 
     # --------- Precio ---------
+    @_escritura
     def actualizar_precio_llanta(self, llanta_id: int, nuevo_precio) -> Llanta:
-        ll = self.llantas.get(llanta_id)
+        ll = self.llantas.para_modificar(llanta_id)
         if not ll:
             raise LlantaNoEncontrada(f"Llanta {llanta_id} no existe")
         anterior = ll.precio_venta
@@ -241,10 +969,37 @@ class StoreService:
             "nuevo": ll.precio_venta
         })
         self.llantas.set(ll.id, ll)
+        self.precios_stock.invalidar(ll.id)
         return ll
 
-    def historial_precios(self, llanta_id: int) -> List[dict]:
-        ll = self.llantas.get(llanta_id)
-        if not ll:
-            raise LlantaNoEncontrada(f"Llanta {llanta_id} no existe")
-        return ll.precio_historial
+
+# ==========================
+# Vista de solo lectura
+# ==========================
+class VistaStore(_Consultas):
+    """
+    Estado del store congelado en el momento de `StoreService.snapshot()`.
+    Ofrece las mismas consultas (consultar_inventario, listar_ventas, kardex,
+    reorden, comisiones, ...) sin tomar locks: nunca bloquea ventas ni ve una
+    venta a medio aplicar.
+    """
+
+    def __init__(self, store: StoreService):
+        self.version = store._version
+        self.fecha = now_ts()
+        self.llantas = store.llantas.vista()
+        self.clientes = store.clientes.vista()
+        self.asesores = store.asesores.vista()
+        self.sedes = store.sedes.vista()
+        self.inventarios = store.inventarios.vista()
+        self.ventas = store.ventas.vista()
+        self.devoluciones = store.devoluciones.vista()
+        self.reservas = store.reservas.vista()
+        self.cotizaciones = store.cotizaciones.vista()
+        self.indice_clientes = store.indice_clientes.vista(
+            store.clientes._auto - 1, store.ventas._auto - 1, store.devoluciones._auto - 1
+        )
+        self.kardex = store.kardex.vista()
+        self.reorden = store.reorden.vista()
+        self.comisiones = store.comisiones.vista()
+        self.archivo = store.archivo
@@ -0,0 +1,499 @@
+# app/snapshot.py
+"""
+Snapshot binario compacto del StoreService.
+
+Formato (todo en orden de bytes nativo, secciones alineadas a 8 bytes):
+
+    b"SRVTSNAP" | secciones... | índice JSON | u64 offset índice | u32 largo | b"SRVTSNAP"
+
+El índice JSON (al final, así las secciones se escriben en una sola pasada)
+lista cada sección como {nombre: [offset, largo, typecode]}.
+Cada tabla se guarda por columnas de ancho fijo ("ventas.id", "ventas.total",
+...) y los textos van a una tabla de strings común ("str.offs" + "str.blob");
+las columnas de texto guardan el índice del string (-1 = None).
+
+Al cargar se hace mmap del archivo y las columnas se leen como memoryview, sin
+copiar. Ventas y devoluciones se decodifican recién al accederlas (RepoPerezoso);
+los catálogos chicos (llantas, clientes, asesores, sedes, inventario) se
+decodifican al abrir, igual que las cotizaciones (duran días). Los índices del
+historial de clientes se guardan como columnas y se usan mapeados, sin
+reconstruirlos. Kardex, velocidades de reorden y acumulados de comisiones se
+copian a sus estructuras. El historial de reglas de comisión (pocas entradas)
+va en el índice JSON.
+
+Un snapshot que el store tiene mapeado no se reemplaza (en Windows os.replace
+falla sobre un archivo mapeado; en POSIX el inodo viejo queda ocupando disco):
+se escribe en el alterno, `<path>.alt`, y al cargar se abre el más nuevo de los
+dos según el contador "generacion" del índice (ver `destino`).
+
+Las ventas ya archivadas (app/archivo.py) no se repiten: el índice JSON guarda
+el directorio del archivo y al cargar se vuelve a abrir.
+
+No se guardan reservas activas (son retenciones de minutos) ni la cache de
+idempotencia.
+"""
+import json
+import mmap
+import os
+import sys
+from array import array
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+
+from .models import (
+    Llanta, Inventario, Cliente, Asesor, Sede,
+    Venta, VentaDetalle, Devolucion, DevolucionDetalle, Cotizacion
+)
+from .repositories import (
+    RepoLlantas, RepoClientes, RepoAsesores, RepoSedes, RepoInventarios, RepoPerezoso,
+    RepoCotizaciones, IndiceClientes
+)
+from .kardex import Kardex, _Serie
+from .comisiones import ReglasComision
+from .archivo import ArchivoVentas
+from .versionado import DictVersionado
+
+MAGIC = b"SRVTSNAP"
+VERSION = 1
+
+# Acumulados de comisiones, en el orden de app/comisiones.py
+_COLS_COMISIONES = ("ventas", "unidades", "volumen", "comision")
+
+_EPOCH = datetime(1970, 1, 1)
+_US = timedelta(microseconds=1)
+
+
+class SnapshotInvalido(Exception):
+    """El archivo no es un snapshot válido o es de otra versión/arquitectura."""
+    pass
+
+
+def _us(fecha: datetime) -> int:
+    return (fecha - _EPOCH) // _US
+
+def _fecha(us: int) -> datetime:
+    return _EPOCH + timedelta(microseconds=us)
+
+def _centavos(valor: Decimal) -> int:
+    return int(valor * 100)
+
+def _dinero(centavos: int) -> Decimal:
+    return Decimal(centavos).scaleb(-2)
+
+
+# ==========================
+# Escritura
+# ==========================
+class _Escritor:
+    def __init__(self):
+        self.columnas: Dict[str, array] = {}
+        self._strings: Dict[str, int] = {}
+        self._offs = array("q", [0])
+        self._blob = bytearray()
+        self.meta: dict = {}  # datos sueltos que van en el índice JSON
+
+    def col(self, nombre: str, typecode: str) -> array:
+        return self.columnas.setdefault(nombre, array(typecode))
+
+    def s(self, texto) -> int:
+        if texto is None:
+            return -1
+        idx = self._strings.get(texto)
+        if idx is None:
+            idx = self._strings[texto] = len(self._offs) - 1
+            self._blob += texto.encode("utf-8")
+            self._offs.append(len(self._blob))
+        return idx
+
+    def escribir(self, path: str):
+        self.columnas["str.offs"] = self._offs
+        self.columnas["str.blob"] = array("B", self._blob)
+        indice = {"version": VERSION, "byteorder": sys.byteorder, "meta": self.meta, "secciones": {}}
+
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(MAGIC)
+            for nombre, col in self.columnas.items():
+                f.write(b"\0" * (_alinear(f.tell()) - f.tell()))
+                indice["secciones"][nombre] = [f.tell(), len(col) * col.itemsize, col.typecode]
+                col.tofile(f)
+            pos_indice = f.tell()
+            datos = json.dumps(indice, separators=(",", ":")).encode()
+            f.write(datos)
+            f.write(pos_indice.to_bytes(8, "little"))
+            f.write(len(datos).to_bytes(4, "little"))
+            f.write(MAGIC)
+        os.replace(tmp, path)  # nunca deja un snapshot a medio escribir
+
+
+def _alinear(n: int) -> int:
+    return (n + 7) & ~7
+
+
+def ruta_alterna(path: str) -> str:
+    return f"{path}.alt"
+
+
+def destino(path: str, mapeado: Optional[str]) -> Tuple[str, Optional[str]]:
+    """
+    (archivo a escribir, archivo que queda viejo y se puede borrar) entre
+    `path` y su alterno, sin tocar nunca `mapeado` (el que el store tiene abierto).
+    """
+    alterno = ruta_alterna(path)
+    if mapeado is not None and os.path.abspath(mapeado) == os.path.abspath(path):
+        return alterno, None
+    if mapeado is not None and os.path.abspath(mapeado) == os.path.abspath(alterno):
+        return path, None
+    return path, alterno
+
+
+def guardar(store, path: str, generacion: int = 0):
+    """
+    Escribe el snapshot de `store`, que puede ser el StoreService o una vista
+    (VistaStore): StoreService.dump pasa una vista y escribe sin el lock.
+    """
+    w = _Escritor()
+    w.meta["generacion"] = generacion
+    if store.archivo is not None:
+        # Lo archivado ya está en disco: el snapshot guarda solo dónde
+        w.meta["archivo"] = os.path.abspath(store.archivo.directorio)
+
+    for ll in store.llantas.list():
+        w.col("llantas.id", "q").append(ll.id)
+        w.col("llantas.sku", "i").append(w.s(ll.sku))
+        w.col("llantas.marca", "i").append(w.s(ll.marca))
+        w.col("llantas.modelo", "i").append(w.s(ll.modelo))
+        w.col("llantas.medida", "i").append(w.s(ll.medida))
+        w.col("llantas.precio", "q").append(_centavos(ll.precio_venta))
+        for h in ll.precio_historial:
+            w.col("precios.llanta_id", "q").append(ll.id)
+            w.col("precios.fecha", "q").append(_us(h["fecha"]))
+            w.col("precios.anterior", "q").append(_centavos(h["anterior"]))
+            w.col("precios.nuevo", "q").append(_centavos(h["nuevo"]))
+
+    for c in store.clientes.list():
+        w.col("clientes.id", "q").append(c.id)
+        w.col("clientes.nombre", "i").append(w.s(c.nombre))
+        w.col("clientes.documento", "i").append(w.s(c.documento))
+        w.col("clientes.telefono", "i").append(w.s(c.telefono))
+        w.col("clientes.email", "i").append(w.s(c.email))
+
+    for a in store.asesores.list():
+        w.col("asesores.id", "q").append(a.id)
+        w.col("asesores.nombre", "i").append(w.s(a.nombre))
+        w.col("asesores.documento", "i").append(w.s(a.documento))
+        w.col("asesores.email", "i").append(w.s(a.email))
+
+    for sede in store.sedes.list():
+        w.col("sedes.id", "q").append(sede.id)
+        w.col("sedes.nombre", "i").append(w.s(sede.nombre))
+        w.col("sedes.direccion", "i").append(w.s(sede.direccion))
+
+    for inv in store.inventarios.list():
+        w.col("inventario.sede_id", "q").append(inv.sede_id)
+        w.col("inventario.llanta_id", "q").append(inv.llanta_id)
+        w.col("inventario.cantidad", "q").append(inv.cantidad_disponible)
+        w.col("inventario.umbral", "q").append(inv.umbral_minimo)
+
+    for tabla, detalle, objetos, det_attr in (
+        ("ventas", "ventas_det", store.ventas.list_en_memoria(), "_detalles"),
+        ("devoluciones", "devoluciones_det", store.devoluciones.list_en_memoria(), "detalles"),
+    ):
+        w.col(f"{tabla}.id", "q")
+        inicio = 0
+        for o in objetos:
+            dets = getattr(o, det_attr, [])
+            w.col(f"{tabla}.id", "q").append(o.id)
+            w.col(f"{tabla}.fecha", "q").append(_us(o.fecha))
+            w.col(f"{tabla}.det_inicio", "q").append(inicio)
+            w.col(f"{tabla}.det_n", "q").append(len(dets))
+            if tabla == "ventas":
+                w.col("ventas.cliente_id", "q").append(o.cliente_id)
+                w.col("ventas.asesor_id", "q").append(o.asesor_id)
+                w.col("ventas.sede_id", "q").append(o.sede_id)
+                w.col("ventas.total", "q").append(_centavos(o.total))
+            else:
+                w.col("devoluciones.venta_id", "q").append(o.venta_id)
+                w.col("devoluciones.motivo", "i").append(w.s(o.motivo))
+            for d in dets:
+                w.col(f"{detalle}.llanta_id", "q").append(d.llanta_id)
+                w.col(f"{detalle}.cantidad", "q").append(d.cantidad)
+                w.col(f"{detalle}.precio", "q").append(_centavos(d.precio_unitario))
+                w.col(f"{detalle}.subtotal", "q").append(_centavos(d.subtotal))
+            inicio += len(dets)
+
+    inicio = 0
+    for c in store.cotizaciones.list():
+        w.col("cotizaciones.id", "q").append(c.id)
+        w.col("cotizaciones.cliente_id", "q").append(c.cliente_id)
+        w.col("cotizaciones.asesor_id", "q").append(c.asesor_id)
+        w.col("cotizaciones.sede_id", "q").append(c.sede_id)
+        w.col("cotizaciones.creada", "q").append(_us(c.creada))
+        w.col("cotizaciones.vence", "q").append(_us(c.vence))
+        w.col("cotizaciones.total", "q").append(_centavos(c.total))
+        w.col("cotizaciones.estado", "i").append(w.s(c.estado))
+        w.col("cotizaciones.venta_id", "q").append(-1 if c.venta_id is None else c.venta_id)
+        w.col("cotizaciones.det_inicio", "q").append(inicio)
+        w.col("cotizaciones.det_n", "q").append(len(c.detalles))
+        for d in c.detalles:
+            w.col("cotizaciones_det.llanta_id", "q").append(d.llanta_id)
+            w.col("cotizaciones_det.cantidad", "q").append(d.cantidad)
+            w.col("cotizaciones_det.precio", "q").append(_centavos(d.precio_unitario))
+            w.col("cotizaciones_det.subtotal", "q").append(_centavos(d.subtotal))
+        inicio += len(c.detalles)
+
+    _escribir_indice(w, store.indice_clientes.columnas())
+    _escribir_kardex(w, store.kardex._series)
+    reorden = store.reorden.copia()
+    w.columnas["reorden.v"] = reorden._v
+    w.columnas["reorden.t"] = reorden._t
+    _escribir_comisiones(w, store.comisiones._acumulados)
+    w.meta["reglas_comision"] = [_reglas_json(desde, reglas) for desde, reglas in store.comisiones._reglas]
+
+    w.escribir(path)
+
+
+def _escribir_indice(w: _Escritor, columnas: dict):
+    """Índices del historial de clientes (ver IndiceClientes.columnas), para mapearlos al cargar."""
+    for nombre, (claves, inicios, ids) in columnas.items():
+        w.columnas[f"indice.{nombre}.clave"] = claves
+        w.columnas[f"indice.{nombre}.inicio"] = inicios
+        w.columnas[f"indice.{nombre}.id"] = ids
+
+
+def _escribir_kardex(w: _Escritor, series):
+    """Series {(sede_id, llanta_id): (_Serie, largo)} concatenadas, con el inicio de cada una."""
+    kx_sede, kx_llanta, kx_inicio = w.col("kardex.sede_id", "q"), w.col("kardex.llanta_id", "q"), w.col("kardex.inicio", "q")
+    ts, tipos, cants, saldos, refs = (w.col("kardex.ts", "d"), w.col("kardex.tipo", "b"), w.col("kardex.cantidad", "q"),
+                                      w.col("kardex.saldo", "q"), w.col("kardex.ref", "q"))
+    for (sede_id, llanta_id), (serie, n) in series.items():
+        kx_sede.append(sede_id)
+        kx_llanta.append(llanta_id)
+        kx_inicio.append(len(ts))
+        ts.extend(serie.ts[:n])
+        tipos.extend(serie.tipos[:n])
+        cants.extend(serie.cantidades[:n])
+        saldos.extend(serie.saldos[:n])
+        refs.extend(serie.refs[:n])
+    kx_inicio.append(len(ts))
+
+
+def _escribir_comisiones(w: _Escritor, acumulados):
+    for periodo, por_asesor in acumulados.items():
+        for asesor_id, acc in por_asesor.items():
+            w.col("comisiones.periodo", "i").append(w.s(periodo))
+            w.col("comisiones.asesor_id", "q").append(asesor_id)
+            for c, valor in zip(_COLS_COMISIONES, acc):
+                w.col(f"comisiones.{c}", "q").append(valor)
+
+
+def _reglas_json(desde: datetime, reglas: ReglasComision) -> dict:
+    return {
+        "desde": desde.isoformat(),
+        "base": str(reglas.porcentaje_base),
+        "por_marca": {marca: str(p) for marca, p in reglas.porcentaje_por_marca.items()},
+        "tramos": [[str(minimo), str(p)] for minimo, p in reglas.tramos],
+    }
+
+def _reglas_de_json(d: dict):
+    return datetime.fromisoformat(d["desde"]), ReglasComision(
+        porcentaje_base=Decimal(d["base"]),
+        porcentaje_por_marca={marca: Decimal(p) for marca, p in d["por_marca"].items()},
+        tramos=[(Decimal(minimo), Decimal(p)) for minimo, p in d["tramos"]],
+    )
+
+
+# ==========================
+# Lectura
+# ==========================
+class _Lector:
+    def __init__(self, path: str):
+        self.path = path
+        self._f = open(path, "rb")
+        try:
+            self.mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # archivo vacío
+            self._f.close()
+            raise SnapshotInvalido(f"{path} está vacío")
+        m = len(MAGIC)
+        if len(self.mm) < 2 * m + 12 or self.mm[:m] != MAGIC or self.mm[-m:] != MAGIC:
+            self.mm.close()
+            self._f.close()
+            raise SnapshotInvalido(f"{path} no es un snapshot de la serviteca")
+        fin = len(self.mm) - m
+        inicio = int.from_bytes(self.mm[fin - 12:fin - 4], "little")
+        largo = int.from_bytes(self.mm[fin - 4:fin], "little")
+        indice = json.loads(self.mm[inicio:inicio + largo])
+        if indice.get("version") != VERSION or indice.get("byteorder") != sys.byteorder:
+            raise SnapshotInvalido("Snapshot de otra versión o arquitectura")
+        self._secciones = indice["secciones"]
+        self.meta: dict = indice.get("meta", {})
+        self._vista = memoryview(self.mm)
+        self._offs = self.col("str.offs")
+        self._blob = self.col("str.blob")
+
+    def cerrar(self):
+        """Suelta el mmap (solo si nadie tomó columnas de este lector)."""
+        for vista in (self._offs, self._blob, self._vista):
+            vista.release()
+        self.mm.close()
+        self._f.close()
+
+    def col(self, nombre: str):
+        """Columna como memoryview tipada sobre el mmap (sin copiar)."""
+        if nombre not in self._secciones:
+            return memoryview(b"").cast("q")
+        pos, largo, typecode = self._secciones[nombre]
+        return self._vista[pos:pos + largo].cast(typecode)
+
+    def tiene(self, nombre: str) -> bool:
+        return nombre in self._secciones
+
+    def s(self, idx: int):
+        if idx < 0:
+            return None
+        return bytes(self._blob[self._offs[idx]:self._offs[idx + 1]]).decode("utf-8")
+
+
+def cargar(store, path: str):
+    """
+    Reemplaza el contenido de `store` por el del snapshot en `path` (o en su
+    alterno, si es más nuevo).
+    """
+    rutas = [p for p in (path, ruta_alterna(path)) if os.path.exists(p)] or [path]
+    lectores = [_Lector(p) for p in rutas]
+    r = max(lectores, key=lambda lector: lector.meta.get("generacion", 0))
+    for otro in lectores:
+        if otro is not r:
+            otro.cerrar()
+    store._snapshot = r  # mantiene vivo el mmap mientras el store lo use
+    store._generacion = r.meta.get("generacion", 0)
+
+    historial: Dict[int, List[dict]] = {}
+    for ll_id, f, ant, nue in zip(r.col("precios.llanta_id"), r.col("precios.fecha"),
+                                  r.col("precios.anterior"), r.col("precios.nuevo")):
+        historial.setdefault(ll_id, []).append({"fecha": _fecha(f), "anterior": _dinero(ant), "nuevo": _dinero(nue)})
+
+    store.llantas = _repo_eager(RepoLlantas(), [
+        Llanta(i, r.s(sku), r.s(marca), r.s(modelo), r.s(medida), _dinero(precio), historial.get(i, []))
+        for i, sku, marca, modelo, medida, precio in zip(
+            r.col("llantas.id"), r.col("llantas.sku"), r.col("llantas.marca"),
+            r.col("llantas.modelo"), r.col("llantas.medida"), r.col("llantas.precio"))
+    ])
+    store.clientes = _repo_eager(RepoClientes(), [
+        Cliente(i, r.s(n), r.s(d), r.s(t), r.s(e))
+        for i, n, d, t, e in zip(r.col("clientes.id"), r.col("clientes.nombre"), r.col("clientes.documento"),
+                                 r.col("clientes.telefono"), r.col("clientes.email"))
+    ])
+    store.asesores = _repo_eager(RepoAsesores(), [
+        Asesor(i, r.s(n), r.s(d), r.s(e))
+        for i, n, d, e in zip(r.col("asesores.id"), r.col("asesores.nombre"),
+                              r.col("asesores.documento"), r.col("asesores.email"))
+    ])
+    store.sedes = _repo_eager(RepoSedes(), [
+        Sede(i, r.s(n), r.s(d)) for i, n, d in zip(r.col("sedes.id"), r.col("sedes.nombre"), r.col("sedes.direccion"))
+    ])
+    store.inventarios = RepoInventarios()
+    for sede_id, ll_id, cant, umbral in zip(r.col("inventario.sede_id"), r.col("inventario.llanta_id"),
+                                            r.col("inventario.cantidad"), r.col("inventario.umbral")):
+        store.inventarios.create_or_update(Inventario(ll_id, cant, umbral, sede_id=sede_id))
+
+    detalles = _lector_detalles(r, "cotizaciones_det", VentaDetalle)
+    store.cotizaciones = _repo_eager(RepoCotizaciones(), [
+        Cotizacion(i, cli, ase, _fecha(cr), _fecha(ve), _dinero(tot), detalles(ini, n), sede, r.s(est),
+                   None if vid < 0 else vid)
+        for i, cli, ase, sede, cr, ve, tot, est, vid, ini, n in zip(
+            *(r.col(f"cotizaciones.{c}") for c in ("id", "cliente_id", "asesor_id", "sede_id", "creada", "vence",
+                                                   "total", "estado", "venta_id", "det_inicio", "det_n")))
+    ])
+    store._vencimientos_cotizaciones = sorted((c.vence, c.id) for c in store.cotizaciones.vigentes())
+
+    archivo = None
+    directorio = r.meta.get("archivo")
+    if directorio is not None:
+        if not os.path.isdir(directorio):
+            raise SnapshotInvalido(f"Falta el archivo de ventas {directorio}")
+        archivo = store.archivo = ArchivoVentas(directorio)
+    store.ventas = RepoPerezoso(r.col("ventas.id"), _decodificador_ventas(r),
+                                archivo.ventas if archivo else None)
+    store.devoluciones = RepoPerezoso(r.col("devoluciones.id"), _decodificador_devoluciones(r),
+                                      archivo.devoluciones if archivo else None)
+
+    # Índices del historial de clientes: se mapean tal cual (snapshots viejos: se arman con las columnas)
+    store.indice_clientes = IndiceClientes()
+    for c in store.clientes.list():
+        store.indice_clientes.agregar_cliente(c.id, c.documento)
+    if r.tiene("indice.ventas.clave"):
+        store.indice_clientes.cargar_base(*(
+            tuple(r.col(f"indice.{nombre}.{c}") for c in ("clave", "inicio", "id"))
+            for nombre in ("ventas", "devoluciones")))
+    else:
+        for venta_id, cliente_id in zip(r.col("ventas.id"), r.col("ventas.cliente_id")):
+            store.indice_clientes.agregar_venta(cliente_id, venta_id)
+        for dev_id, venta_id in zip(r.col("devoluciones.id"), r.col("devoluciones.venta_id")):
+            store.indice_clientes.agregar_devolucion(venta_id, dev_id)
+
+    store.kardex = Kardex()
+    cols = [r.col(f"kardex.{c}") for c in ("ts", "tipo", "cantidad", "saldo", "ref")]
+    inicios = r.col("kardex.inicio")
+    for k, (sede_id, ll_id) in enumerate(zip(r.col("kardex.sede_id"), r.col("kardex.llanta_id"))):
+        a, b = inicios[k], inicios[k + 1]
+        serie = _Serie()
+        for destino, origen in zip((serie.ts, serie.tipos, serie.cantidades, serie.saldos, serie.refs), cols):
+            destino.frombytes(origen[a:b].tobytes())
+        store.kardex._series[(sede_id, ll_id)] = (serie, len(serie.ts))
+        store.kardex._sedes_por_llanta.setdefault(ll_id, []).append(sede_id)
+
+    store.reorden._v = array("d", r.col("reorden.v").tobytes())
+    store.reorden._t = array("d", r.col("reorden.t").tobytes())
+
+    acumulados: Dict[str, Dict[int, List[int]]] = {}
+    cols = [r.col(f"comisiones.{c}") for c in _COLS_COMISIONES]
+    for k, (periodo, asesor_id) in enumerate(zip(r.col("comisiones.periodo"), r.col("comisiones.asesor_id"))):
+        acumulados.setdefault(r.s(periodo), {})[asesor_id] = [c[k] for c in cols]
+    store.comisiones._acumulados = DictVersionado(acumulados)
+    if "reglas_comision" in r.meta:  # snapshots viejos: quedan las reglas por defecto
+        store.comisiones._reglas = [_reglas_de_json(d) for d in r.meta["reglas_comision"]]
+    store.precios_stock.limpiar()
+    return store
+
+
+def _repo_eager(repo, objetos):
+    for o in objetos:
+        repo.set(o.id, o)
+    repo._auto = max((o.id for o in objetos), default=0) + 1
+    return repo
+
+
+def _lector_detalles(r: _Lector, tabla: str, cls):
+    ll, cant, precio, sub = (r.col(f"{tabla}.{c}") for c in ("llanta_id", "cantidad", "precio", "subtotal"))
+
+    def detalles(inicio: int, n: int):
+        return [cls(ll[j], cant[j], _dinero(precio[j]), _dinero(sub[j])) for j in range(inicio, inicio + n)]
+    return detalles
+
+
+def _decodificador_ventas(r: _Lector):
+    ids, cli, ase, sede, fecha, total, ini, n = (
+        r.col(f"ventas.{c}") for c in ("id", "cliente_id", "asesor_id", "sede_id", "fecha", "total", "det_inicio", "det_n")
+    )
+    detalles = _lector_detalles(r, "ventas_det", VentaDetalle)
+
+    def decodificar(k: int) -> Venta:
+        v = Venta(ids[k], cli[k], ase[k], _fecha(fecha[k]), _dinero(total[k]), sede[k])
+        v._detalles = detalles(ini[k], n[k])
+        return v
+    return decodificar
+
+
+def _decodificador_devoluciones(r: _Lector):
+    ids, venta, fecha, motivo, ini, n = (
+        r.col(f"devoluciones.{c}") for c in ("id", "venta_id", "fecha", "motivo", "det_inicio", "det_n")
+    )
+    detalles = _lector_detalles(r, "devoluciones_det", DevolucionDetalle)
+
+    def decodificar(k: int) -> Devolucion:
+        return Devolucion(ids[k], venta[k], _fecha(fecha[k]), r.s(motivo[k]),
+                          detalles(ini[k], n[k]))
+    return decodificar
@@ -0,0 +1,323 @@
+# app/tareas.py
+"""
+Tareas de mantenimiento en segundo plano dentro del proceso web (asyncio), para
+que vencimientos, resúmenes, snapshots y archivado nunca corran dentro de una
+solicitud.
+
+    prog = Programador()
+    prog.cada("vencimientos", 30, store.expirar_reservas, jitter=0.1)
+    prog.cron("archivo", "30 3 * * *", lambda: store.archivar_ventas(...))
+    await prog.iniciar()    # en el lifespan de FastAPI
+    ...
+    await prog.detener()    # espera lo que esté corriendo y corre las `al_apagar`
+
+Cada ejecución va a un hilo (asyncio.to_thread): el store es sincrónico y toma
+su propio lock, así el event loop sigue atendiendo. Una tarea nunca se
+superpone consigo misma: si le toca mientras sigue corriendo, esa pasada se
+omite y se cuenta. El jitter reparte los arranques para que varias tareas con
+el mismo intervalo no caigan todas juntas.
+"""
+import asyncio
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Callable, Dict, FrozenSet, Optional
+
+# (mínimo, máximo) de cada campo de cron: minuto, hora, día, mes, día de semana
+_RANGOS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+
+# ==========================
+# Cron
+# ==========================
+def _campo(texto: str, minimo: int, maximo: int) -> FrozenSet[int]:
+    valores = set()
+    for parte in texto.split(","):
+        base, _, paso = parte.partition("/")
+        if base == "*":
+            desde, hasta = minimo, maximo
+        elif "-" in base:
+            desde, hasta = (int(x) for x in base.split("-", 1))
+        else:
+            desde = int(base)
+            hasta = maximo if paso else desde
+        paso = int(paso) if paso else 1
+        if not (minimo <= desde <= hasta <= maximo) or paso <= 0:
+            raise ValueError(f"Campo de cron fuera de rango: {parte!r} ({minimo}-{maximo})")
+        valores.update(range(desde, hasta + 1, paso))
+    return frozenset(valores)
+
+
+class Cron:
+    """
+    Expresión de cron de 5 campos: "minuto hora día mes día_semana" (0 = domingo,
+    7 también). Acepta *, listas (1,15), rangos (1-5) y pasos (*/10). Como en
+    cron, si se restringen día y día de semana alcanza con que coincida uno.
+    """
+
+    def __init__(self, expresion: str):
+        partes = expresion.split()
+        if len(partes) != 5:
+            raise ValueError(f"Cron inválido (se esperan 5 campos): {expresion!r}")
+        try:
+            campos = [_campo(p, lo, hi) for p, (lo, hi) in zip(partes, _RANGOS)]
+        except ValueError as e:
+            raise ValueError(f"Cron inválido {expresion!r}: {e}") from None
+        self.expresion = expresion
+        self.minutos, self.horas, self.dias, self.meses, semana = campos
+        self.dias_semana = frozenset(d % 7 for d in semana)
+        self._todos_dias = partes[2] == "*"
+        self._toda_semana = partes[4] == "*"
+
+    def _dia_ok(self, t: datetime) -> bool:
+        dia = t.day in self.dias
+        semana = t.isoweekday() % 7 in self.dias_semana
+        if not self._todos_dias and not self._toda_semana:
+            return dia or semana
+        return dia and semana
+
+    def siguiente(self, desde: datetime) -> datetime:
+        """Primer minuto que coincide, estrictamente después de `desde`."""
+        t = desde.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limite = t + timedelta(days=366 * 5)
+        while t < limite:
+            if t.month not in self.meses:
+                t = (t.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._dia_ok(t):
+                t = t.replace(hour=0, minute=0) + timedelta(days=1)
+            elif t.hour not in self.horas:
+                t = t.replace(minute=0) + timedelta(hours=1)
+            elif t.minute not in self.minutos:
+                t += timedelta(minutes=1)
+            else:
+                return t
+        raise ValueError(f"El cron {self.expresion!r} no ocurre nunca")
+
+    def __str__(self) -> str:
+        return self.expresion
+
+
+# ==========================
+# Programador
+# ==========================
+@dataclass
+class Tarea:
+    nombre: str
+    fn: Callable[[], object]
+    cada: Optional[float] = None      # segundos entre arranques (si no es cron)
+    cron: Optional[Cron] = None
+    jitter: float = 0.0               # cada: fracción del intervalo (±); cron: segundos de demora
+    al_apagar: bool = False           # correrla una última vez al detener
+    # Métricas
+    ejecuciones: int = 0
+    fallos: int = 0
+    omitidas: int = 0                 # pasadas salteadas porque la anterior seguía corriendo
+    en_curso: bool = False
+    total_s: float = 0.0
+    max_s: float = 0.0
+    ultima_s: Optional[float] = None
+    ultimo_inicio: Optional[datetime] = None
+    ultimo_error: Optional[str] = None
+    ultimo_resultado: object = None
+    proxima: Optional[datetime] = None
+    _bucle: Optional[asyncio.Task] = field(default=None, repr=False)
+
+
+class Programador:
+    """Tareas por intervalo o cron, corridas en hilos desde el event loop."""
+
+    def __init__(self, timeout_apagado: float = 30.0):
+        self.tareas: Dict[str, Tarea] = {}
+        self.timeout_apagado = timeout_apagado  # cuánto esperar a las que siguen corriendo
+        self._parar: Optional[asyncio.Event] = None
+
+    # --------- Registro ---------
+    def cada(self, nombre: str, segundos: float, fn: Callable[[], object],
+             jitter: float = 0.0, al_apagar: bool = False) -> Tarea:
+        if segundos <= 0:
+            raise ValueError("El intervalo debe ser > 0")
+        if not 0 <= jitter < 1:
+            raise ValueError("El jitter de un intervalo es una fracción en [0, 1)")
+        return self._agregar(Tarea(nombre, fn, cada=segundos, jitter=jitter, al_apagar=al_apagar))
+
+    def cron(self, nombre: str, expresion: str, fn: Callable[[], object],
+             jitter: float = 0.0, al_apagar: bool = False) -> Tarea:
+        return self._agregar(Tarea(nombre, fn, cron=Cron(expresion), jitter=jitter, al_apagar=al_apagar))
+
+    def _agregar(self, tarea: Tarea) -> Tarea:
+        if tarea.nombre in self.tareas:
+            raise ValueError(f"Ya existe la tarea {tarea.nombre!r}")
+        self.tareas[tarea.nombre] = tarea
+        if self._parar is not None:
+            tarea._bucle = asyncio.create_task(self._bucle(tarea), name=f"tarea-{tarea.nombre}")
+        return tarea
+
+    # --------- Ciclo de vida ---------
+    async def iniciar(self):
+        if self._parar is not None:
+            return
+        self._parar = asyncio.Event()
+        for t in self.tareas.values():
+            t._bucle = asyncio.create_task(self._bucle(t), name=f"tarea-{t.nombre}")
+
+    async def detener(self):
+        """
+        Deja de programar, espera (hasta `timeout_apagado`) a las que están
+        corriendo y corre una última vez las marcadas `al_apagar`.
+        """
+        if self._parar is None:
+            return
+        self._parar.set()
+        bucles = [t._bucle for t in self.tareas.values() if t._bucle is not None]
+        if bucles:
+            _, pendientes = await asyncio.wait(bucles, timeout=self.timeout_apagado)
+            for b in pendientes:
+                b.cancel()
+            await asyncio.gather(*pendientes, return_exceptions=True)
+        for t in self.tareas.values():
+            t._bucle = None
+            t.proxima = None
+        for t in self.tareas.values():
+            if t.al_apagar:
+                await self.ejecutar(t.nombre)
+        self._parar = None
+
+    # --------- Ejecución ---------
+    def _demora(self, t: Tarea) -> float:
+        if t.cron is not None:
+            ahora = datetime.now()
+            return (t.cron.siguiente(ahora) - ahora).total_seconds() + random.uniform(0, t.jitter)
+        return t.cada * (1 + random.uniform(-t.jitter, t.jitter))
+
+    async def _bucle(self, t: Tarea):
+        loop = asyncio.get_running_loop()
+        objetivo = loop.time() + self._demora(t)
+        while True:
+            t.proxima = datetime.now() + timedelta(seconds=max(0.0, objetivo - loop.time()))
+            try:
+                await asyncio.wait_for(self._parar.wait(), timeout=max(0.0, objetivo - loop.time()))
+                return
+            except asyncio.TimeoutError:
+                pass
+            await self.ejecutar(t.nombre)
+            if t.cron is not None:
+                objetivo = loop.time() + self._demora(t)
+                continue
+            # Ritmo fijo desde el arranque programado; lo que quedó atrás se omite
+            objetivo += self._demora(t)
+            atraso = loop.time() - objetivo
+            if atraso > 0:
+                perdidas = int(atraso // t.cada) + 1
+                t.omitidas += perdidas
+                objetivo += perdidas * t.cada
+
+    async def ejecutar(self, nombre: str) -> bool:
+        """Corre la tarea ahora (en un hilo). False si ya estaba corriendo: se omite."""
+        t = self.tareas[nombre]
+        if t.en_curso:
+            t.omitidas += 1
+            return False
+        t.en_curso = True
+        t.ultimo_inicio = datetime.now()
+        inicio = time.perf_counter()
+        try:
+            t.ultimo_resultado = await asyncio.to_thread(t.fn)
+            t.ultimo_error = None
+        except Exception as e:
+            t.fallos += 1
+            t.ultimo_error = f"{type(e).__name__}: {e}"
+        finally:
+            duracion = time.perf_counter() - inicio
+            t.en_curso = False
+            t.ejecuciones += 1
+            t.total_s += duracion
+            t.max_s = max(t.max_s, duracion)
+            t.ultima_s = duracion
+        return True
+
+    # --------- Métricas ---------
+    def estadisticas(self) -> Dict[str, dict]:
+        def ms(s):
+            return round(s * 1000, 3) if s is not None else None
+        return {
+            t.nombre: {
+                "programa": f"cron {t.cron}" if t.cron is not None else f"cada {t.cada:g}s",
+                "ejecuciones": t.ejecuciones,
+                "fallos": t.fallos,
+                "omitidas": t.omitidas,
+                "en_curso": t.en_curso,
+                "ultima_ms": ms(t.ultima_s),
+                "promedio_ms": ms(t.total_s / t.ejecuciones) if t.ejecuciones else None,
+                "max_ms": ms(t.max_s),
+                "ultimo_inicio": t.ultimo_inicio,
+                "proxima": t.proxima,
+                "ultimo_error": t.ultimo_error,
+                "ultimo_resultado": t.ultimo_resultado,
+            }
+            for t in self.tareas.values()
+        }
+
+
+# ==========================
+# Mantenimiento del store
+# ==========================
+class ResumenBajoStock:
+    """
+    Resumen periódico de alertas de bajo stock: cuántas hay y cuáles aparecieron
+    o se resolvieron desde el resumen anterior. Lee de un snapshot del store,
+    así no retiene el lock mientras recorre el inventario.
+    """
+
+    def __init__(self, store):
+        self._store = store
+        self._anteriores: set = set()
+
+    def __call__(self) -> dict:
+        filas = self._store.snapshot().reporte_bajo_stock()
+        actuales = {(f["sede_id"], f["llanta_id"]) for f in filas}
+        nuevas = [f for f in filas if (f["sede_id"], f["llanta_id"]) not in self._anteriores]
+        resueltas = len(self._anteriores - actuales)
+        self._anteriores = actuales
+        return {
+            "alertas": len(filas),
+            "nuevas": [{k: f[k] for k in ("sede", "sku", "disponible", "umbral_minimo")} for f in nuevas],
+            "resueltas": resueltas,
+        }
+
+
+def programar_mantenimiento(prog: Programador, store, snapshot: Optional[str] = None,
+                            snapshot_cada: float = 600.0, archivo: Optional[str] = None,
+                            archivo_dias: int = 90, archivo_cron: str = "30 3 * * *") -> Programador:
+    """
+    Tareas de mantenimiento estándar del store:
+      - vencimientos  (30 s): reservas y cotizaciones vencidas
+      - reportes      (5 min): pone al día las columnas del reporte de período
+      - bajo_stock    (1 h): resumen de alertas (ver ResumenBajoStock)
+      - snapshot      (con `snapshot`): dump periódico y uno final al apagar
+      - archivo       (con `archivo`): archiva las ventas de más de `archivo_dias`
+    """
+    def vencimientos():
+        return {
+            "reservas": len(store.expirar_reservas()),
+            "cotizaciones": len(store.expirar_cotizaciones()),
+        }
+
+    def reportes():
+        vista = store.snapshot()
+        store.reportes.sincronizar(vista.ventas, vista.devoluciones)
+        return {"filas": len(store.reportes)}
+
+    prog.cada("vencimientos", 30, vencimientos, jitter=0.1)
+    prog.cada("reportes", 300, reportes, jitter=0.1)
+    prog.cada("bajo_stock", 3600, ResumenBajoStock(store), jitter=0.05)
+    if snapshot:
+        def guardar():
+            store.dump(snapshot)
+            return {"path": snapshot}
+        prog.cada("snapshot", snapshot_cada, guardar, jitter=0.05, al_apagar=True)
+    if archivo:
+        def archivar():
+            return store.archivar_ventas(datetime.now() - timedelta(days=archivo_dias), archivo)
+        prog.cron("archivo", archivo_cron, archivar, jitter=60)
+    return prog
@@ -0,0 +1,183 @@
+# app/versionado.py
+"""
+Vistas congeladas sin copiar el estado (copy-on-write por clave).
+
+El contenedor se modifica en sitio. Tomar una vista abre una "época" con su
+bitácora: antes de la primera escritura de cada clave en la época se anota el
+valor que tenía. Una vista lee el dato vivo y, si la clave cambió desde que se
+tomó, el valor anotado en la primera bitácora de su época en adelante. Así
+tomar una vista es O(1) y cada escritura cuesta O(1) extra, no O(tamaño).
+
+Las vistas se leen sin lock desde otros hilos: el escritor anota antes de
+escribir y la vista lee el dato antes que la bitácora, así que si ve el valor
+nuevo también ve la anotación. La bitácora vigente se guarda con una
+referencia débil: cuando ya no queda ninguna vista viva, se deja de anotar.
+"""
+import weakref
+from typing import Iterator, Optional, Tuple
+
+_SIN = object()   # la clave no está anotada
+FALTA = object()  # la clave no existía al tomar la vista
+
+
+class _Bitacora:
+    """Valores previos a la primera escritura de cada clave en una época."""
+    __slots__ = ("previos", "siguiente", "__weakref__")
+
+    def __init__(self):
+        self.previos: dict = {}
+        self.siguiente: Optional["_Bitacora"] = None
+
+
+class Versiones:
+    """Cadena de bitácoras de un contenedor (una por época, entre dos vistas)."""
+    __slots__ = ("_ref",)
+
+    def __init__(self):
+        self._ref = None  # weakref a la bitácora de la época actual
+
+    def __reduce__(self):
+        return Versiones, ()  # las vistas no viajan con una copia del contenedor
+
+    def _actual(self) -> Optional[_Bitacora]:
+        if self._ref is None:
+            return None
+        b = self._ref()
+        if b is None:
+            self._ref = None  # no quedan vistas
+        return b
+
+    def por_anotar(self, clave) -> Optional[_Bitacora]:
+        """Bitácora donde anotar el valor previo de `clave` antes de escribirla (None = no hace falta)."""
+        b = self._actual()
+        return b if b is not None and clave not in b.previos else None
+
+    def propio(self, clave) -> bool:
+        """¿El valor de `clave` es de la época actual (ninguna vista lo comparte)?"""
+        b = self._actual()
+        return b is None or clave in b.previos
+
+    def hay_vistas(self) -> bool:
+        return self._actual() is not None
+
+    def nueva_epoca(self) -> _Bitacora:
+        """Bitácora para una vista nueva; se reutiliza la actual si no hubo escrituras."""
+        b = self._actual()
+        if b is None or b.previos:
+            nueva = _Bitacora()
+            if b is not None:
+                b.siguiente = nueva
+            b = nueva
+            self._ref = weakref.ref(b)
+        return b
+
+
+def previo(bitacora: Optional[_Bitacora], clave):
+    """Valor de `clave` al abrirse `bitacora`, si cambió después (si no, _SIN)."""
+    while bitacora is not None:
+        valor = bitacora.previos.get(clave, _SIN)
+        if valor is not _SIN:
+            return valor
+        bitacora = bitacora.siguiente
+    return _SIN
+
+
+def previos(bitacora: Optional[_Bitacora]) -> Iterator[Tuple[object, object]]:
+    """(clave, valor al abrirse `bitacora`) de todo lo que cambió después."""
+    vistos = set()
+    while bitacora is not None:
+        for clave, valor in list(bitacora.previos.items()):
+            if clave not in vistos:
+                vistos.add(clave)
+                yield clave, valor
+        bitacora = bitacora.siguiente
+
+
+class DictVersionado(dict):
+    """
+    dict con vistas congeladas en O(1). Solo anotan `d[k] = v`, `del d[k]` y
+    `pop`: no usar setdefault/update/clear sobre él.
+    """
+    __slots__ = ("versiones",)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.versiones = Versiones()
+
+    def _anotar(self, clave):
+        b = self.versiones.por_anotar(clave)
+        if b is not None:
+            b.previos[clave] = dict.get(self, clave, FALTA)
+
+    def __setitem__(self, clave, valor):
+        self._anotar(clave)
+        dict.__setitem__(self, clave, valor)
+
+    def __delitem__(self, clave):
+        self._anotar(clave)
+        dict.__delitem__(self, clave)
+
+    def pop(self, clave, *defecto):
+        if clave in self:
+            self._anotar(clave)
+        return dict.pop(self, clave, *defecto)
+
+    def propio(self, clave) -> bool:
+        return self.versiones.propio(clave)
+
+    def __reduce__(self):
+        # pickle/deepcopy copian solo el contenido: la copia arranca sin vistas
+        return DictVersionado, (dict(self),)
+
+    def vista(self) -> "VistaDict":
+        return VistaDict(self, self.versiones.nueva_epoca())
+
+
+class VistaDict:
+    """Contenido de un DictVersionado al tomar la vista (solo lectura)."""
+    __slots__ = ("_data", "_bitacora")
+
+    def __init__(self, data: DictVersionado, bitacora: _Bitacora):
+        self._data = data
+        self._bitacora = bitacora
+
+    def get(self, clave, defecto=None):
+        valor = dict.get(self._data, clave, FALTA)  # primero el dato y después la bitácora
+        anotado = previo(self._bitacora, clave)
+        if anotado is not _SIN:
+            valor = anotado
+        return defecto if valor is FALTA else valor
+
+    def __getitem__(self, clave):
+        valor = self.get(clave, FALTA)
+        if valor is FALTA:
+            raise KeyError(clave)
+        return valor
+
+    def __contains__(self, clave) -> bool:
+        return self.get(clave, FALTA) is not FALTA
+
+    def congelar(self) -> dict:
+        """dict con el contenido de la vista: O(n + cambios posteriores)."""
+        estado = dict(self._data)  # copia atómica bajo el GIL
+        for clave, valor in previos(self._bitacora):
+            if valor is FALTA:
+                estado.pop(clave, None)
+            else:
+                estado[clave] = valor
+        return estado
+
+    def items(self):
+        return self.congelar().items()
+
+    def values(self):
+        return self.congelar().values()
+
+    def keys(self):
+        return self.congelar().keys()
+
+    def __iter__(self):
+        return iter(self.congelar())
+
+    def __len__(self) -> int:
+        return len(self.congelar())
@@ -0,0 +1,81 @@
+# benchmarks/bench_archivo.py
+"""
+Archivado de ventas viejas (StoreService.archivar_ventas): memoria antes y
+después, tamaño en disco, latencia de ventas concurrentes mientras archiva y
+costo de leer registros archivados.
+
+    python -m benchmarks.bench_archivo --ventas 200000 --fraccion 0.9 [--memoria]
+"""
+import argparse
+import gc
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_snapshot import construir, medir
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--ventas", type=int, default=200000)
+    ap.add_argument("--fraccion", type=float, default=0.9, help="Parte del historial a archivar")
+    ap.add_argument("--memoria", action="store_true", help="Medir memoria con tracemalloc (mucho más lento)")
+    args = ap.parse_args()
+
+    if args.memoria:
+        tracemalloc.start()
+    print(f"Construyendo store con {args.ventas} ventas…")
+    s = construir(args.ventas)
+    gc.collect()
+    mem_antes = tracemalloc.get_traced_memory()[0]
+    corte = s.ventas.get(int(args.ventas * args.fraccion) + 1).fecha
+    directorio = tempfile.mkdtemp()
+
+    # Ventas del mostrador mientras corre el archivado
+    latencias, fin = [], threading.Event()
+
+    def mostrador():
+        while not fin.is_set():
+            t = time.perf_counter()
+            s.registrar_venta(1, 1, [(1, 1)])
+            latencias.append(time.perf_counter() - t)
+            time.sleep(0.001)
+
+    hilo = threading.Thread(target=mostrador)
+    hilo.start()
+    res, t_arch = medir(lambda: s.archivar_ventas(corte, directorio))
+    fin.set()
+    hilo.join()
+    gc.collect()
+    mem_despues = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    disco = sum(os.path.getsize(os.path.join(directorio, n)) for n in os.listdir(directorio))
+
+    rnd = random.Random(7)
+    ids = [rnd.randint(1, res["ventas"]) for _ in range(2000)]
+    _, t_frio = medir(lambda: [s.ventas.get(i) for i in ids])
+    _, t_tibio = medir(lambda: [s.ventas.get(i) for i in range(1, 2001)])
+    _, t_listar = medir(lambda: s.listar_ventas())
+
+    latencias.sort()
+    print(f"archivadas {res['ventas']} ventas en {t_arch:.2f}s → {disco / 1e6:.1f} MB en disco")
+    print(f"en memoria quedan {len(s.ventas._data)} de {len(s.ventas)} ventas")
+    if args.memoria:
+        print(f"memoria: {mem_antes / 1e6:.0f} MB → {mem_despues / 1e6:.0f} MB")
+    print(f"ventas concurrentes: {len(latencias)}, p50 {latencias[len(latencias) // 2] * 1e3:.2f} ms, "
+          f"máx {latencias[-1] * 1e3:.2f} ms")
+    print(f"{'get archivado al azar':<28}{t_frio / len(ids) * 1e6:>10.1f} µs")
+    print(f"{'get archivado secuencial':<28}{t_tibio / 2000 * 1e6:>10.1f} µs")
+    print(f"{'listar_ventas (todo)':<28}{t_listar:>10.2f} s")
+    shutil.rmtree(directorio)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+# benchmarks/bench_carga.py
+"""
+Prueba de carga de la app web con terminales POS simuladas.
+
+Cada terminal (un hilo) mezcla ventas (`/ventas` con items_text, algunas
+reintentadas con la misma Idempotency-Key), devoluciones, ajustes de stock y
+vistas del panel. Al final se reportan throughput, latencias p50/p95/p99 por
+operación, tasa de errores, y se verifican invariantes contra el servidor:
+
+- stock final = inicial + ajustes - ventas + devoluciones (por llanta)
+- el kardex da el mismo stock que el inventario
+- cantidad de ventas = iniciales + ventas aceptadas (los reintentos no duplican)
+
+En proceso (TestClient, default) o contra un uvicorn local con --url:
+
+    python -m benchmarks.bench_carga --terminales 16 --operaciones 200
+    python -m benchmarks.bench_carga --url http://127.0.0.1:8000
+
+Sale con código 1 si alguna invariante no se cumple.
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from urllib.parse import unquote_plus
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Mezcla de operaciones por terminal (pesos relativos)
+MEZCLA = {"venta": 55, "devolucion": 8, "ajuste": 12, "panel": 5, "disponibilidad": 20}
+FUTURO = "2999-01-01T00:00:00"
+
+
+class Resultados:
+    """Lo que observa una terminal: latencias, resultados y efecto esperado en el stock."""
+    def __init__(self):
+        self.latencias = defaultdict(list)   # operación -> [segundos]
+        self.conteo = Counter()              # (operación, resultado) -> n
+        self.delta = Counter()               # llanta_id -> unidades (+ajustes -ventas +devoluciones)
+        self.ventas_ok = 0
+
+    def sumar(self, otro: "Resultados"):
+        for op, ls in otro.latencias.items():
+            self.latencias[op].extend(ls)
+        self.conteo.update(otro.conteo)
+        self.delta.update(otro.delta)
+        self.ventas_ok += otro.ventas_ok
+
+
+def _resultado(resp) -> str:
+    """Clasifica la respuesta de un POST del panel (siempre redirige con ?msg= o ?error=)."""
+    if resp.status_code != 302:
+        return f"http_{resp.status_code}"
+    destino = unquote_plus(resp.headers.get("location", ""))
+    if "msg=" in destino:
+        return "ok"
+    if "Stock insuficiente" in destino:
+        return "stock_insuficiente"
+    return "error"
+
+
+# ==========================
+# Preparación
+# ==========================
+def preparar(http, n_llantas: int, stock: int, terminales: int) -> dict:
+    """Crea llantas con stock y un cliente por terminal; devuelve ids y estado inicial."""
+    for i in range(n_llantas):
+        http.post("/llantas", data={"sku": f"CARGA-{i:04d}", "marca": "Carga", "modelo": "POS",
+                                    "medida": "205/55 R16", "precio": str(90 + i % 40)})
+    llantas = []
+    while http.get(f"/api/disponibilidad/{len(llantas) + 1}").status_code == 200:
+        llantas.append(len(llantas) + 1)
+    for ll in llantas:
+        http.post("/inventario/ajustar", data={"llanta_id": ll, "delta": stock, "umbral": "5"})
+
+    clientes = []
+    for k in range(terminales):
+        doc = f"CARGA-T{k}-{time.time_ns()}"
+        http.post("/clientes", data={"nombre": f"Terminal {k}", "documento": doc})
+        clientes.append(http.get("/api/clientes/historial", params={"documento": doc}).json()["cliente"]["id"])
+
+    return {
+        "llantas": llantas,
+        "clientes": clientes,
+        "stock_inicial": {ll: http.get(f"/api/disponibilidad/{ll}").json()["total"] for ll in llantas},
+        "ventas_iniciales": http.get("/api/stats").json()["ventas"],
+    }
+
+
+# ==========================
+# Terminal
+# ==========================
+def terminal(http, k: int, esc: dict, operaciones: int, seed: int, reintentos: float) -> Resultados:
+    rnd = random.Random(seed * 1000 + k)
+    res = Resultados()
+    cliente_id = esc["clientes"][k]
+    vendidas = []  # (venta_id, llanta_id) propias aún sin devolver
+    ops, pesos = zip(*MEZCLA.items())
+
+    def medir(op, fn):
+        t = time.perf_counter()
+        resp = fn()
+        res.latencias[op].append(time.perf_counter() - t)
+        return resp
+
+    for n in range(operaciones):
+        op = rnd.choices(ops, pesos)[0]
+        if op == "venta":
+            items = [(rnd.choice(esc["llantas"]), rnd.randint(1, 4)) for _ in range(rnd.randint(1, 3))]
+            data = {"cliente_id": cliente_id, "asesor_id": 1,
+                    "items_text": ",".join(f"{ll}x{c}" for ll, c in items)}
+            clave = {"Idempotency-Key": f"T{k}-{n}-{seed}"}
+            r = _resultado(medir(op, lambda: http.post("/ventas", data=data, headers=clave)))
+            if rnd.random() < reintentos:  # el POS no vio la respuesta y reintenta
+                r2 = _resultado(medir("venta_reintento", lambda: http.post("/ventas", data=data, headers=clave)))
+                res.conteo[("venta_reintento", r2)] += 1
+                # Un fallo no queda guardado con la clave: el reintento se ejecuta
+                # de nuevo y, si esta vez hay stock, la venta existe y se cuenta
+                if r != "ok":
+                    r = r2
+            if r == "ok":
+                res.ventas_ok += 1
+                for ll, c in items:
+                    res.delta[ll] -= c
+                compra = http.get("/api/clientes/historial",
+                                  params={"cliente_id": cliente_id, "por_pagina": 1}).json()["compras"][0]
+                vendidas.append((compra["venta"]["id"], compra["detalles"][0]["llanta_id"]))
+        elif op == "devolucion":
+            if not vendidas:
+                continue
+            venta_id, ll = vendidas.pop(rnd.randrange(len(vendidas)))
+            data = {"venta_id": venta_id, "items_text": f"{ll}x1", "motivo": "Prueba de carga"}
+            r = _resultado(medir(op, lambda: http.post("/devoluciones", data=data)))
+            if r == "ok":
+                res.delta[ll] += 1
+        elif op == "ajuste":
+            ll, delta = rnd.choice(esc["llantas"]), rnd.randint(5, 20)
+            r = _resultado(medir(op, lambda: http.post("/inventario/ajustar", data={"llanta_id": ll, "delta": delta})))
+            if r == "ok":
+                res.delta[ll] += delta
+        elif op == "panel":
+            resp = medir(op, lambda: http.get("/inventario"))
+            r = "ok" if resp.status_code == 200 else f"http_{resp.status_code}"
+        else:
+            ll = rnd.choice(esc["llantas"])
+            resp = medir(op, lambda: http.get(f"/api/disponibilidad/{ll}"))
+            r = "ok" if resp.status_code == 200 else f"http_{resp.status_code}"
+        res.conteo[(op, r)] += 1
+    return res
+
+
+# ==========================
+# Invariantes y reporte
+# ==========================
+def verificar(http, esc: dict, res: Resultados) -> list:
+    fallas = []
+    for ll in esc["llantas"]:
+        esperado = esc["stock_inicial"][ll] + res.delta[ll]
+        total = http.get(f"/api/disponibilidad/{ll}").json()["total"]
+        kardex = http.get(f"/api/kardex/{ll}/stock", params={"fecha": FUTURO}).json()["cantidad"]
+        if total != esperado:
+            fallas.append(f"llanta {ll}: stock {total} != esperado {esperado}")
+        if kardex != total:
+            fallas.append(f"llanta {ll}: kardex {kardex} != inventario {total}")
+    ventas = http.get("/api/stats").json()["ventas"]
+    if ventas != esc["ventas_iniciales"] + res.ventas_ok:
+        fallas.append(f"ventas {ventas} != {esc['ventas_iniciales']} + {res.ventas_ok} aceptadas")
+    return fallas
+
+
+def _percentil(orden: list, p: float) -> float:
+    return orden[min(len(orden) - 1, int(p * len(orden)))]
+
+
+def reporte(res: Resultados, segundos: float):
+    total = sum(len(ls) for ls in res.latencias.values())
+    print(f"\n{total} requests en {segundos:.2f}s → {total / segundos:,.0f} req/s")
+    print(f"{'operación':<18}{'n':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for op, ls in sorted(res.latencias.items()):
+        ls.sort()
+        print(f"{op:<18}{len(ls):>7}" + "".join(f"{_percentil(ls, p) * 1e3:>10.1f}" for p in (0.5, 0.95, 0.99)))
+    print("\nresultados:")
+    for (op, r), n in sorted(res.conteo.items()):
+        tot_op = sum(v for (o, _), v in res.conteo.items() if o == op)
+        print(f"  {op:<16}{r:<20}{n:>7}  ({n / tot_op:.1%})")
+
+
+def correr(http, terminales: int, operaciones: int, n_llantas: int, stock: int,
+           seed: int = 7, reintentos: float = 0.05):
+    """Prepara, corre las terminales en paralelo y verifica. Devuelve (resultados, segundos, fallas)."""
+    esc = preparar(http, n_llantas, stock, terminales)
+    parciales = [None] * terminales
+
+    def correr_terminal(k):
+        parciales[k] = terminal(http, k, esc, operaciones, seed, reintentos)
+
+    hilos = [threading.Thread(target=correr_terminal, args=(k,)) for k in range(terminales)]
+    t = time.perf_counter()
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    segundos = time.perf_counter() - t
+
+    res = Resultados()
+    for p in parciales:
+        res.sumar(p)
+    return res, segundos, verificar(http, esc, res)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--url", help="Servidor a probar (por defecto la app en proceso con TestClient)")
+    ap.add_argument("--terminales", type=int, default=16)
+    ap.add_argument("--operaciones", type=int, default=200, help="Operaciones por terminal")
+    ap.add_argument("--llantas", type=int, default=20)
+    ap.add_argument("--stock", type=int, default=300, help="Stock inicial por llanta (poco = más StockInsuficiente)")
+    ap.add_argument("--reintentos", type=float, default=0.05, help="Fracción de ventas reintentadas con la misma clave")
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+
+    if args.url:
+        import httpx
+        http = httpx.Client(base_url=args.url, follow_redirects=False, timeout=30,
+                            limits=httpx.Limits(max_connections=args.terminales))
+    else:
+        from fastapi.testclient import TestClient
+        from web.server import app
+        http = TestClient(app, follow_redirects=False).__enter__()
+
+    print(f"{args.terminales} terminales x {args.operaciones} operaciones contra {args.url or 'app en proceso'}…")
+    try:
+        res, segundos, fallas = correr(http, args.terminales, args.operaciones, args.llantas,
+                                       args.stock, args.seed, args.reintentos)
+    finally:
+        http.__exit__(None, None, None)
+    reporte(res, segundos)
+
+    print("\ninvariantes:", "OK" if not fallas else "FALLARON")
+    for f in fallas:
+        print("  ✖", f)
+    sys.exit(1 if fallas else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# benchmarks/bench_comisiones.py
+"""
+Liquidación de comisiones con acumulados incrementales (app/comisiones.py)
+contra recalcular desde el historial, sobre un año de ventas sintéticas.
+
+    python -m benchmarks.bench_comisiones --ventas 500000 --asesores 40
+"""
+import argparse
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.comisiones import MotorComisiones, ReglasComision, periodo_de
+from app.models import Venta, VentaDetalle
+from app.utils import to_money
+from benchmarks.bench_snapshot import medir
+
+MARCAS = ["Michelin", "Pirelli", "Goodyear", "Hankook", "Genérica"]
+
+
+def generar(n_ventas: int, n_asesores: int, n_llantas: int = 500, seed: int = 7):
+    """Ventas repartidas uniformemente en 2025, con 1 a 3 líneas cada una."""
+    rnd = random.Random(seed)
+    inicio = datetime(2025, 1, 1)
+    paso = timedelta(days=365) / n_ventas
+    precios = [Decimal(rnd.randint(80, 400)) for _ in range(n_llantas)]
+    marcas = {i: MARCAS[i % len(MARCAS)] for i in range(n_llantas)}
+    ventas = []
+    for k in range(n_ventas):
+        dets = []
+        for _ in range(rnd.randint(1, 3)):
+            ll, cant = rnd.randrange(n_llantas), rnd.randint(1, 4)
+            dets.append(VentaDetalle(ll, cant, precios[ll], precios[ll] * cant))
+        v = Venta(k + 1, 1, rnd.randint(1, n_asesores), inicio + paso * k, sum(d.subtotal for d in dets))
+        ventas.append((v, dets))
+    return ventas, marcas
+
+
+def recalcular(ventas, marcas, reglas: ReglasComision, periodo: str) -> dict:
+    """Lo que haría una liquidación sin acumulados: recorrer todo el historial."""
+    por_asesor: dict = {}
+    for v, dets in ventas:
+        if periodo_de(v.fecha) != periodo:
+            continue
+        acc = por_asesor.setdefault(v.asesor_id, Decimal("0"))
+        for d in dets:
+            acc += to_money(d.subtotal * reglas.porcentaje(marcas[d.llanta_id]))
+        por_asesor[v.asesor_id] = acc
+    return por_asesor
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--ventas", type=int, default=500000)
+    ap.add_argument("--asesores", type=int, default=40)
+    args = ap.parse_args()
+
+    reglas = ReglasComision(
+        porcentaje_por_marca={"Michelin": Decimal("0.04"), "Genérica": Decimal("0.01")},
+        tramos=[(Decimal("100000"), Decimal("0.005")), (Decimal("300000"), Decimal("0.01"))],
+    )
+    print(f"Generando {args.ventas} ventas de un año para {args.asesores} asesores…")
+    ventas, marcas = generar(args.ventas, args.asesores)
+
+    motor = MotorComisiones(reglas)
+    _, t_inc = medir(lambda: [motor.registrar_venta(v, dets, marcas.get) for v, dets in ventas])
+    periodo = "2025-12"
+    liq, t_liq = medir(lambda: motor.liquidacion(periodo))
+    _, t_rank = medir(lambda: motor.ranking(periodo, n=10))
+    esperado, t_scan = medir(lambda: recalcular(ventas, marcas, reglas, periodo))
+    assert {f["asesor_id"]: f["comision"] for f in liq} == esperado
+
+    print(f"{'acumular (por venta)':<28}{t_inc / args.ventas * 1e6:>10.2f} µs")
+    print(f"{'liquidación (acumulados)':<28}{t_liq * 1e3:>10.3f} ms")
+    print(f"{'ranking top 10':<28}{t_rank * 1e3:>10.3f} ms")
+    print(f"{'liquidación (recorrido)':<28}{t_scan * 1e3:>10.3f} ms  x{t_scan / t_liq:,.0f}")
+
+
+if __name__ == "__main__":
+    main()
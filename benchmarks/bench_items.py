@@ -0,0 +1,58 @@
+# benchmarks/bench_items.py
+"""
+Parser de ítems (app/items.py) contra el parseo que tenían las rutas web,
+sobre pedidos grandes y pegados masivos.
+
+    python -m benchmarks.bench_items --lineas 1000 10000 100000
+"""
+import argparse
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.items import parsear_items, ItemsInvalidos
+from benchmarks.bench_snapshot import medir
+
+
+def parsear_viejo(items_text: str):
+    """Copia del parseo que estaba duplicado en crear_venta/crear_devolucion (sin agrupar)."""
+    items = []
+    for parte in items_text.strip().split(","):
+        parte = parte.strip()
+        if not parte:
+            continue
+        a, b = parte.lower().split("x", 1)
+        items.append((int(a.strip()), int(b.strip())))
+    return items
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--lineas", type=int, nargs="+", default=[1000, 10000, 100000])
+    args = ap.parse_args()
+
+    rnd = random.Random(7)
+    print(f"{'líneas':>8}{'viejo (ms)':>12}{'nuevo (ms)':>12}{'pegado (ms)':>13}{'error al final (ms)':>21}")
+    for n in args.lineas:
+        pares = [(rnd.randint(1, 500), rnd.randint(1, 4)) for _ in range(n)]
+        coma = ", ".join(f"{ll}x{c}" for ll, c in pares)
+        pegado = "\n".join(f"{ll}\t{c}" for ll, c in pares)  # columnas copiadas de una planilla
+        roto = coma + ", 7x"
+
+        _, t_viejo = medir(lambda: parsear_viejo(coma))
+        items, t_nuevo = medir(lambda: parsear_items(coma))
+        _, t_pegado = medir(lambda: parsear_items(pegado))
+        def _roto():
+            try:
+                parsear_items(roto)
+            except ItemsInvalidos:
+                pass
+        _, t_roto = medir(_roto)
+        assert sum(c for _, c in items) == sum(c for _, c in pares)
+        print(f"{n:>8}{t_viejo * 1e3:>12.2f}{t_nuevo * 1e3:>12.2f}{t_pegado * 1e3:>13.2f}{t_roto * 1e3:>21.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# benchmarks/bench_lookup.py
+"""
+Consulta de precio + stock por sku (app/consulta_pos.py) contra armar la
+respuesta desde los repos en cada llamada, con ventas intercaladas que
+invalidan la cache.
+
+    python -m benchmarks.bench_lookup --llantas 5000 --consultas 200000 --lote 200
+"""
+import argparse
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services import StoreService
+from app.utils import to_money
+from benchmarks.bench_snapshot import medir
+
+
+def construir(n_llantas: int, sedes: int = 3) -> StoreService:
+    s = StoreService()
+    for k in range(2, sedes + 1):
+        s.registrar_sede(f"Sede {k}")
+    for i in range(n_llantas):
+        ll = s.registrar_llanta(f"SKU-{i:06d}", "Marca", "Modelo", "205/55 R16", 90 + i % 300)
+        for sede_id in range(1, sedes + 1):
+            s.ajustar_inventario(ll.id, delta=1_000_000, umbral_minimo=5, sede_id=sede_id)
+    s.registrar_cliente("Mostrador", "0")
+    s.registrar_asesor("POS", "0")
+    return s
+
+
+def sin_cache(s: StoreService, sku: str) -> dict:
+    """Lo que hacía el POS: buscar la llanta, consultar disponibilidad y formatear el precio."""
+    ll = next(ll for ll in s.llantas.list() if ll.sku == sku)
+    disp = s.disponibilidad(ll.id)
+    return {"sku": ll.sku, "precio": to_money(ll.precio_venta), "stock": disp["total"],
+            "disponible": sum(x["disponible"] for x in disp["sedes"])}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--llantas", type=int, default=5000)
+    ap.add_argument("--consultas", type=int, default=200000)
+    ap.add_argument("--lote", type=int, default=200)
+    ap.add_argument("--ventas-cada", type=int, default=50, help="Una venta cada N consultas (invalida)")
+    args = ap.parse_args()
+
+    print(f"Catálogo de {args.llantas} llantas en 3 sedes…")
+    s = construir(args.llantas)
+    rnd = random.Random(7)
+    # Popularidad sesgada: pocas referencias concentran la mayoría de las consultas
+    pesos = [1 / (k + 1) for k in range(args.llantas)]
+    ids = rnd.choices(range(args.llantas), pesos, k=args.consultas)
+    skus = [f"SKU-{i:06d}" for i in ids]
+
+    def con_cache():
+        for n, sku in enumerate(skus):
+            reg = s.precio_stock(sku)
+            if n % args.ventas_cada == 0:
+                s.registrar_venta(1, 1, [(reg.llanta_id, 1)])
+
+    _, t_cache = medir(con_cache)
+    muestra = skus[:max(1, args.consultas // 100)]
+    _, t_sin = medir(lambda: [sin_cache(s, sku) for sku in muestra])
+    lote = skus[:args.lote]
+    (encontrados, faltantes), t_lote = medir(lambda: s.precio_stock_lote(lote))
+    assert not faltantes and len(encontrados) == len(set(lote))
+    for sku in muestra:
+        assert s.precio_stock(sku).stock == sin_cache(s, sku)["stock"]
+
+    print(f"{'con cache (por consulta)':<32}{t_cache / len(skus) * 1e6:>10.2f} µs")
+    print(f"{'sin cache (por consulta)':<32}{t_sin / len(muestra) * 1e6:>10.2f} µs")
+    print(f"{f'lote de {len(lote)}':<32}{t_lote * 1e3:>10.3f} ms")
+    print(f"cache: {s.precios_stock.estadisticas()}")
+
+
+if __name__ == "__main__":
+    main()
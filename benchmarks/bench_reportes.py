@@ -0,0 +1,49 @@
+# benchmarks/bench_reportes.py
+"""
+Escalado del reporte de período (app/reportes.py) según cantidad de procesos,
+contra el recorrido directo de los dataclasses en un solo hilo.
+
+    python -m benchmarks.bench_reportes --ventas 300000 --procesos 1 2 4 8
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_snapshot import construir, medir
+
+
+def recorrido_directo(s) -> int:
+    """Lo que hacía un reporte antes: loop de Python sobre Venta/VentaDetalle."""
+    total = 0
+    for _, dets in s.listar_ventas():
+        for d in dets:
+            total += d.subtotal
+    for dev in s.listar_devoluciones():
+        for d in dev.detalles:
+            total -= d.subtotal
+    return total
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--ventas", type=int, default=300000)
+    ap.add_argument("--procesos", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    args = ap.parse_args()
+
+    print(f"Construyendo store con {args.ventas} ventas…")
+    s = construir(args.ventas)
+    _, t_sync = medir(lambda: s.reporte_periodo(procesos=1))
+    print(f"Primera carga de columnas + reporte: {t_sync:.3f}s ({len(s.reportes)} filas)")
+
+    neto, t_base = medir(lambda: recorrido_directo(s))
+    print(f"{'recorrido directo':<20}{t_base:>10.3f}s")
+    for p in sorted(set(args.procesos)):
+        rep, t = medir(lambda: s.reporte_periodo(procesos=p))
+        assert rep["neto"] == neto
+        print(f"{f'{p} proceso(s)':<20}{t:>10.3f}s  x{t_base / t:.1f}")
+
+
+if __name__ == "__main__":
+    main()
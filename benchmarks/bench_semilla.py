@@ -0,0 +1,45 @@
+# benchmarks/bench_semilla.py
+"""
+Tiempo de armar un store grande con el generador sintético (app/semilla.py)
+y de las primeras consultas sobre él.
+
+    python -m benchmarks.bench_semilla --ventas 1000000
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.semilla import generar
+from app.services import StoreService as Store
+from benchmarks.bench_snapshot import medir
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--ventas", type=int, default=1000000)
+    ap.add_argument("--semilla", type=int, default=7)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "semilla.snap")
+        r, t_gen = medir(lambda: generar(path, args.ventas, semilla=args.semilla))
+        s, t_load = medir(lambda: Store.load(path))
+        _, t_get = medir(lambda: [s.ventas.get(i) for i in range(1, r["ventas"] + 1, 1000)])
+        _, t_bajo = medir(lambda: s.reporte_bajo_stock())
+        _, t_com = medir(lambda: s.liquidacion_comisiones("2025-12"))
+
+        print(f"{r['ventas']} ventas, {r['lineas']} líneas, {r['devoluciones']} devoluciones "
+              f"({os.path.getsize(path) / 1e6:.1f} MB)")
+        print(f"{'generar (s)':<28}{t_gen:>10.2f}")
+        print(f"{'abrir (s)':<28}{t_load:>10.3f}")
+        print(f"{'1 de cada 1000 ventas (s)':<28}{t_get:>10.4f}")
+        print(f"{'bajo stock (s)':<28}{t_bajo:>10.4f}")
+        print(f"{'comisiones del mes (s)':<28}{t_com:>10.4f}")
+        del s  # libera el mmap antes de borrar el directorio
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# benchmarks/bench_snapshot.py
+"""
+Compara el snapshot binario (StoreService.dump/load) con pickle de los repos.
+
+    python -m benchmarks.bench_snapshot --ventas 200000
+"""
+import argparse
+import os
+import pickle
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services import StoreService as Store
+
+
+def construir(n_ventas: int, n_llantas: int = 500, seed: int = 7) -> Store:
+    rnd = random.Random(seed)
+    s = Store()
+    for i in range(n_llantas):
+        ll = s.registrar_llanta(f"SKU-{i:05d}", "Marca", "Modelo", "205/55 R16", 100 + i % 50)
+        s.ajustar_inventario(ll.id, delta=10 ** 9, umbral_minimo=5)
+    cl = s.registrar_cliente("Cliente", "1")
+    asr = s.registrar_asesor("Asesor", "2")
+    for _ in range(n_ventas):
+        items = [(rnd.randint(1, n_llantas), rnd.randint(1, 4)) for _ in range(rnd.randint(1, 3))]
+        s.registrar_venta(cl.id, asr.id, items)
+    return s
+
+
+def _repos(s: Store) -> dict:
+    return {n: getattr(s, n) for n in ("llantas", "clientes", "asesores", "sedes", "inventarios", "ventas", "devoluciones")}
+
+
+def medir(fn):
+    t = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - t
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--ventas", type=int, default=100000)
+    args = ap.parse_args()
+
+    print(f"Construyendo store con {args.ventas} ventas…")
+    s = construir(args.ventas)
+    with tempfile.TemporaryDirectory() as d:
+        snap, pkl = os.path.join(d, "store.snap"), os.path.join(d, "store.pkl")
+
+        _, t_dump = medir(lambda: s.dump(snap))
+        def _pickle():
+            with open(pkl, "wb") as f:
+                pickle.dump(_repos(s), f, protocol=pickle.HIGHEST_PROTOCOL)
+        _, t_pdump = medir(_pickle)
+
+        s2, t_load = medir(lambda: Store.load(snap))
+        _, t_get = medir(lambda: [s2.ventas.get(i) for i in range(1, len(s2.ventas) + 1, 1000)])
+        _, t_all = medir(lambda: s2.listar_ventas())
+        def _unpickle():
+            with open(pkl, "rb") as f:
+                return pickle.load(f)
+        _, t_pload = medir(_unpickle)
+
+        print(f"{'':<22}{'snapshot':>12}{'pickle':>12}")
+        print(f"{'tamaño (MB)':<22}{os.path.getsize(snap) / 1e6:>12.1f}{os.path.getsize(pkl) / 1e6:>12.1f}")
+        print(f"{'guardar (s)':<22}{t_dump:>12.3f}{t_pdump:>12.3f}")
+        print(f"{'abrir (s)':<22}{t_load:>12.3f}{t_pload:>12.3f}")
+        print(f"{'1 de cada 1000 (s)':<22}{t_get:>12.4f}{'-':>12}")
+        print(f"{'decodificar todo (s)':<22}{t_all:>12.3f}{'-':>12}")
+        del s2  # libera el mmap antes de borrar el directorio
+
+
+if __name__ == "__main__":
+    main()
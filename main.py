@@ -1,7 +1,11 @@
 # main.py
 import argparse
 from decimal import Decimal
-from app.services import StoreService as Store, StockInsuficiente, DevolucionInvalida
+from app.services import (
+    StoreService as Store, StockInsuficiente, DevolucionInvalida, ReservaInvalida, CotizacionInvalida
+)
+from app.repositories import SEDE_PRINCIPAL
+from app.items import parsear_items, ItemsInvalidos
 
 # ==========================
 # Utilidades de impresión
@@ -14,9 +18,10 @@ def imprimir_inventario(store: Store):
         return
     for f in filas:
         alerta = " ⚠️" if f["alerta"] else ""
+        reservado = f" ({f['reservado']} reservadas)" if f["reservado"] else ""
         print(
-            f"- [{f['llanta_id']}] {f['sku']} ({f['marca']} {f['modelo']} {f['medida']}): "
-            f"{f['cantidad']} uds (umbral {f['umbral_minimo']}){alerta}"
+            f"- {f['sede']} · [{f['llanta_id']}] {f['sku']} ({f['marca']} {f['modelo']} {f['medida']}): "
+            f"{f['cantidad']} uds{reservado} (umbral {f['umbral_minimo']}){alerta}"
         )
 
 def imprimir_ventas(store: Store):
@@ -42,6 +47,88 @@ def imprimir_devoluciones(store: Store):
         for det in d.detalles:
             print(f"   · {det.cantidad} x LlantaID={det.llanta_id} @ {det.precio_unitario} = {det.subtotal}")
 
+def imprimir_reservas(store: Store):
+    print("\nRESERVAS ACTIVAS")
+    reservas = store.listar_reservas(solo_activas=True)
+    if not reservas:
+        print("  (no hay reservas activas)")
+        return
+    for r in reservas:
+        print(f"- Reserva #{r.id} | LlantaID={r.llanta_id} | {r.cantidad} uds | Expira {r.expira:%H:%M:%S}")
+
+def imprimir_cotizaciones(store: Store):
+    print("\nCOTIZACIONES VIGENTES")
+    cotizaciones = store.listar_cotizaciones()
+    if not cotizaciones:
+        print("  (no hay cotizaciones vigentes)")
+        return
+    for c in cotizaciones:
+        print(f"- Cotización #{c.id} | ClienteID={c.cliente_id} | Total={c.total} | Vence {c.vence:%Y-%m-%d}")
+        for d in c.detalles:
+            print(f"   · {d.cantidad} x LlantaID={d.llanta_id} @ {d.precio_unitario} = {d.subtotal}")
+
+def imprimir_sedes(store: Store):
+    print("\nSEDES")
+    for s in store.sedes.list():
+        extra = f" | {s.direccion}" if s.direccion else ""
+        print(f"- [{s.id}] {s.nombre}{extra}")
+
+def imprimir_disponibilidad(store: Store, llanta_id: int):
+    disp = store.disponibilidad(llanta_id)
+    print(f"\nDISPONIBILIDAD LlantaID={llanta_id} (total {disp['total']} uds)")
+    if not disp["sedes"]:
+        print("  (sin inventario en ninguna sede)")
+    for f in disp["sedes"]:
+        print(f"- [{f['sede_id']}] {f['sede']}: {f['disponible']} disponibles "
+              f"({f['cantidad']} físicas, {f['reservado']} reservadas)")
+
+def imprimir_kardex(store: Store, llanta_id: int):
+    print(f"\nKARDEX LlantaID={llanta_id}")
+    hay = False
+    for sede in store.sedes.list():
+        for m in store.kardex.movimientos(llanta_id, sede.id):
+            hay = True
+            print(f"- {m['fecha']:%Y-%m-%d %H:%M:%S} | {sede.nombre} | {m['tipo']:<13} | "
+                  f"{m['cantidad']:+d} → saldo {m['saldo']} (ref {m['referencia']})")
+    if not hay:
+        print("  (sin movimientos)")
+
+def imprimir_reorden(store: Store):
+    print("\nSUGERENCIAS DE REORDEN (velocidad de venta)")
+    filas = store.sugerencias_reorden()
+    if not filas:
+        print("  (nada que pedir)")
+        return
+    for f in filas:
+        cobertura = f"{f['dias_cobertura']} días" if f["dias_cobertura"] is not None else "sin ventas"
+        print(f"- [{f['llanta_id']}] {f['sku']}: stock {f['stock']} | {f['velocidad_diaria']} uds/día | "
+              f"cobertura {cobertura} | umbral sugerido {f['umbral_recomendado']} | "
+              f"pedir {f['cantidad_sugerida']}")
+
+def imprimir_historial_cliente(store: Store, documento: str):
+    h = store.historial_cliente(documento=documento)
+    c = h["cliente"]
+    print(f"\nHISTORIAL {c.nombre} ({c.documento}) — {h['total_ventas']} compras")
+    if not h["compras"]:
+        print("  (sin compras)")
+    for compra in h["compras"]:
+        v = compra["venta"]
+        print(f"- Venta #{v.id} | Fecha={v.fecha} | Total={v.total}")
+        for d in compra["detalles"]:
+            print(f"   · {d.cantidad} x LlantaID={d.llanta_id} @ {d.precio_unitario} = {d.subtotal}")
+        for dev in compra["devoluciones"]:
+            print(f"   ↩ Devolución #{dev.id} ({dev.motivo}): " +
+                  ", ".join(f"{det.cantidad} x LlantaID={det.llanta_id}" for det in dev.detalles))
+
+def imprimir_comisiones(store: Store, periodo: str | None = None):
+    filas = store.liquidacion_comisiones(periodo)
+    print(f"\nCOMISIONES {periodo or 'del mes'}")
+    if not filas:
+        print("  (sin ventas en el período)")
+    for f in filas:
+        print(f"- [{f['asesor_id']}] {f['asesor']}: {f['ventas']} ventas | volumen {f['volumen']} | "
+              f"comisión {f['comision']} + bono {f['bono']} = {f['comision_total']}")
+
 def imprimir_clientes(store: Store):
     print("\nCLIENTES")
     clientes = store.clientes.list()
@@ -97,6 +184,13 @@ def pedir_int(msg: str, minimo: int | None = None) -> int:
             continue
         return val
 
+def pedir_sede(store: Store) -> int:
+    """Pide la sede solo si hay más de una; si no, usa la principal."""
+    if len(store.sedes.list()) == 1:
+        return SEDE_PRINCIPAL
+    imprimir_sedes(store)
+    return pedir_int("ID de sede: ", minimo=1)
+
 def pedir_str(msg: str, obligatorio: bool = True) -> str:
     while True:
         s = input(msg).strip()
@@ -105,6 +199,26 @@ def pedir_str(msg: str, obligatorio: bool = True) -> str:
             continue
         return s
 
+def pedir_items(titulo: str) -> list[tuple[int, int]]:
+    """
+    Ítems como "ID x CANTIDAD": uno por línea o varios separados por coma
+    (también se puede pegar una lista). Línea vacía para terminar.
+    """
+    print(f"{titulo} (ej. 1x2 o 1x2, 3x1; vacío para terminar)")
+    lineas = []
+    while True:
+        s = pedir_str("Ítems: ", obligatorio=False)
+        if not s:
+            break
+        try:
+            parsear_items(s)
+        except ItemsInvalidos as e:
+            print(f"  → {e}")
+            continue
+        lineas.append(s)
+    # Se parsea todo junto para sumar llantas repetidas entre líneas
+    return parsear_items("\n".join(lineas)) if lineas else []
+
 # ==========================
 # Menú CLI
 # ==========================
@@ -126,6 +240,21 @@ def menu_cli():
         "11": "Actualizar precio de llanta",
         "12": "Listar clientes",          
         "13": "Listar asesores",          
+        "14": "Reservar stock (cotización)",
+        "15": "Listar reservas activas",
+        "16": "Liberar reserva",
+        "17": "Convertir reservas en venta",
+        "18": "Registrar sede",
+        "19": "Listar sedes",
+        "20": "Disponibilidad de llanta por sede",
+        "21": "Transferir stock entre sedes",
+        "22": "Kardex de llanta (movimientos)",
+        "23": "Reporte: Sugerencias de reorden",
+        "24": "Historial de compras de cliente",
+        "25": "Liquidación de comisiones (mes)",
+        "26": "Cotizar (precios congelados)",
+        "27": "Listar cotizaciones vigentes",
+        "28": "Convertir cotización en venta",
         "0": "Salir",
     }
 
@@ -158,8 +287,9 @@ def menu_cli():
             delta = int(pedir_str("Delta de stock (positivo o negativo): "))
             umbral_in = pedir_str("Nuevo umbral (vacío para no cambiar): ", obligatorio=False)
             umbral = int(umbral_in) if umbral_in else None
+            sede_id = pedir_sede(store)
             try:
-                inv = store.ajustar_inventario(llanta_id, delta=delta, umbral_minimo=umbral)
+                inv = store.ajustar_inventario(llanta_id, delta=delta, umbral_minimo=umbral, sede_id=sede_id)
                 print(f"✔ Inventario actualizado: cantidad={inv.cantidad_disponible}, umbral={inv.umbral_minimo}")
             except Exception as e:
                 print("✖ No se pudo ajustar inventario:", e)
@@ -197,26 +327,16 @@ def menu_cli():
             asesor_id = pedir_int("ID de asesor: ", minimo=1)
 
             # Ítems de la venta
-            items = []
-            print("\nAgrega ítems (deja llanta en blanco para terminar)")
-            while True:
-                s = pedir_str("ID llanta (o vacío para terminar): ", obligatorio=False)
-                if not s:
-                    break
-                if not s.isdigit():
-                    print("  → Debe ser numérico.")
-                    continue
-                ll_id = int(s)
-                cant = pedir_int("Cantidad: ", minimo=1)
-                items.append((ll_id, cant))
+            items = pedir_items("\nAgrega ítems")
 
             if not items:
                 print("✖ Venta cancelada: no se agregaron ítems.")
                 continue
 
-            # Registrar venta
+            # Registrar venta (descuenta de la sede elegida)
+            sede_id = pedir_sede(store)
             try:
-                venta = store.registrar_venta(cliente_id, asesor_id, items)
+                venta = store.registrar_venta(cliente_id, asesor_id, items, sede_id=sede_id)
                 print(f"✔ VENTA #{venta.id} creada. Total = {venta.total}")
             except StockInsuficiente as e:
                 print("✖ Stock insuficiente:", e)
@@ -239,18 +359,7 @@ def menu_cli():
             # Registrar devolución con motivo
             imprimir_ventas(store)
             venta_id = pedir_int("ID de venta a devolver: ", minimo=1)
-            items = []
-            print("\nAgrega ítems a devolver (vacío para terminar)")
-            while True:
-                s = pedir_str("ID llanta (o vacío): ", obligatorio=False)
-                if not s:
-                    break
-                if not s.isdigit():
-                    print("  → Debe ser numérico.")
-                    continue
-                ll_id = int(s)
-                cant = pedir_int("Cantidad a devolver: ", minimo=1)
-                items.append((ll_id, cant))
+            items = pedir_items("\nAgrega ítems a devolver")
             motivo = pedir_str("Motivo de la devolución: ")
             try:
                 dev = store.registrar_devolucion(venta_id, items, motivo)
@@ -279,6 +388,122 @@ def menu_cli():
         elif op == "13":
             imprimir_asesores(store)
 
+        elif op == "14":
+            imprimir_inventario(store)
+            ll_id = pedir_int("ID de llanta a reservar: ", minimo=1)
+            cant = pedir_int("Cantidad: ", minimo=1)
+            minutos = pedir_int("Minutos de reserva: ", minimo=1)
+            sede_id = pedir_sede(store)
+            try:
+                r = store.reservar_stock(ll_id, cant, ttl_segundos=minutos * 60, sede_id=sede_id)
+                print(f"✔ Reserva #{r.id} creada. Expira {r.expira:%H:%M:%S}")
+            except (StockInsuficiente, ReservaInvalida) as e:
+                print("✖ No se pudo reservar:", e)
+
+        elif op == "15":
+            imprimir_reservas(store)
+
+        elif op == "16":
+            imprimir_reservas(store)
+            rid = pedir_int("ID de reserva a liberar: ", minimo=1)
+            try:
+                store.liberar_reserva(rid)
+                print(f"✔ Reserva #{rid} liberada.")
+            except ReservaInvalida as e:
+                print("✖ Error:", e)
+
+        elif op == "17":
+            imprimir_reservas(store)
+            ids_in = pedir_str("IDs de reserva (separados por coma): ")
+            imprimir_clientes(store)
+            cliente_id = pedir_int("ID de cliente: ", minimo=1)
+            imprimir_asesores(store)
+            asesor_id = pedir_int("ID de asesor: ", minimo=1)
+            try:
+                ids = [int(x) for x in ids_in.split(",") if x.strip()]
+                venta = store.convertir_reservas(ids, cliente_id, asesor_id)
+                print(f"✔ VENTA #{venta.id} creada desde reservas. Total = {venta.total}")
+            except Exception as e:
+                print("✖ Error:", e)
+
+        elif op == "18":
+            nombre = pedir_str("Nombre de la sede: ")
+            direccion = pedir_str("Dirección (opcional): ", obligatorio=False)
+            sede = store.registrar_sede(nombre, direccion or None)
+            print(f"✔ Sede creada con ID {sede.id}")
+
+        elif op == "19":
+            imprimir_sedes(store)
+
+        elif op == "20":
+            ll_id = pedir_int("ID de llanta: ", minimo=1)
+            try:
+                imprimir_disponibilidad(store, ll_id)
+            except Exception as e:
+                print("✖ Error:", e)
+
+        elif op == "21":
+            imprimir_sedes(store)
+            ll_id = pedir_int("ID de llanta: ", minimo=1)
+            origen = pedir_int("Sede origen: ", minimo=1)
+            destino = pedir_int("Sede destino: ", minimo=1)
+            cant = pedir_int("Cantidad: ", minimo=1)
+            try:
+                store.transferir_stock(ll_id, origen, destino, cant)
+                print("✔ Transferencia realizada.")
+                imprimir_disponibilidad(store, ll_id)
+            except Exception as e:
+                print("✖ No se pudo transferir:", e)
+
+        elif op == "22":
+            ll_id = pedir_int("ID de llanta: ", minimo=1)
+            imprimir_kardex(store, ll_id)
+
+        elif op == "23":
+            imprimir_reorden(store)
+
+        elif op == "24":
+            documento = pedir_str("Documento del cliente: ")
+            try:
+                imprimir_historial_cliente(store, documento)
+            except Exception as e:
+                print("✖ Error:", e)
+
+        elif op == "25":
+            periodo = pedir_str("Período AAAA-MM (Enter = mes actual): ", obligatorio=False)
+            imprimir_comisiones(store, periodo or None)
+
+        elif op == "26":
+            imprimir_inventario(store)
+            imprimir_clientes(store)
+            cliente_id = pedir_int("ID de cliente: ", minimo=1)
+            imprimir_asesores(store)
+            asesor_id = pedir_int("ID de asesor: ", minimo=1)
+            items = pedir_items("\nAgrega ítems a cotizar")
+            if not items:
+                print("✖ Cotización cancelada: no se agregaron ítems.")
+                continue
+            dias = pedir_int("Días de validez: ", minimo=1)
+            try:
+                c = store.cotizar(cliente_id, asesor_id, items, dias_validez=dias)
+                print(f"✔ COTIZACIÓN #{c.id} creada. Total = {c.total} (vence {c.vence:%Y-%m-%d})")
+            except Exception as e:
+                print("✖ Error:", e)
+
+        elif op == "27":
+            imprimir_cotizaciones(store)
+
+        elif op == "28":
+            imprimir_cotizaciones(store)
+            cid = pedir_int("ID de cotización: ", minimo=1)
+            try:
+                venta = store.convertir_cotizacion(cid)
+                print(f"✔ VENTA #{venta.id} creada desde cotización. Total = {venta.total}")
+            except StockInsuficiente as e:
+                print("✖ Stock insuficiente:", e)
+            except CotizacionInvalida as e:
+                print("✖ Error:", e)
+
         else:
             print("Opción inválida.")
 
@@ -306,6 +531,48 @@ def demo_automatica():
 
     imprimir_inventario(store)
 
+# ==========================
+# Reporte de período (--reporte)
+# ==========================
+def reporte_periodo(snapshot: str | None, desde: str | None, hasta: str | None, procesos: int | None):
+    """Imprime ventas netas por sede y por llanta, calculadas en paralelo."""
+    from datetime import datetime
+    store = Store.load(snapshot) if snapshot else Store()
+    if not snapshot:
+        seed_minimo(store)
+    d = datetime.fromisoformat(desde) if desde else None
+    h = datetime.fromisoformat(hasta) if hasta else None
+    rep = store.reporte_periodo(d, h, procesos)
+
+    print(f"\nREPORTE {desde or 'inicio'} → {hasta or 'hoy'} ({rep['procesos']} procesos)")
+    print(f"  Ventas: {rep['ventas']} | Unidades: {rep['unidades']} | Ingresos: {rep['ingresos']}")
+    print(f"  Devoluciones: {rep['unidades_devueltas']} uds por {rep['monto_devuelto']} | Neto: {rep['neto']}")
+    print("\nPOR SEDE")
+    for f in rep["por_sede"].values():
+        print(f"- {f['sede']}: {f['ventas']} ventas | {f['unidades'] - f['unidades_devueltas']} uds netas | neto {f['neto']}")
+    print("\nPOR LLANTA")
+    if not rep["por_llanta"]:
+        print("  (sin ventas en el período)")
+    for llanta_id, f in rep["por_llanta"].items():
+        print(f"- [{llanta_id}] {f['sku']}: {f['unidades']} vendidas, {f['unidades_devueltas']} devueltas | neto {f['neto']}")
+
+# ==========================
+# Datos sintéticos (--seed)
+# ==========================
+def sembrar(ventas: int, snapshot: str | None, semilla: int, hasta: str | None):
+    """Genera un snapshot con `ventas` ventas sintéticas (ver app/semilla.py)."""
+    import time
+    from datetime import datetime
+    from app.semilla import generar
+    path = snapshot or "semilla.snap"
+    t = time.perf_counter()
+    r = generar(path, ventas, semilla=semilla, hasta=datetime.fromisoformat(hasta) if hasta else None)
+    print(f"\nSnapshot {path} generado en {time.perf_counter() - t:.1f} s (semilla {semilla})")
+    print(f"  {r['llantas']} llantas | {r['clientes']} clientes | {r['asesores']} asesores | {r['sedes']} sedes")
+    print(f"  {r['ventas']} ventas ({r['lineas']} líneas) y {r['devoluciones']} devoluciones, "
+          f"{r['desde']:%Y-%m-%d} → {r['hasta']:%Y-%m-%d} | Total vendido: {r['total']}")
+    print(f"  Usar con: python main.py --reporte --snapshot {path}  o  SERVITECA_SNAPSHOT={path} (web)")
+
 # ==========================
 # Ejecutar unittest desde main.py
 # ==========================
@@ -343,9 +610,10 @@ def _ver_inventario(store: Store, titulo: str = "INVENTARIO"):
         return
     for f in filas:
         alerta = " ⚠️" if f["alerta"] else ""
+        reservado = f" ({f['reservado']} reservadas)" if f["reservado"] else ""
         print(
-            f"- [{f['llanta_id']}] {f['sku']} ({f['marca']} {f['modelo']} {f['medida']}): "
-            f"{f['cantidad']} uds (umbral {f['umbral_minimo']}){alerta}"
+            f"- {f['sede']} · [{f['llanta_id']}] {f['sku']} ({f['marca']} {f['modelo']} {f['medida']}): "
+            f"{f['cantidad']} uds{reservado} (umbral {f['umbral_minimo']}){alerta}"
         )
 
 def _ver_ventas(store: Store, titulo: str = "VENTAS"):
@@ -389,6 +657,26 @@ def selftest():
 
     print("\nRESULTADO SELFTEST: TODO OK ✅")
 
+# ==========================
+# Perfilado (--profile)
+# ==========================
+MODOS = {
+    "demo": lambda args: demo_automatica(),
+    "cli": lambda args: menu_cli(),
+    "selftest": lambda args: selftest(),
+    "run-tests": lambda args: run_unittests_from_main(),
+    "reporte": lambda args: reporte_periodo(args.snapshot, args.desde, args.hasta, args.procesos),
+    "seed": lambda args: sembrar(args.seed, args.snapshot, args.semilla, args.hasta),
+}
+
+def perfilar_modo(args):
+    """Corre el modo bajo cProfile + tracemalloc y muestra las funciones más costosas."""
+    from app.perfilado import perfilar, resumen
+    with perfilar(f"main-{args.profile}", args.profile_dir) as base:
+        MODOS[args.profile](args)
+    print(resumen(base + ".prof"))
+    print(f"Perfil guardado en {base}.prof (memoria en {base}.mem.txt)")
+
 # ==========================
 # Punto de entrada
 # ==========================
@@ -397,13 +685,31 @@ if __name__ == "__main__":
     parser.add_argument("--cli", action="store_true", help="Abrir menú interactivo en consola")
     parser.add_argument("--run-tests", action="store_true", help="Correr tests de unittest y mostrarlos en consola")
     parser.add_argument("--selftest", action="store_true", help="Pruebas visibles paso a paso en consola")
+    parser.add_argument("--reporte", action="store_true", help="Reporte de ventas netas del período (en paralelo)")
+    parser.add_argument("--snapshot", help="Snapshot del store a usar (ver StoreService.dump)")
+    parser.add_argument("--desde", help="Inicio del período, AAAA-MM-DD (incluido)")
+    parser.add_argument("--hasta", help="Fin del período, AAAA-MM-DD (excluido)")
+    parser.add_argument("--procesos", type=int, help="Procesos para el reporte (por defecto, todos los núcleos)")
+    parser.add_argument("--seed", type=int, metavar="N",
+                        help="Generar un snapshot con N ventas sintéticas (en --snapshot, default semilla.snap)")
+    parser.add_argument("--semilla", type=int, default=7, help="Semilla del generador de --seed (default: 7)")
+    parser.add_argument("--profile", choices=sorted(MODOS), help="Correr ese modo perfilado (cProfile + tracemalloc)")
+    parser.add_argument("--profile-dir", default="perfiles", help="Carpeta de los perfiles (default: perfiles)")
     args = parser.parse_args()
-
-    if args.run_tests:
-        run_unittests_from_main()
+    if args.profile == "seed" and args.seed is None:
+        parser.error("--profile seed requiere --seed N")
+
+    if args.profile:
+        perfilar_modo(args)
+    elif args.seed is not None:
+        MODOS["seed"](args)
+    elif args.reporte:
+        MODOS["reporte"](args)
+    elif args.run_tests:
+        MODOS["run-tests"](args)
     elif args.selftest:
-        selftest()
+        MODOS["selftest"](args)
     elif args.cli:
-        menu_cli()
+        MODOS["cli"](args)
     else:
-        demo_automatica()
+        MODOS["demo"](args)
@@ -0,0 +1,105 @@
+import os
+import shutil
+import tempfile
+import unittest
+from decimal import Decimal
+from app.archivo import ArchivoVentas, ArchivoInvalido, Segmento
+from app.services import StoreService as Store, DevolucionInvalida
+
+class TestArchivoVentas(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, True)
+        s = self.store = Store()
+        self.ll = s.registrar_llanta("L-205-55R16", "X", "Sport", "205/55 R16", 120)
+        s.ajustar_inventario(self.ll.id, delta=5000, umbral_minimo=5)
+        self.cli = s.registrar_cliente("María López", "12345678")
+        self.asr = s.registrar_asesor("Carlos Pérez", "87654321")
+        self.ventas = [s.registrar_venta(self.cli.id, self.asr.id, [(self.ll.id, 1 + i % 3)]) for i in range(600)]
+        self.dev = s.registrar_devolucion(self.ventas[3].id, [(self.ll.id, 1)], "Garantía")
+        self.corte = self.ventas[400].fecha
+
+    def _archivar(self, store=None, corte=None):
+        return (store or self.store).archivar_ventas(corte or self.corte, os.path.join(self.dir, "arch"))
+
+    def test_archiva_y_sigue_viendo_todo(self):
+        s = self.store
+        antes = [(v.id, v.total, [d.cantidad for d in dets]) for v, dets in s.listar_ventas()]
+        res = self._archivar()
+        self.assertEqual((res["ventas"], res["devoluciones"]), (400, 1))
+        self.assertEqual(len(s.ventas._data), 200)   # solo lo reciente queda en memoria
+        self.assertEqual(len(s.ventas), 600)
+        self.assertEqual([(v.id, v.total, [d.cantidad for d in dets]) for v, dets in s.listar_ventas()], antes)
+        self.assertEqual(len(s.listar_ventas(incluir_archivadas=False)), 200)
+        self.assertEqual(s.devoluciones.get(self.dev.id).motivo, "Garantía")
+        self.assertEqual(s.estadisticas()["ventas_archivadas"], 400)
+
+    def test_devoluciones_e_historial_sobre_ventas_archivadas(self):
+        s = self.store
+        self._archivar()
+        v = self.ventas[3]
+        with self.assertRaises(DevolucionInvalida):
+            s.registrar_devolucion(v.id, [(self.ll.id, 5)], "Demasiado")
+        dev = s.registrar_devolucion(v.id, [(self.ll.id, 1)], "Otra")
+        self.assertEqual(dev.detalles[0].precio_unitario, Decimal("120.00"))
+        h = s.historial_cliente(self.cli.id, pagina=150, por_pagina=4)  # ventas 1..4
+        compra = [c for c in h["compras"] if c["venta"].id == v.id][0]
+        self.assertEqual([d.motivo for d in compra["devoluciones"]], ["Garantía", "Otra"])
+        # La devolución nueva de una venta ya archivada sale de memoria en la corrida siguiente
+        res = self._archivar(corte=self.ventas[450].fecha)
+        self.assertEqual((res["ventas"], res["devoluciones"]), (50, 1))
+        self.assertEqual(s.devoluciones.ids_en_memoria(), [])
+        self.assertEqual(s.devoluciones.get(dev.id).motivo, "Otra")
+
+    def test_vista_previa_no_cambia(self):
+        vista = self.store.snapshot()
+        self._archivar()
+        self.assertEqual(len(vista.listar_ventas()), 600)
+        self.assertEqual(vista.ventas.get(1).total, self.ventas[0].total)
+
+    def test_segmentos_sucesivos_y_recarga(self):
+        s = self.store
+        self._archivar()
+        self._archivar(corte=self.ventas[500].fecha)
+        self.assertEqual([r["ventas"] for r in s.archivo.resumen()], [400, 100])
+        path = os.path.join(self.dir, "tienda.snap")
+        s.dump(path)
+        s2 = Store.load(path)
+        # El snapshot trae solo lo que estaba en memoria y vuelve a abrir el archivo
+        self.assertEqual((len(s2.ventas._ids), len(s2.devoluciones._ids)), (100, 0))
+        self.assertEqual(s2.archivo.directorio, os.path.join(self.dir, "arch"))
+        self.assertEqual(len(s2.ventas), 600)
+        self.assertEqual(s2.ventas.get(7).total, self.ventas[6].total)
+        self.assertEqual(s2.devoluciones.get(self.dev.id).motivo, "Garantía")
+        self.assertEqual(s2.historial_cliente(self.cli.id)["total_ventas"], 600)
+        res = self._archivar(s2, self.ventas[500].fecha)
+        self.assertEqual((res["ventas"], res["segmento"]), (0, None))
+        self.assertEqual(len(s2.listar_ventas(incluir_archivadas=False)), 100)
+        self.assertEqual([v.id for v, _ in s2.listar_ventas()], list(range(1, 601)))
+        s2.registrar_venta(self.cli.id, self.asr.id, [(self.ll.id, 1)])
+        self.assertEqual(s2.listar_ventas()[-1][0].id, 601)
+        self._archivar(s2, s2.ventas.get(601).fecha)
+        self.assertEqual((len(s2.ventas), len(s2.listar_ventas(incluir_archivadas=False))), (601, 1))
+        self.assertEqual([v.id for v, _ in s2.listar_ventas()], list(range(1, 602)))
+        self.assertEqual(s2.registrar_venta(self.cli.id, self.asr.id, [(self.ll.id, 1)]).id, 602)
+
+    def test_lectura_por_bloques_con_cache(self):
+        self._archivar()
+        arch = ArchivoVentas(os.path.join(self.dir, "arch"), bloques_en_cache=2)
+        self.assertEqual(arch.ventas.get(10).id, 10)
+        self.assertEqual(arch.ventas.get(11).id, 11)
+        self.assertEqual(arch.lecturas_bloque, 1)   # mismo bloque
+        self.assertIsNone(arch.ventas.get(401))
+        self.assertNotIn(401, arch.ventas)
+        self.assertEqual([v.id for v in arch.ventas.iterar()], list(range(1, 401)))
+        arch.cerrar()
+
+    def test_segmento_invalido(self):
+        path = os.path.join(self.dir, "roto.arch")
+        with open(path, "wb") as f:
+            f.write(b"no es un segmento" * 4)
+        with self.assertRaises(ArchivoInvalido):
+            Segmento(path)
+
+if __name__ == "__main__":
+    unittest.main()
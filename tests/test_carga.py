@@ -0,0 +1,17 @@
+import unittest
+
+try:
+    from fastapi.testclient import TestClient
+    from web.server import app
+except ImportError:  # la app web es opcional para los tests del dominio
+    TestClient = None
+
+from benchmarks.bench_carga import correr
+
+@unittest.skipIf(TestClient is None, "fastapi no instalado")
+class TestCargaConcurrente(unittest.TestCase):
+    def test_invariantes_con_terminales_concurrentes(self):
+        with TestClient(app, follow_redirects=False) as http:
+            res, _, fallas = correr(http, terminales=4, operaciones=25, n_llantas=3, stock=40)
+        self.assertEqual(fallas, [])
+        self.assertGreater(res.ventas_ok, 0)
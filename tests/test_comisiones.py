@@ -0,0 +1,108 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from decimal import Decimal
+from types import SimpleNamespace
+from app.comisiones import MotorComisiones, ReglasComision, periodo_de
+from app.models import VentaDetalle, DevolucionDetalle
+from app.services import StoreService as Store
+
+class TestMotorComisiones(unittest.TestCase):
+    def setUp(self):
+        self.motor = MotorComisiones(ReglasComision(
+            porcentaje_base=Decimal("0.02"),
+            porcentaje_por_marca={"Premium": Decimal("0.05")},
+            tramos=[(Decimal("1000"), Decimal("0.01")), (Decimal("5000"), Decimal("0.02"))],
+        ))
+        self.marcas = {1: "Premium", 2: "Económica"}
+
+    def _venta(self, asesor_id, fecha, *lineas):
+        dets = [VentaDetalle(ll, c, Decimal(p), Decimal(p) * c) for ll, c, p in lineas]
+        venta = SimpleNamespace(asesor_id=asesor_id, fecha=fecha)
+        self.motor.registrar_venta(venta, dets, self.marcas.get)
+        return venta, dets
+
+    def test_porcentaje_por_marca_y_tramo(self):
+        self._venta(1, datetime(2025, 3, 5), (1, 4, "200"), (2, 2, "100"))
+        f = self.motor.liquidar(1, "2025-03")
+        self.assertEqual((f["ventas"], f["unidades"], f["volumen"]), (1, 6, Decimal("1000.00")))
+        self.assertEqual(f["comision"], Decimal("44.00"))  # 800 * 5% + 200 * 2%
+        self.assertEqual((f["porcentaje_extra"], f["bono"]), (Decimal("0.01"), Decimal("10.00")))
+        self.assertEqual(f["comision_total"], Decimal("54.00"))
+
+    def test_devolucion_descuenta_en_su_periodo(self):
+        venta, dets = self._venta(1, datetime(2025, 3, 30), (1, 4, "200"))
+        dev = SimpleNamespace(fecha=datetime(2025, 4, 2), detalles=[DevolucionDetalle(1, 1, Decimal("200"), Decimal("200"))])
+        self.motor.registrar_devolucion(dev, venta, dets, self.marcas.get)
+        self.assertEqual(self.motor.liquidar(1, "2025-03")["comision"], Decimal("40.00"))
+        abril = self.motor.liquidar(1, "2025-04")
+        self.assertEqual((abril["comision"], abril["volumen"], abril["bono"]), (Decimal("-10.00"), Decimal("-200.00"), Decimal("0.00")))
+
+    def test_clawback_con_precio_y_reglas_de_la_venta(self):
+        venta, dets = self._venta(1, datetime(2025, 3, 10), (1, 2, "200"))
+        self.motor.cambiar_reglas(ReglasComision(porcentaje_base=Decimal("0.10")), desde=datetime(2025, 3, 20))
+        # La devolución llega con el precio de hoy (250), pero se pagó 5% sobre 200
+        dev = SimpleNamespace(fecha=datetime(2025, 3, 25), detalles=[DevolucionDetalle(1, 1, Decimal("250"), Decimal("250"))])
+        self.motor.registrar_devolucion(dev, venta, dets, self.marcas.get)
+        f = self.motor.liquidar(1, "2025-03")
+        self.assertEqual((f["volumen"], f["comision"]), (Decimal("200.00"), Decimal("10.00")))
+        with self.assertRaises(ValueError):
+            self.motor.cambiar_reglas(ReglasComision(), desde=datetime(2025, 3, 1))
+
+    def test_bono_con_los_tramos_del_periodo(self):
+        self._venta(1, datetime(2025, 3, 5), (2, 10, "100"))
+        self.motor.cambiar_reglas(ReglasComision(tramos=[(Decimal("1000"), Decimal("0.05"))]),
+                                  desde=datetime(2025, 4, 1))
+        self._venta(1, datetime(2025, 4, 5), (2, 10, "100"))
+        self.assertEqual(self.motor.liquidar(1, "2025-03")["bono"], Decimal("10.00"))  # 1% de marzo
+        self.assertEqual(self.motor.liquidar(1, "2025-04")["bono"], Decimal("50.00"))
+        self.assertEqual(self.motor.vista().liquidar(1, "2025-03")["bono"], Decimal("10.00"))
+
+    def test_ranking(self):
+        self._venta(1, datetime(2025, 3, 1), (2, 1, "100"))
+        self._venta(2, datetime(2025, 3, 1), (2, 3, "100"))
+        self._venta(3, datetime(2025, 3, 1), (1, 1, "100"))
+        self.assertEqual([f["asesor_id"] for f in self.motor.ranking("2025-03", n=2)], [2, 1])
+        self.assertEqual(self.motor.ranking("2025-03", por="comision_total", n=1)[0]["asesor_id"], 2)
+        self.assertEqual(self.motor.liquidacion("2025-02"), [])
+
+
+class TestComisionesEnStore(unittest.TestCase):
+    def setUp(self):
+        s = self.store = Store()
+        self.ll = s.registrar_llanta("L-205-55R16", "X", "Sport", "205/55 R16", 100)
+        s.ajustar_inventario(self.ll.id, delta=50, umbral_minimo=5)
+        cl = s.registrar_cliente("María López", "12345678")
+        self.a1 = s.registrar_asesor("Carlos Pérez", "87654321")
+        self.a2 = s.registrar_asesor("Ana Ruiz", "111")
+        self.v = s.registrar_venta(cl.id, self.a1.id, [(self.ll.id, 3)])
+        s.registrar_venta(cl.id, self.a2.id, [(self.ll.id, 1)])
+        s.registrar_devolucion(self.v.id, [(self.ll.id, 1)], "Defecto")
+
+    def test_liquidacion_y_ranking(self):
+        liq = {f["asesor_id"]: f for f in self.store.liquidacion_comisiones()}
+        self.assertEqual(liq[self.a1.id]["volumen"], Decimal("200.00"))
+        self.assertEqual(liq[self.a1.id]["comision"], Decimal("4.00"))
+        self.assertEqual(self.store.ranking_asesores(n=1)[0]["asesor"], "Carlos Pérez")
+
+    def test_devolucion_tras_cambio_de_precio(self):
+        s = self.store
+        s.actualizar_precio_llanta(self.ll.id, 300)
+        s.comisiones.reglas = ReglasComision(porcentaje_base=Decimal("0.10"))
+        s.registrar_devolucion(self.v.id, [(self.ll.id, 1)], "Defecto")
+        liq = {f["asesor_id"]: f for f in s.liquidacion_comisiones()}
+        # 3 vendidas a 100 al 2%, dos devueltas: queda lo de una unidad
+        self.assertEqual((liq[self.a1.id]["volumen"], liq[self.a1.id]["comision"]), (Decimal("100.00"), Decimal("2.00")))
+
+    def test_acumulados_sobreviven_al_snapshot(self):
+        self.store.comisiones.cambiar_reglas(ReglasComision(
+            porcentaje_por_marca={"X": Decimal("0.03")}, tramos=[(Decimal("500"), Decimal("0.01"))]))
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "store.snap")
+            self.store.dump(path)
+            s2 = Store.load(path)
+            self.assertEqual(s2.liquidacion_comisiones(), self.store.liquidacion_comisiones())
+            self.assertEqual(s2.comisiones.periodos(), [periodo_de(self.v.fecha)])
+            self.assertEqual(s2.comisiones._reglas, self.store.comisiones._reglas)
+            del s2
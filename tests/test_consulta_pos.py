@@ -0,0 +1,106 @@
+import os
+import tempfile
+import unittest
+from datetime import timedelta
+from decimal import Decimal
+from app.consulta_pos import CachePrecioStock
+from app.services import StoreService as Store, LlantaNoEncontrada
+from app.utils import now_ts
+
+try:
+    from fastapi.testclient import TestClient
+    from web.server import app
+except ImportError:  # la app web es opcional para los tests del dominio
+    TestClient = None
+
+class TestPrecioStock(unittest.TestCase):
+    def setUp(self):
+        s = self.store = Store()
+        self.ll = s.registrar_llanta("L-205-55R16", "X", "Sport", "205/55 R16", 120)
+        s.ajustar_inventario(self.ll.id, delta=10, umbral_minimo=2)
+        self.sede2 = s.registrar_sede("Norte")
+        self.cli = s.registrar_cliente("María López", "12345678")
+        self.asr = s.registrar_asesor("Carlos Pérez", "87654321")
+
+    def _stock(self):
+        reg = self.store.precio_stock("L-205-55R16")
+        return reg.stock, reg.disponible
+
+    def test_registro_inmutable_y_cacheado(self):
+        reg = self.store.precio_stock(" L-205-55R16 ")
+        self.assertEqual((reg.precio, reg.stock, reg.por_sede), (Decimal("120.00"), 10, ((1, 10),)))
+        self.assertIs(self.store.precio_stock("L-205-55R16"), reg)
+        with self.assertRaises(AttributeError):
+            reg.stock = 0
+        with self.assertRaises(LlantaNoEncontrada):
+            self.store.precio_stock("NO-EXISTE")
+
+    def test_invalidan_las_escrituras(self):
+        s = self.store
+        self._stock()
+        s.ajustar_inventario(self.ll.id, delta=5)
+        self.assertEqual(self._stock(), (15, 15))
+        v = s.registrar_venta(self.cli.id, self.asr.id, [(self.ll.id, 3)])
+        self.assertEqual(self._stock(), (12, 12))
+        s.registrar_devolucion(v.id, [(self.ll.id, 1)], "Garantía")
+        self.assertEqual(self._stock(), (13, 13))
+        s.actualizar_precio_llanta(self.ll.id, 150)
+        self.assertEqual(s.precio_stock("L-205-55R16").precio, Decimal("150.00"))
+        s.transferir_stock(self.ll.id, 1, self.sede2.id, 4)
+        self.assertEqual(s.precio_stock("L-205-55R16").por_sede, ((1, 9), (self.sede2.id, 4)))
+
+    def test_reservas_y_su_vencimiento(self):
+        s = self.store
+        r = s.reservar_stock(self.ll.id, 4, ttl_segundos=60)
+        self.assertEqual(self._stock(), (10, 6))
+        s.expirar_reservas(r.expira + timedelta(seconds=1))
+        self.assertEqual(self._stock(), (10, 10))
+        s.reservar_stock(self.ll.id, 2, ttl_segundos=1, ahora=now_ts() - timedelta(seconds=5))
+        self.assertEqual(self._stock(), (10, 10))  # ya vencida: la consulta la libera
+
+    def test_lote_y_llantas_nuevas(self):
+        self.store.registrar_llanta("L-195-65R15", "Y", "Eco", "195/65 R15", 80)
+        encontrados, faltantes = self.store.precio_stock_lote(["L-205-55R16", "L-195-65R15", "NADA"])
+        self.assertEqual(sorted(encontrados), ["L-195-65R15", "L-205-55R16"])
+        self.assertEqual(encontrados["L-195-65R15"].stock, 0)
+        self.assertEqual(faltantes, ["NADA"])
+
+    def test_no_guarda_un_registro_armado_durante_una_invalidacion(self):
+        llantas = {1: "viejo"}
+        cache = None
+
+        def armar(llanta_id):
+            valor = llantas[llanta_id]
+            llantas[llanta_id] = "nuevo"   # una escritura concurrente...
+            cache.invalidar(llanta_id)      # ...que invalida mientras se armaba
+            return valor
+
+        cache = CachePrecioStock(armar, lambda: [])
+        self.assertEqual(cache.obtener(1), "viejo")
+        self.assertEqual(len(cache), 0)
+
+    def test_snapshot(self):
+        self._stock()
+        path = os.path.join(tempfile.mkdtemp(), "tienda.snap")
+        self.store.dump(path)
+        s2 = Store.load(path)
+        s2.ajustar_inventario(self.ll.id, delta=-1)
+        self.assertEqual(s2.precio_stock("L-205-55R16").stock, 9)
+
+@unittest.skipIf(TestClient is None, "fastapi no instalado")
+class TestApiLookup(unittest.TestCase):
+    def test_lookup_y_lote(self):
+        with TestClient(app) as http:
+            sku = "TEST-LOOKUP-1"
+            http.post("/llantas", data={"sku": sku, "marca": "M", "modelo": "P", "medida": "205/55 R16",
+                                        "precio": "99.5"})
+            r = http.get(f"/api/lookup/{sku}")
+            self.assertEqual(r.status_code, 200)
+            self.assertEqual((r.json()["precio"], r.json()["stock"]), (99.5, 0))
+            self.assertEqual(http.get("/api/lookup/NO-EXISTE").status_code, 404)
+            lote = http.post("/api/lookup", json={"skus": [sku, "NO-EXISTE"]}).json()
+            self.assertEqual((list(lote["encontrados"]), lote["faltantes"]), ([sku], ["NO-EXISTE"]))
+            self.assertEqual(http.post("/api/lookup", json={"skus": ["x"] * 501}).status_code, 400)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import os
+import tempfile
+import unittest
+from datetime import timedelta
+from decimal import Decimal
+from app.services import StoreService as Store, CotizacionInvalida, StockInsuficiente
+from app.utils import now_ts
+
+class TestCotizaciones(unittest.TestCase):
+    def setUp(self):
+        s = self.store = Store()
+        self.ll1 = s.registrar_llanta("L-205-55R16", "X", "Sport", "205/55 R16", 120)
+        self.ll2 = s.registrar_llanta("L-195-65R15", "Y", "Eco", "195/65 R15", 80)
+        s.ajustar_inventario(self.ll1.id, delta=10, umbral_minimo=2)
+        s.ajustar_inventario(self.ll2.id, delta=10, umbral_minimo=2)
+        self.cli = s.registrar_cliente("María López", "12345678")
+        self.asr = s.registrar_asesor("Carlos Pérez", "87654321")
+        self.otro = s.registrar_asesor("Ana Ruiz", "111")
+
+    def _cotizar(self, items=None, **kw):
+        return self.store.cotizar(self.cli.id, self.asr.id, items or [(self.ll1.id, 4), (self.ll2.id, 1)], **kw)
+
+    def test_precio_congelado_y_sin_apartar_stock(self):
+        c = self._cotizar()
+        self.assertEqual(c.total, Decimal("560.00"))
+        self.assertEqual(self.store.inventarios.get(self.ll1.id).disponible, 10)
+        self.store.actualizar_precio_llanta(self.ll1.id, 150)
+        v = self.store.convertir_cotizacion(c.id)
+        self.assertEqual(v.total, Decimal("560.00"))  # se respeta el precio cotizado
+        self.assertEqual((v.cliente_id, v.asesor_id), (self.cli.id, self.asr.id))
+        self.assertEqual(self.store.inventarios.get(self.ll1.id).cantidad_disponible, 6)
+        c = self.store.cotizaciones.get(c.id)
+        self.assertEqual((c.estado, c.venta_id), ("convertida", v.id))
+        self.assertEqual(self.store.kardex.saldo_a_fecha(self.ll1.id, now_ts() + timedelta(days=1)), 6)
+
+    def test_no_se_convierte_dos_veces(self):
+        c = self._cotizar()
+        self.store.convertir_cotizacion(c.id, asesor_id=self.otro.id)
+        with self.assertRaises(CotizacionInvalida):
+            self.store.convertir_cotizacion(c.id)
+        self.assertEqual(len(self.store.ventas), 1)
+        self.assertEqual(self.store.liquidacion_comisiones()[0]["asesor_id"], self.otro.id)
+
+    def test_stock_insuficiente_deja_la_cotizacion_vigente(self):
+        c = self._cotizar([(self.ll1.id, 11)])
+        with self.assertRaises(StockInsuficiente):
+            self.store.convertir_cotizacion(c.id)
+        self.assertEqual(self.store.cotizaciones.get(c.id).estado, "vigente")
+        self.assertEqual(self.store.inventarios.get(self.ll1.id).cantidad_disponible, 10)
+
+    def test_lineas_repetidas_se_suman(self):
+        self.store.ajustar_inventario(self.ll1.id, delta=-6)  # quedan 4
+        c = self._cotizar([(self.ll1.id, 3), (self.ll1.id, 3)])
+        self.assertEqual([(d.llanta_id, d.cantidad) for d in c.detalles], [(self.ll1.id, 6)])
+        with self.assertRaises(StockInsuficiente):
+            self.store.convertir_cotizacion(c.id)
+        with self.assertRaises(StockInsuficiente):
+            self.store.registrar_venta(self.cli.id, self.asr.id, [(self.ll1.id, 3), (self.ll1.id, 3)])
+        self.assertEqual(self.store.inventarios.get(self.ll1.id).cantidad_disponible, 4)
+
+    def test_vencimiento_e_indice_de_vigentes(self):
+        ahora = now_ts()
+        corta = self._cotizar(dias_validez=1, ahora=ahora)
+        larga = self._cotizar(dias_validez=30, ahora=ahora)
+        anulada = self._cotizar(ahora=ahora)
+        self.store.anular_cotizacion(anulada.id)
+        vencidas = self.store.expirar_cotizaciones(ahora + timedelta(days=2))
+        self.assertEqual([c.id for c in vencidas], [corta.id])
+        self.assertEqual([c.id for c in self.store.listar_cotizaciones()], [larga.id])
+        self.assertEqual(len(self.store.listar_cotizaciones(solo_vigentes=False)), 3)
+        with self.assertRaises(CotizacionInvalida):
+            self.store.convertir_cotizacion(corta.id)
+
+    def test_validaciones(self):
+        with self.assertRaises(CotizacionInvalida):
+            self._cotizar([(self.ll1.id, 0)])
+        with self.assertRaises(CotizacionInvalida):
+            self.store.cotizar(self.cli.id, self.asr.id, [])
+        with self.assertRaises(CotizacionInvalida):
+            self.store.convertir_cotizacion(99)
+
+    def test_vista_no_ve_cambios_posteriores(self):
+        c = self._cotizar()
+        vista = self.store.snapshot()
+        self.store.convertir_cotizacion(c.id)
+        self.assertEqual([x.estado for x in vista.listar_cotizaciones()], ["vigente"])
+        self.assertEqual(self.store.listar_cotizaciones(), [])
+
+    def test_snapshot_conserva_cotizaciones(self):
+        c = self._cotizar()
+        convertida = self._cotizar([(self.ll2.id, 2)])
+        self.store.convertir_cotizacion(convertida.id)
+        path = os.path.join(tempfile.mkdtemp(), "tienda.snap")
+        self.store.dump(path)
+        s2 = Store.load(path)
+        self.assertEqual([x.id for x in s2.listar_cotizaciones()], [c.id])
+        self.assertEqual(s2.cotizaciones.get(convertida.id).venta_id, 1)
+        self.assertEqual(s2.cotizaciones.get(c.id).detalles, c.detalles)
+        v = s2.convertir_cotizacion(c.id)
+        self.assertEqual(v.total, c.total)
+        self.assertEqual(s2.expirar_cotizaciones(c.vence), [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import os
+import tempfile
+import unittest
+from app.services import StoreService as Store, ClienteNoEncontrado
+
+class TestHistorialCliente(unittest.TestCase):
+    def setUp(self):
+        s = self.store = Store()
+        self.ll1 = s.registrar_llanta("L-205-55R16", "X", "Sport", "205/55 R16", 120)
+        s.ajustar_inventario(self.ll1.id, delta=100, umbral_minimo=5)
+        self.maria = s.registrar_cliente("María López", "12345678")
+        self.juan = s.registrar_cliente("Juan Gómez", "555")
+        self.asr = s.registrar_asesor("Carlos Pérez", "87654321")
+        self.ventas = []
+        for i in range(5):
+            self.ventas.append(s.registrar_venta(self.maria.id, self.asr.id, [(self.ll1.id, 1)]))
+            s.registrar_venta(self.juan.id, self.asr.id, [(self.ll1.id, 2)])
+        s.registrar_devolucion(self.ventas[1].id, [(self.ll1.id, 1)], "Garantía")
+
+    def test_por_documento_mas_reciente_primero(self):
+        h = self.store.historial_cliente(documento=" 12345678 ")
+        self.assertEqual(h["cliente"].id, self.maria.id)
+        self.assertEqual(h["total_ventas"], 5)
+        self.assertEqual([c["venta"].id for c in h["compras"]], [v.id for v in reversed(self.ventas)])
+        self.assertTrue(all(d.cantidad == 1 for c in h["compras"] for d in c["detalles"]))
+
+    def test_paginacion_y_devoluciones(self):
+        p1 = self.store.historial_cliente(self.maria.id, pagina=1, por_pagina=2)
+        p3 = self.store.historial_cliente(self.maria.id, pagina=3, por_pagina=2)
+        self.assertEqual(p1["paginas"], 3)
+        self.assertEqual([c["venta"].id for c in p3["compras"]], [self.ventas[0].id])
+        p2 = self.store.historial_cliente(self.maria.id, pagina=2, por_pagina=2)
+        self.assertEqual(p2["compras"][1]["venta"].id, self.ventas[1].id)
+        self.assertEqual(p2["compras"][1]["devoluciones"][0].motivo, "Garantía")
+        self.assertEqual(self.store.historial_cliente(self.maria.id, pagina=9)["compras"], [])
+
+    def test_cliente_inexistente(self):
+        with self.assertRaises(ClienteNoEncontrado):
+            self.store.historial_cliente(99)
+        with self.assertRaises(ClienteNoEncontrado):
+            self.store.historial_cliente(documento="000")
+
+    def test_snapshot_de_lectura_no_ve_ventas_nuevas(self):
+        snap = self.store.snapshot()
+        self.store.registrar_venta(self.maria.id, self.asr.id, [(self.ll1.id, 1)])
+        self.store.registrar_cliente("Ana", "777")
+        self.assertEqual(snap.historial_cliente(self.maria.id)["total_ventas"], 5)
+        self.assertEqual(self.store.historial_cliente(self.maria.id)["total_ventas"], 6)
+        with self.assertRaises(ClienteNoEncontrado):
+            snap.historial_cliente(documento="777")
+
+    def test_indice_se_reconstruye_al_cargar_snapshot(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "store.snap")
+            self.store.dump(path)
+            s2 = Store.load(path)
+            h = s2.historial_cliente(documento="555", por_pagina=2)
+            self.assertEqual((h["total_ventas"], len(h["compras"])), (5, 2))
+            self.assertEqual(len(s2.ventas._data), 2)  # solo se decodificó la página
+            self.assertEqual(s2.historial_cliente(self.maria.id, pagina=2, por_pagina=2)["compras"][1]
+                             ["devoluciones"][0].motivo, "Garantía")
+            del s2, h
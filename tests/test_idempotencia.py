@@ -0,0 +1,99 @@
+import sys
+import threading
+import time
+import unittest
+from app.idempotencia import CacheIdempotencia, ClaveIdempotenciaReutilizada
+from app.services import StoreService as Store, StockInsuficiente
+
+class TestCacheIdempotencia(unittest.TestCase):
+    def test_lru_acotado(self):
+        c = CacheIdempotencia(max_entradas=2)
+        for k in "abc":
+            c.ejecutar(k, None, lambda k=k: k.upper())
+        self.assertEqual(len(c), 2)
+        self.assertEqual(c.ejecutar("a", None, lambda: "otra vez"), "otra vez")  # "a" fue desalojada
+
+    def test_ttl(self):
+        ahora = [0.0]
+        c = CacheIdempotencia(ttl_segundos=10, reloj=lambda: ahora[0])
+        c.ejecutar("k", None, lambda: 1)
+        ahora[0] = 5
+        self.assertEqual(c.ejecutar("k", None, lambda: 2), 1)
+        ahora[0] = 11
+        self.assertEqual(c.ejecutar("k", None, lambda: 3), 3)
+
+    def test_purga_vencidos_fuera_de_orden_lru(self):
+        ahora = [0.0]
+        c = CacheIdempotencia(ttl_segundos=10, reloj=lambda: ahora[0])
+        c.ejecutar("a", None, lambda: 1)
+        ahora[0] = 5
+        c.ejecutar("b", None, lambda: 2)
+        ahora[0] = 8
+        c.ejecutar("a", None, lambda: 0)  # acierto: "a" pasa al final del LRU
+        ahora[0] = 12
+        c.ejecutar("c", None, lambda: 3)
+        self.assertEqual(list(c._datos), ["b", "c"])  # "a" venció aunque "b" no
+
+    def test_bytes_aprox_acumulado(self):
+        c = CacheIdempotencia(max_entradas=3)
+        for k in range(6):
+            c.ejecutar(f"clave-{k}", None, lambda: k)
+        esperado = sys.getsizeof(c._datos) + sum(sys.getsizeof(k) + sys.getsizeof(e) for k, e in c._datos.items())
+        self.assertEqual(c.estadisticas()["bytes_aprox"], esperado)
+
+    def test_duplicados_concurrentes_ejecutan_una_vez(self):
+        c = CacheIdempotencia()
+        llamadas = []
+
+        def lenta():
+            llamadas.append(1)
+            time.sleep(0.05)
+            return "ok"
+
+        resultados = []
+        hilos = [threading.Thread(target=lambda: resultados.append(c.ejecutar("k", None, lenta)))
+                 for _ in range(8)]
+        for h in hilos:
+            h.start()
+        for h in hilos:
+            h.join()
+        self.assertEqual(len(llamadas), 1)
+        self.assertEqual(resultados, ["ok"] * 8)
+        self.assertEqual(c.estadisticas()["aciertos"], 7)
+
+
+class TestVentaIdempotente(unittest.TestCase):
+    def setUp(self):
+        self.store = Store()
+        self.ll1 = self.store.registrar_llanta("L-205-55R16", "X", "Sport", "205/55 R16", 120)
+        self.store.ajustar_inventario(self.ll1.id, delta=15, umbral_minimo=5)
+        self.cl = self.store.registrar_cliente("María López", "12345678")
+        self.asr = self.store.registrar_asesor("Carlos Pérez", "87654321")
+
+    def test_reintento_devuelve_venta_original(self):
+        v1 = self.store.registrar_venta(self.cl.id, self.asr.id, [(self.ll1.id, 2)], clave_idempotencia="pos-1")
+        v2 = self.store.registrar_venta(self.cl.id, self.asr.id, [(self.ll1.id, 2)], clave_idempotencia="pos-1")
+        self.assertIs(v1, v2)
+        self.assertEqual(len(self.store.ventas), 1)
+        self.assertEqual(self.store.inventarios.get(self.ll1.id).cantidad_disponible, 13)
+        stats = self.store.estadisticas()["idempotencia"]
+        self.assertEqual((stats["aciertos"], stats["fallos"]), (1, 1))
+
+    def test_misma_clave_otro_contenido(self):
+        self.store.registrar_venta(self.cl.id, self.asr.id, [(self.ll1.id, 2)], clave_idempotencia="pos-1")
+        with self.assertRaises(ClaveIdempotenciaReutilizada):
+            self.store.registrar_venta(self.cl.id, self.asr.id, [(self.ll1.id, 3)], clave_idempotencia="pos-1")
+
+    def test_error_no_queda_en_cache(self):
+        with self.assertRaises(StockInsuficiente):
+            self.store.registrar_venta(self.cl.id, self.asr.id, [(self.ll1.id, 99)], clave_idempotencia="pos-2")
+        self.store.ajustar_inventario(self.ll1.id, delta=100)
+        v = self.store.registrar_venta(self.cl.id, self.asr.id, [(self.ll1.id, 99)], clave_idempotencia="pos-2")
+        self.assertEqual(v.id, 1)
+
+    def test_devolucion_idempotente(self):
+        v = self.store.registrar_venta(self.cl.id, self.asr.id, [(self.ll1.id, 2)])
+        d1 = self.store.registrar_devolucion(v.id, [(self.ll1.id, 1)], "Defecto", clave_idempotencia="dev-1")
+        d2 = self.store.registrar_devolucion(v.id, [(self.ll1.id, 1)], "Defecto", clave_idempotencia="dev-1")
+        self.assertIs(d1, d2)
+        self.assertEqual(self.store.inventarios.get(self.ll1.id).cantidad_disponible, 14)
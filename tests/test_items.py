@@ -0,0 +1,51 @@
+import unittest
+from app.items import parsear_items, ItemsInvalidos
+
+class TestParsearItems(unittest.TestCase):
+    def test_formatos_y_separadores(self):
+        self.assertEqual(parsear_items("1x2, 3x1"), [(1, 2), (3, 1)])
+        self.assertEqual(parsear_items(" 1 X 2 ; 3*1\n"), [(1, 2), (3, 1)])
+        self.assertEqual(parsear_items("4\t2\r\n5\t1\r\n"), [(4, 2), (5, 1)])  # pegado de planilla
+        self.assertEqual(parsear_items("1x2,,\n\n3x1,"), [(1, 2), (3, 1)])
+
+    def test_ids_repetidos_se_suman_en_orden(self):
+        self.assertEqual(parsear_items("3x1, 1x2, 3x4"), [(3, 5), (1, 2)])
+
+    def test_vacio(self):
+        for texto in ("", "  ", " , ;\n", None):
+            with self.assertRaises(ItemsInvalidos):
+                parsear_items(texto)
+
+    def test_ubica_el_error(self):
+        with self.assertRaises(ItemsInvalidos) as ctx:
+            parsear_items("1x2\n3x1,\n  9x-1")
+        self.assertEqual((ctx.exception.linea, ctx.exception.columna), (3, 3))
+        self.assertIn("9x-1", str(ctx.exception))
+
+    def test_cantidad_cero(self):
+        with self.assertRaises(ItemsInvalidos) as ctx:
+            parsear_items("1x2, 3x0")
+        self.assertIn("mayor que 0", str(ctx.exception))
+        self.assertEqual(ctx.exception.posicion, 7)
+
+    def test_falta_separador(self):
+        with self.assertRaises(ItemsInvalidos) as ctx:
+            parsear_items("1x2 3x1")
+        self.assertIn("separador", str(ctx.exception))
+        self.assertEqual(ctx.exception.columna, 5)
+
+    def test_max_items(self):
+        self.assertEqual(len(parsear_items("1x1,2x1", max_items=2)), 2)
+        with self.assertRaises(ItemsInvalidos):
+            parsear_items("1x1,2x1,3x1", max_items=2)
+
+    def test_texto_largo_invalido_falla_rapido(self):
+        import time
+        texto = ", ".join(f"{i}x1" for i in range(1, 50001)) + ", 7x"
+        t = time.perf_counter()
+        with self.assertRaises(ItemsInvalidos):
+            parsear_items(texto)
+        self.assertLess(time.perf_counter() - t, 2.0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+from datetime import datetime, timedelta
+from app.kardex import Kardex, AJUSTE, VENTA, CSV_HEADER
+from app.services import StoreService as Store
+from app.repositories import SEDE_PRINCIPAL
+
+class TestKardex(unittest.TestCase):
+    def test_saldo_a_fecha_busqueda_binaria(self):
+        k = Kardex()
+        t0 = datetime(2025, 1, 1, 8, 0)
+        k.registrar(1, 7, AJUSTE, 10, fecha=t0)
+        k.registrar(1, 7, VENTA, -3, referencia=1, fecha=t0 + timedelta(hours=1))
+        k.registrar(1, 7, VENTA, -2, referencia=2, fecha=t0 + timedelta(hours=2))
+        self.assertEqual(k.saldo_a_fecha(7, t0 - timedelta(seconds=1)), 0)
+        self.assertEqual(k.saldo_a_fecha(7, t0), 10)
+        self.assertEqual(k.saldo_a_fecha(7, t0 + timedelta(minutes=90)), 7)
+        self.assertEqual(k.saldo_a_fecha(7, t0 + timedelta(days=1)), 5)
+
+    def test_movimientos_por_rango(self):
+        k = Kardex()
+        t0 = datetime(2025, 1, 1)
+        for h in range(5):
+            k.registrar(1, 7, AJUSTE, 1, fecha=t0 + timedelta(hours=h))
+        movs = list(k.movimientos(7, 1, t0 + timedelta(hours=1), t0 + timedelta(hours=3)))
+        self.assertEqual([m["saldo"] for m in movs], [2, 3, 4])
+
+    def test_movimiento_fuera_de_orden_se_inserta(self):
+        k = Kardex()
+        t0 = datetime(2025, 1, 1, 8, 0)
+        k.registrar(1, 7, AJUSTE, 10, fecha=t0)
+        k.registrar(1, 7, VENTA, -3, referencia=1, fecha=t0 + timedelta(hours=2))
+        saldo = k.registrar(1, 7, VENTA, -4, referencia=2, fecha=t0 + timedelta(hours=1))
+        self.assertEqual(saldo, 6)
+        movs = list(k.movimientos(7, 1))
+        self.assertEqual([m["referencia"] for m in movs], [0, 2, 1])
+        self.assertEqual([m["saldo"] for m in movs], [10, 6, 3])
+        self.assertEqual(k.saldo_a_fecha(7, t0 + timedelta(minutes=90)), 6)
+        self.assertEqual(k.saldo_a_fecha(7, t0 + timedelta(hours=3)), 3)
+
+
+class TestKardexStore(unittest.TestCase):
+    def setUp(self):
+        self.store = Store()
+        self.ll1 = self.store.registrar_llanta("L-205-55R16", "X", "Sport", "205/55 R16", 120)
+        self.store.ajustar_inventario(self.ll1.id, delta=15, umbral_minimo=5)
+        self.cl = self.store.registrar_cliente("María López", "12345678")
+        self.asr = self.store.registrar_asesor("Carlos Pérez", "87654321")
+
+    def test_operaciones_quedan_en_kardex(self):
+        v = self.store.registrar_venta(self.cl.id, self.asr.id, [(self.ll1.id, 4)])
+        self.store.registrar_devolucion(v.id, [(self.ll1.id, 1)], "Defecto")
+        norte = self.store.registrar_sede("Norte")
+        self.store.transferir_stock(self.ll1.id, SEDE_PRINCIPAL, norte.id, 2)
+        movs = list(self.store.kardex.movimientos(self.ll1.id, SEDE_PRINCIPAL))
+        self.assertEqual([m["tipo"] for m in movs], ["ajuste", "venta", "devolucion", "transferencia"])
+        self.assertEqual(movs[-1]["saldo"], self.store.inventarios.get(self.ll1.id).cantidad_disponible)
+        self.assertEqual(self.store.stock_a_fecha(self.ll1.id, datetime.now()), 12)
+
+    def test_stock_a_fecha_previa_a_la_venta(self):
+        antes = datetime.now()
+        self.store.registrar_venta(self.cl.id, self.asr.id, [(self.ll1.id, 4)])
+        self.assertEqual(self.store.stock_a_fecha(self.ll1.id, antes), 15)
+
+    def test_exportar_csv(self):
+        self.store.registrar_venta(self.cl.id, self.asr.id, [(self.ll1.id, 4)])
+        lineas = list(self.store.kardex_csv())
+        self.assertEqual(lineas[0], CSV_HEADER)
+        self.assertEqual(len(lineas), 3)
+        self.assertTrue(lineas[2].rstrip().endswith(",venta,-4,11,1"))
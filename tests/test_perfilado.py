@@ -0,0 +1,45 @@
+import os
+import pstats
+import tempfile
+import unittest
+from app.perfilado import Perfilador, perfilar
+from app.services import StoreService as Store
+
+class TestPerfilado(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_captura_cpu_y_memoria(self):
+        s = Store()
+        with perfilar("registrar llantas", self.dir) as base:
+            for i in range(20):
+                s.registrar_llanta(f"SKU-{i}", "X", "Sport", "205/55 R16", 100)
+        funciones = {f for _, _, f in pstats.Stats(base + ".prof").stats}
+        self.assertIn("registrar_llanta", funciones)
+        with open(base + ".mem.txt", encoding="utf-8") as f:
+            self.assertIn("services.py", f.read())
+
+    def test_anidado_no_duplica(self):
+        p = Perfilador(self.dir, memoria=False)
+        with p.capturar("externa") as externa:
+            with p.capturar("interna") as interna:
+                pass
+        self.assertIsNone(interna)
+        self.assertEqual(os.listdir(self.dir), [os.path.basename(externa) + ".prof"])
+
+    def test_rotacion(self):
+        p = Perfilador(self.dir, max_capturas=3)
+        for i in range(5):
+            with p.capturar(f"c{i}"):
+                pass
+        nombres = sorted(os.listdir(self.dir))
+        self.assertEqual(len(nombres), 6)  # .prof + .mem.txt de las últimas 3
+        self.assertTrue(nombres[0].endswith("-c2.mem.txt"))
+
+    def test_muestreo_apagado(self):
+        self.assertFalse(any(Perfilador(self.dir).muestrear() for _ in range(100)))
+        self.assertTrue(Perfilador(self.dir, muestreo=1.0).muestrear())
@@ -0,0 +1,63 @@
+import unittest
+from datetime import datetime, timedelta
+from app.reorden import MotorReorden, np
+from app.services import StoreService as Store
+
+class TestMotorReorden(unittest.TestCase):
+    def setUp(self):
+        self.t0 = datetime(2025, 3, 1, 9, 0)
+        self.m = MotorReorden(tau_dias=10, dias_entrega=5, dias_cobertura=10, dias_seguridad=0)
+        # 2 uds/día durante 60 días -> la EWMA converge a ~2
+        for d in range(60):
+            self.m.registrar(1, 2, self.t0 + timedelta(days=d))
+
+    def test_velocidad_converge_y_decae(self):
+        hoy = self.t0 + timedelta(days=59)
+        self.assertAlmostEqual(self.m.velocidad(1, hoy), 2.0, delta=0.25)
+        self.assertLess(self.m.velocidad(1, hoy + timedelta(days=30)), 0.2)
+        self.assertEqual(self.m.velocidad(2, hoy), 0.0)
+
+    def test_devolucion_descuenta_velocidad(self):
+        hoy = self.t0 + timedelta(days=59)
+        antes = self.m.velocidad(1, hoy)
+        self.m.registrar(1, -5, hoy)
+        self.assertAlmostEqual(self.m.velocidad(1, hoy), antes - 0.5, places=6)
+
+    def test_sugerencia(self):
+        hoy = self.t0 + timedelta(days=59)
+        f = self.m.calcular({1: 4, 2: 0}, hoy, usar_numpy=False)
+        self.assertEqual(f[0]["umbral_recomendado"], 11)      # ceil(~2.1 * 5)
+        self.assertEqual(f[0]["cantidad_sugerida"], 32 - 4)   # ceil(~2.1 * 15) - stock
+        self.assertEqual(f[1]["cantidad_sugerida"], 0)
+        self.assertIsNone(f[1]["dias_cobertura"])
+
+    def test_calcular_sobre_copia_no_toca_el_motor(self):
+        hoy = self.t0 + timedelta(days=59)
+        copia = self.m.copia()
+        largo = len(self.m._v)
+        f = copia.calcular({1: 4, 9: 0}, hoy, usar_numpy=False)
+        self.assertEqual(len(self.m._v), largo)  # la llanta 9 solo crece en la copia
+        self.m.registrar(1, 50, hoy)
+        self.assertEqual(copia.calcular({1: 4}, hoy, usar_numpy=False)[0], f[0])
+
+    @unittest.skipIf(np is None, "numpy no instalado")
+    def test_numpy_y_python_coinciden(self):
+        hoy = self.t0 + timedelta(days=61)
+        stocks = {1: 3, 2: 7}
+        self.assertEqual(self.m.calcular(stocks, hoy, usar_numpy=True),
+                         self.m.calcular(stocks, hoy, usar_numpy=False))
+
+
+class TestReordenStore(unittest.TestCase):
+    def test_venta_actualiza_velocidad_y_sugiere(self):
+        store = Store()
+        ll = store.registrar_llanta("L-205-55R16", "X", "Sport", "205/55 R16", 120)
+        store.ajustar_inventario(ll.id, delta=15, umbral_minimo=5)
+        cl = store.registrar_cliente("María López", "12345678")
+        asr = store.registrar_asesor("Carlos Pérez", "87654321")
+        self.assertEqual(store.sugerencias_reorden(), [])
+        store.registrar_venta(cl.id, asr.id, [(ll.id, 12)])
+        filas = store.sugerencias_reorden()
+        self.assertEqual([f["llanta_id"] for f in filas], [ll.id])
+        self.assertEqual(filas[0]["stock"], 3)
+        self.assertGreater(filas[0]["cantidad_sugerida"], 0)
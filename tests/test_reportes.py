@@ -0,0 +1,61 @@
+import unittest
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+from app import reportes
+from app.services import StoreService as Store
+from app.utils import now_ts
+
+class TestReportePeriodo(unittest.TestCase):
+    def setUp(self):
+        s = self.store = Store()
+        self.ll1 = s.registrar_llanta("L-205-55R16", "X", "Sport", "205/55 R16", 120)
+        self.ll2 = s.registrar_llanta("L-195-65R15", "Y", "City", "195/65 R15", 80)
+        s.ajustar_inventario(self.ll1.id, delta=50, umbral_minimo=5)
+        s.ajustar_inventario(self.ll2.id, delta=50, umbral_minimo=5)
+        self.norte = s.registrar_sede("Norte")
+        s.transferir_stock(self.ll2.id, 1, self.norte.id, 10)
+        cl = s.registrar_cliente("María López", "12345678")
+        asr = s.registrar_asesor("Carlos Pérez", "87654321")
+        self.v1 = s.registrar_venta(cl.id, asr.id, [(self.ll1.id, 2), (self.ll2.id, 1)])
+        s.registrar_venta(cl.id, asr.id, [(self.ll2.id, 3)], sede_id=self.norte.id)
+        s.registrar_devolucion(self.v1.id, [(self.ll1.id, 1)], "Defecto")
+        self.nuevo = (cl.id, asr.id)
+
+    def test_totales_netos_de_devoluciones(self):
+        rep = self.store.reporte_periodo()
+        self.assertEqual((rep["ventas"], rep["unidades"], rep["unidades_devueltas"]), (2, 6, 1))
+        self.assertEqual(rep["ingresos"], Decimal("560.00"))
+        self.assertEqual(rep["neto"], Decimal("440.00"))
+        self.assertEqual(rep["por_llanta"][self.ll1.id]["neto"], Decimal("120.00"))
+        self.assertEqual(rep["por_llanta"][self.ll1.id]["sku"], "L-205-55R16")
+        self.assertEqual(rep["por_sede"][self.norte.id]["ventas"], 1)
+        self.assertEqual(rep["por_sede"][self.norte.id]["sede"], "Norte")
+        self.assertEqual(rep["por_sede"][1]["monto_devuelto"], Decimal("120.00"))
+
+    def test_filtro_por_fecha(self):
+        rep = self.store.reporte_periodo(desde=now_ts() + timedelta(days=1))
+        self.assertEqual((rep["ventas"], rep["neto"], rep["por_llanta"]), (0, Decimal("0.00"), {}))
+
+    def test_incremental(self):
+        self.store.reporte_periodo()
+        filas = len(self.store.reportes)
+        self.store.registrar_venta(*self.nuevo, [(self.ll1.id, 4)])
+        rep = self.store.reporte_periodo()
+        self.assertEqual(len(self.store.reportes), filas + 1)
+        self.assertEqual(rep["ventas"], 3)
+
+    def test_python_y_numpy_coinciden(self):
+        self.store.reporte_periodo()
+        a = self.store.reportes.calcular(usar_numpy=False)
+        if reportes.np is None:
+            self.skipTest("numpy no instalado")
+        self.assertEqual(a, self.store.reportes.calcular(usar_numpy=True))
+
+    def test_pool_de_procesos_igual_a_serial(self):
+        serial = self.store.reporte_periodo(procesos=1)
+        with mock.patch.object(reportes, "MIN_FILAS_PARALELO", 0):
+            paralelo = self.store.reporte_periodo(procesos=2)
+        self.assertEqual(paralelo.pop("procesos"), 2)
+        serial.pop("procesos")
+        self.assertEqual(paralelo, serial)
@@ -0,0 +1,69 @@
+import unittest
+from datetime import timedelta
+from app.services import StoreService as Store, StockInsuficiente, ReservaInvalida
+from app.utils import now_ts
+
+class TestReservas(unittest.TestCase):
+    def setUp(self):
+        self.store = Store()
+        self.ll1 = self.store.registrar_llanta("L-205-55R16", "X", "Sport", "205/55 R16", 120)
+        self.store.ajustar_inventario(self.ll1.id, delta=10, umbral_minimo=3)
+        self.cl = self.store.registrar_cliente("María López", "12345678")
+        self.asr = self.store.registrar_asesor("Carlos Pérez", "87654321")
+
+    def test_reserva_descuenta_disponible_no_fisico(self):
+        self.store.reservar_stock(self.ll1.id, 4)
+        inv = self.store.inventarios.get(self.ll1.id)
+        self.assertEqual(inv.cantidad_disponible, 10)
+        self.assertEqual(inv.disponible, 6)
+
+    def test_venta_no_puede_tomar_lo_reservado(self):
+        self.store.reservar_stock(self.ll1.id, 8)
+        with self.assertRaises(StockInsuficiente):
+            self.store.registrar_venta(self.cl.id, self.asr.id, [(self.ll1.id, 3)])
+        self.store.registrar_venta(self.cl.id, self.asr.id, [(self.ll1.id, 2)])
+        self.assertEqual(self.store.inventarios.get(self.ll1.id).disponible, 0)
+
+    def test_convertir_reserva_en_venta(self):
+        r = self.store.reservar_stock(self.ll1.id, 4)
+        v = self.store.convertir_reservas([r.id], self.cl.id, self.asr.id)
+        inv = self.store.inventarios.get(self.ll1.id)
+        self.assertEqual(inv.cantidad_disponible, 6)
+        self.assertEqual(inv.cantidad_reservada, 0)
+        self.assertEqual(r.estado, "convertida")
+        self.assertEqual(r.venta_id, v.id)
+        with self.assertRaises(ReservaInvalida):
+            self.store.convertir_reservas([r.id], self.cl.id, self.asr.id)
+
+    def test_convertir_con_cliente_invalido_restaura_reserva(self):
+        r = self.store.reservar_stock(self.ll1.id, 4)
+        with self.assertRaises(ValueError):
+            self.store.convertir_reservas([r.id], 999, self.asr.id)
+        self.assertEqual(r.estado, "activa")
+        self.assertEqual(self.store.inventarios.get(self.ll1.id).cantidad_reservada, 4)
+
+    def test_liberar_reserva(self):
+        r = self.store.reservar_stock(self.ll1.id, 4)
+        self.store.liberar_reserva(r.id)
+        self.assertEqual(self.store.inventarios.get(self.ll1.id).disponible, 10)
+        with self.assertRaises(ReservaInvalida):
+            self.store.liberar_reserva(r.id)
+
+    def test_reserva_vence_por_ttl(self):
+        t0 = now_ts()
+        r1 = self.store.reservar_stock(self.ll1.id, 3, ttl_segundos=60, ahora=t0)
+        r2 = self.store.reservar_stock(self.ll1.id, 2, ttl_segundos=600, ahora=t0)
+        vencidas = self.store.expirar_reservas(t0 + timedelta(seconds=61))
+        self.assertEqual([r.id for r in vencidas], [r1.id])
+        self.assertEqual(r2.estado, "activa")
+        self.assertEqual(self.store.inventarios.get(self.ll1.id).cantidad_reservada, 2)
+
+    def test_alerta_considera_reservado(self):
+        self.store.reservar_stock(self.ll1.id, 7)  # disponible 3 = umbral
+        ids = [f["llanta_id"] for f in self.store.reporte_bajo_stock()]
+        self.assertIn(self.ll1.id, ids)
+
+    def test_ajuste_no_baja_de_lo_reservado(self):
+        self.store.reservar_stock(self.ll1.id, 8)
+        with self.assertRaises(ValueError):
+            self.store.ajustar_inventario(self.ll1.id, delta=-5)
@@ -0,0 +1,62 @@
+import unittest
+from app.services import StoreService as Store, StockInsuficiente, SedeNoEncontrada
+from app.repositories import SEDE_PRINCIPAL
+
+class TestMultiSede(unittest.TestCase):
+    def setUp(self):
+        self.store = Store()
+        self.norte = self.store.registrar_sede("Norte")
+        self.ll1 = self.store.registrar_llanta("L-205-55R16", "X", "Sport", "205/55 R16", 120)
+        self.store.ajustar_inventario(self.ll1.id, delta=10, umbral_minimo=3)
+        self.store.ajustar_inventario(self.ll1.id, delta=2, umbral_minimo=1, sede_id=self.norte.id)
+        self.cl = self.store.registrar_cliente("María López", "12345678")
+        self.asr = self.store.registrar_asesor("Carlos Pérez", "87654321")
+
+    def test_disponibilidad_por_sede_y_total(self):
+        disp = self.store.disponibilidad(self.ll1.id)
+        self.assertEqual(disp["total"], 12)
+        por_sede = {s["sede_id"]: s["disponible"] for s in disp["sedes"]}
+        self.assertEqual(por_sede, {SEDE_PRINCIPAL: 10, self.norte.id: 2})
+
+    def test_sedes_con_stock(self):
+        sedes = self.store.sedes_con_stock(self.ll1.id, 4)
+        self.assertEqual([s["sede_id"] for s in sedes], [SEDE_PRINCIPAL])
+
+    def test_venta_descuenta_de_la_sede(self):
+        with self.assertRaises(StockInsuficiente):
+            self.store.registrar_venta(self.cl.id, self.asr.id, [(self.ll1.id, 3)], sede_id=self.norte.id)
+        v = self.store.registrar_venta(self.cl.id, self.asr.id, [(self.ll1.id, 2)], sede_id=self.norte.id)
+        self.assertEqual(v.sede_id, self.norte.id)
+        self.assertEqual(self.store.inventarios.get(self.ll1.id, self.norte.id).cantidad_disponible, 0)
+        self.assertEqual(self.store.inventarios.get(self.ll1.id).cantidad_disponible, 10)
+        self.assertEqual(self.store.inventarios.total(self.ll1.id), 10)
+
+    def test_devolucion_vuelve_a_la_sede_de_la_venta(self):
+        v = self.store.registrar_venta(self.cl.id, self.asr.id, [(self.ll1.id, 2)], sede_id=self.norte.id)
+        self.store.registrar_devolucion(v.id, [(self.ll1.id, 1)], "Defecto")
+        self.assertEqual(self.store.inventarios.get(self.ll1.id, self.norte.id).cantidad_disponible, 1)
+        self.assertEqual(self.store.inventarios.get(self.ll1.id).cantidad_disponible, 10)
+
+    def test_transferencia_mueve_stock_y_conserva_total(self):
+        sur = self.store.registrar_sede("Sur")
+        self.store.transferir_stock(self.ll1.id, SEDE_PRINCIPAL, sur.id, 4)
+        self.assertEqual(self.store.inventarios.get(self.ll1.id).cantidad_disponible, 6)
+        self.assertEqual(self.store.inventarios.get(self.ll1.id, sur.id).cantidad_disponible, 4)
+        self.assertEqual(self.store.inventarios.total(self.ll1.id), 12)
+
+    def test_transferencia_sin_stock_no_altera(self):
+        with self.assertRaises(StockInsuficiente):
+            self.store.transferir_stock(self.ll1.id, self.norte.id, SEDE_PRINCIPAL, 5)
+        self.assertEqual(self.store.inventarios.get(self.ll1.id, self.norte.id).cantidad_disponible, 2)
+        self.assertEqual(self.store.inventarios.get(self.ll1.id).cantidad_disponible, 10)
+
+    def test_umbral_por_sede(self):
+        bajo = self.store.reporte_bajo_stock(sede_id=self.norte.id)
+        self.assertEqual([f["llanta_id"] for f in bajo], [])
+        self.store.ajustar_inventario(self.ll1.id, delta=-1, sede_id=self.norte.id)
+        bajo = self.store.reporte_bajo_stock(sede_id=self.norte.id)
+        self.assertEqual([f["llanta_id"] for f in bajo], [self.ll1.id])
+
+    def test_sede_inexistente(self):
+        with self.assertRaises(SedeNoEncontrada):
+            self.store.ajustar_inventario(self.ll1.id, delta=1, sede_id=99)
@@ -0,0 +1,102 @@
+import os
+import tempfile
+import unittest
+from collections import Counter
+from datetime import datetime
+from app.comisiones import MotorComisiones
+from app.semilla import generar
+from app.services import StoreService as Store
+
+
+class TestSemilla(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "semilla.snap")
+        self.resumen = generar(self.path, 3000, semilla=3, llantas=60, dias=90, tasa_devolucion=0.05)
+        self.s = Store.load(self.path)
+
+    def tearDown(self):
+        del self.s  # libera el mmap antes de borrar el directorio
+        self.tmp.cleanup()
+
+    def test_determinista(self):
+        otro = os.path.join(self.tmp.name, "otro.snap")
+        generar(otro, 3000, semilla=3, llantas=60, dias=90, tasa_devolucion=0.05)
+        with open(self.path, "rb") as a, open(otro, "rb") as b:
+            self.assertEqual(a.read(), b.read())
+        generar(otro, 3000, semilla=4, llantas=60, dias=90, tasa_devolucion=0.05)
+        with open(self.path, "rb") as a, open(otro, "rb") as b:
+            self.assertNotEqual(a.read(), b.read())
+
+    def test_resumen_y_catalogos(self):
+        r = self.resumen
+        self.assertEqual(r["ventas"], 3000)
+        self.assertEqual(len(self.s.ventas), 3000)
+        self.assertEqual(len(self.s.devoluciones), r["devoluciones"])
+        self.assertGreater(r["devoluciones"], 0)
+        self.assertEqual(len(self.s.llantas), 60)
+        self.assertEqual(len(self.s.clientes), 150)
+        self.assertEqual([sd.nombre for sd in self.s.sedes.list()], ["Principal", "Norte", "Sur"])
+        self.assertEqual(len({ll.sku for ll in self.s.llantas.list()}), 60)
+        self.assertEqual(r["hasta"], datetime(2026, 1, 1))
+
+    def test_historial_coherente(self):
+        ventas = self.s.listar_ventas()
+        fechas = [v.fecha for v, _ in ventas]
+        self.assertEqual(fechas, sorted(fechas))  # ids en orden de fecha (lo asume el archivado)
+        self.assertTrue(self.resumen["desde"] <= fechas[0] and fechas[-1] < self.resumen["hasta"])
+        for v, dets in ventas:
+            self.assertEqual(v.total, sum(d.subtotal for d in dets))
+            self.assertEqual(len({d.llanta_id for d in dets}), len(dets))
+        for dev in self.s.devoluciones.list():
+            venta = self.s.ventas.get(dev.venta_id)
+            vendidas = {d.llanta_id: d.cantidad for d in venta._detalles}
+            self.assertGreater(dev.fecha, venta.fecha)
+            for d in dev.detalles:
+                self.assertLessEqual(d.cantidad, vendidas[d.llanta_id])
+
+    def test_stock_cuadra_con_kardex(self):
+        for inv in self.s.inventarios.list():
+            movs = list(self.s.kardex.movimientos(inv.llanta_id, inv.sede_id))
+            self.assertTrue(all(m["saldo"] >= 0 for m in movs))
+            self.assertEqual(movs[-1]["saldo"] if movs else 0, inv.cantidad_disponible)
+        self.assertTrue(self.s.reporte_bajo_stock())
+        self.assertLess(len(self.s.reporte_bajo_stock()), len(self.s.inventarios.list()))
+
+    def test_comisiones_iguales_a_recalcular(self):
+        motor = MotorComisiones()
+        for v, dets in self.s.listar_ventas():
+            motor.registrar_venta(v, dets, self.s._marca_de)
+        for dev in self.s.devoluciones.list():
+            venta = self.s.ventas.get(dev.venta_id)
+            motor.registrar_devolucion(dev, venta, venta._detalles, self.s._marca_de)
+        self.assertEqual(motor._acumulados, self.s.comisiones._acumulados)
+
+    def test_popularidad_zipf(self):
+        unidades = Counter()
+        for _, dets in self.s.listar_ventas():
+            for d in dets:
+                unidades[d.llanta_id] += d.cantidad
+        orden = [u for _, u in unidades.most_common()]
+        self.assertGreater(orden[0], 10 * orden[len(orden) // 2])
+
+    def test_store_operable(self):
+        c, a = self.s.clientes.get(1), self.s.asesores.get(1)
+        inv = max(self.s.inventarios.list(), key=lambda i: i.disponible)
+        v = self.s.registrar_venta(c.id, a.id, [(inv.llanta_id, 1)], sede_id=inv.sede_id)
+        self.assertEqual(v.id, 3001)
+        self.s.registrar_devolucion(v.id, [(inv.llanta_id, 1)], "prueba")
+        r = self.s.archivar_ventas(datetime(2025, 11, 1), os.path.join(self.tmp.name, "archivo"))
+        self.assertGreater(r["ventas"], 0)
+        self.assertEqual(len(self.s.listar_ventas()), 3001)
+        self.s.archivo.cerrar()
+
+    def test_parametros_invalidos(self):
+        with self.assertRaises(ValueError):
+            generar(self.path, 10, asesores=2, sedes=3)
+        with self.assertRaises(TypeError):
+            generar(self.path, None)
+
+
+if __name__ == "__main__":
+    unittest.main()
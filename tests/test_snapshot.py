@@ -0,0 +1,148 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from datetime import datetime
+from decimal import Decimal
+from app.services import StoreService as Store
+from app.repositories import SEDE_PRINCIPAL
+from app.snapshot import SnapshotInvalido, _Escritor
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "store.snap")
+        s = self.store = Store()
+        self.ll1 = s.registrar_llanta("L-205-55R16", "X", "Sport", "205/55 R16", 120)
+        self.ll2 = s.registrar_llanta("L-195-65R15", "Y", "City", "195/65 R15", 19.999)
+        s.ajustar_inventario(self.ll1.id, delta=15, umbral_minimo=5)
+        s.ajustar_inventario(self.ll2.id, delta=5, umbral_minimo=1)
+        s.actualizar_precio_llanta(self.ll2.id, "21.50")
+        self.norte = s.registrar_sede("Norte", "Cra 1 # 2-3")
+        s.transferir_stock(self.ll1.id, SEDE_PRINCIPAL, self.norte.id, 3)
+        self.cl = s.registrar_cliente("María López", "12345678", telefono="3001112233")
+        self.asr = s.registrar_asesor("Carlos Pérez", "87654321")
+        self.v1 = s.registrar_venta(self.cl.id, self.asr.id, [(self.ll1.id, 2), (self.ll2.id, 1)])
+        self.v2 = s.registrar_venta(self.cl.id, self.asr.id, [(self.ll1.id, 1)], sede_id=self.norte.id)
+        s.registrar_devolucion(self.v1.id, [(self.ll2.id, 1)], "Defecto de fábrica")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_ida_y_vuelta(self):
+        self.store.dump(self.path)
+        s2 = Store.load(self.path)
+        self.assertEqual(s2.llantas.list(), self.store.llantas.list())
+        self.assertEqual(s2.clientes.list(), self.store.clientes.list())
+        self.assertEqual(s2.sedes.list(), self.store.sedes.list())
+        self.assertEqual(s2.consultar_inventario(), self.store.consultar_inventario())
+        self.assertEqual(s2.listar_devoluciones(), self.store.listar_devoluciones())
+        for (va, da), (vb, db) in zip(s2.listar_ventas(), self.store.listar_ventas()):
+            self.assertEqual((va, da), (vb, db))
+        self.assertEqual(s2.llantas.get(self.ll2.id).precio_venta, Decimal("21.50"))
+        self.assertEqual(list(s2.kardex_csv()), list(self.store.kardex_csv()))
+        self.assertEqual(s2.stock_a_fecha(self.ll1.id, datetime.now()), 12)
+
+    def test_ventas_se_decodifican_al_acceder(self):
+        self.store.dump(self.path)
+        s2 = Store.load(self.path)
+        self.assertEqual(len(s2.ventas), 2)
+        self.assertEqual(len(s2.ventas._data), 0)
+        v2 = s2.ventas.get(self.v2.id)
+        self.assertEqual(v2.sede_id, self.norte.id)
+        self.assertEqual(len(s2.ventas._data), 1)
+        self.assertIsNone(s2.ventas.get(99))
+
+    def test_panel_no_llena_la_cache(self):
+        self.store.dump(self.path)
+        s2 = Store.load(self.path)
+        v3 = s2.registrar_venta(self.cl.id, self.asr.id, [(self.ll1.id, 1)])
+        snap = s2.snapshot()
+        s2.registrar_venta(self.cl.id, self.asr.id, [(self.ll1.id, 1)])
+        self.assertEqual([v.id for v, _ in snap.ultimas_ventas(2)], [self.v2.id, v3.id])
+        self.assertEqual([v.id for v, _ in s2.ultimas_ventas(1)], [4])
+        self.assertEqual([d.id for d in snap.ultimas_devoluciones(5)], [1])
+        self.assertEqual(len(snap.listar_ventas(incluir_archivadas=False)), 3)
+        self.assertEqual(len(s2.ventas._data), 2)  # solo las registradas después de cargar
+        del snap, s2
+
+    def test_store_cargado_sigue_operando(self):
+        self.store.dump(self.path)
+        s2 = Store.load(self.path)
+        v3 = s2.registrar_venta(self.cl.id, self.asr.id, [(self.ll1.id, 1)])
+        self.assertEqual(v3.id, 3)
+        self.assertEqual(len(s2.ventas), 3)
+        self.assertEqual([v.id for v, _ in s2.listar_ventas()], [1, 2, 3])
+        s2.registrar_devolucion(self.v2.id, [(self.ll1.id, 1)], "Cambio")
+        self.assertEqual(s2.inventarios.get(self.ll1.id, self.norte.id).cantidad_disponible, 3)
+
+    def test_indice_de_clientes_mapeado(self):
+        self.store.dump(self.path)
+        s2 = Store.load(self.path)
+        self.assertEqual(s2.indice_clientes._ventas, {})  # no se reconstruyó
+        self.assertEqual(list(s2.indice_clientes.ventas_de(self.cl.id)), [self.v1.id, self.v2.id])
+        self.assertEqual(list(s2.indice_clientes.devoluciones_de(self.v1.id)), [1])
+        v3 = s2.registrar_venta(self.cl.id, self.asr.id, [(self.ll1.id, 1)])
+        self.assertEqual(list(s2.indice_clientes.ventas_de(self.cl.id)), [self.v1.id, self.v2.id, v3.id])
+        h = s2.historial_cliente(documento="12345678", por_pagina=2)
+        self.assertEqual(([c["venta"].id for c in h["compras"]], h["total_ventas"]), ([v3.id, self.v2.id], 3))
+        s2.dump(self.path + "2")
+        s3 = Store.load(self.path + "2")
+        self.assertEqual(list(s3.indice_clientes.ventas_de(self.cl.id)), [self.v1.id, self.v2.id, v3.id])
+        del s2, s3
+
+    def test_venta_mientras_se_escribe_el_dump(self):
+        escribiendo, seguir = threading.Event(), threading.Event()
+        escribir = _Escritor.escribir
+
+        def lento(w, path):
+            escribiendo.set()
+            seguir.wait(5)
+            escribir(w, path)
+
+        with mock.patch.object(_Escritor, "escribir", lento):
+            dump = threading.Thread(target=self.store.dump, args=(self.path,))
+            dump.start()
+            self.assertTrue(escribiendo.wait(5))
+            venta = threading.Thread(target=self.store.registrar_venta,
+                                     args=(self.cl.id, self.asr.id, [(self.ll1.id, 1)]))
+            venta.start()
+            venta.join(2)
+            terminada = not venta.is_alive()
+            seguir.set()
+            dump.join(5)
+        self.assertTrue(terminada)  # el dump no retiene el lock mientras escribe
+        s2 = Store.load(self.path)
+        self.assertEqual((len(s2.ventas), len(self.store.ventas)), (2, 3))  # la venta no entra a medias
+        self.assertEqual(s2.inventarios.get(self.ll1.id).cantidad_disponible, 10)
+        self.assertEqual(s2.stock_a_fecha(self.ll1.id, datetime.now()), 12)
+        del s2
+
+    def test_dump_no_reemplaza_el_archivo_mapeado(self):
+        self.store.dump(self.path)
+        s2 = Store.load(self.path)
+        with open(self.path, "rb") as f:
+            original = f.read()
+        v3 = s2.registrar_venta(self.cl.id, self.asr.id, [(self.ll1.id, 1)])
+        s2.dump(self.path)
+        s2.dump(self.path)  # el periódico sigue escribiendo en el alterno
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(), original)
+        self.assertEqual(s2.ventas.get(self.v2.id).sede_id, self.norte.id)  # el mmap sigue válido
+        s3 = Store.load(self.path)  # abre el más nuevo: el alterno
+        self.assertEqual(s3._snapshot.path, self.path + ".alt")
+        self.assertEqual(s3.ventas.get(v3.id).total, v3.total)
+        s3.dump(self.path)
+        self.assertEqual(Store.load(self.path)._snapshot.path, self.path)
+        del s2, s3
+        # Un store que no viene de ese snapshot borra el alterno viejo
+        Store().dump(self.path)
+        self.assertFalse(os.path.exists(self.path + ".alt"))
+        self.assertEqual(len(Store.load(self.path).ventas), 0)
+
+    def test_archivo_invalido(self):
+        with open(self.path, "wb") as f:
+            f.write(b"no soy un snapshot")
+        with self.assertRaises(SnapshotInvalido):
+            Store.load(self.path)
@@ -0,0 +1,181 @@
+import asyncio
+import threading
+import time
+import unittest
+from datetime import datetime, timedelta
+from app.services import StoreService as Store
+from app.tareas import Cron, Programador, programar_mantenimiento
+
+try:
+    from fastapi.testclient import TestClient
+    from web.server import app
+except ImportError:  # pragma: no cover - depende del entorno
+    TestClient = None
+
+
+class TestCron(unittest.TestCase):
+    def test_diario(self):
+        c = Cron("30 3 * * *")
+        self.assertEqual(c.siguiente(datetime(2025, 1, 1, 4, 0)), datetime(2025, 1, 2, 3, 30))
+        self.assertEqual(c.siguiente(datetime(2025, 1, 1, 3, 29, 59)), datetime(2025, 1, 1, 3, 30))
+        # Estrictamente después: en el mismo minuto pasa al día siguiente
+        self.assertEqual(c.siguiente(datetime(2025, 1, 1, 3, 30)), datetime(2025, 1, 2, 3, 30))
+
+    def test_pasos_listas_y_fin_de_anio(self):
+        self.assertEqual(Cron("*/15 * * * *").siguiente(datetime(2025, 1, 1, 10, 16)),
+                         datetime(2025, 1, 1, 10, 30))
+        self.assertEqual(Cron("0 8,18 * * *").siguiente(datetime(2025, 1, 1, 9, 0)),
+                         datetime(2025, 1, 1, 18, 0))
+        self.assertEqual(Cron("0 0 1 1 *").siguiente(datetime(2025, 6, 1)), datetime(2026, 1, 1))
+
+    def test_dia_de_semana(self):
+        # 2025-01-01 es miércoles; lunes = 1, domingo = 0 o 7
+        self.assertEqual(Cron("0 9 * * 1").siguiente(datetime(2025, 1, 1)), datetime(2025, 1, 6, 9, 0))
+        self.assertEqual(Cron("0 9 * * 7").siguiente(datetime(2025, 1, 1)), datetime(2025, 1, 5, 9, 0))
+        # Día y día de semana restringidos: alcanza con uno (como cron)
+        self.assertEqual(Cron("0 0 15 * 1").siguiente(datetime(2025, 1, 1)), datetime(2025, 1, 6))
+
+    def test_invalidos(self):
+        for expr in ("* * * *", "60 * * * *", "* * 0 * *", "*/0 * * * *", "a * * * *", "0 0 31 2 *"):
+            with self.assertRaises(ValueError, msg=expr):
+                Cron(expr).siguiente(datetime(2025, 1, 1))
+
+
+class TestProgramador(unittest.TestCase):
+    def test_intervalo_y_metricas(self):
+        llamadas = []
+
+        async def correr():
+            prog = Programador()
+            prog.cada("x", 0.01, lambda: llamadas.append(1) or len(llamadas))
+            await prog.iniciar()
+            await asyncio.sleep(0.15)
+            await prog.detener()
+            return prog.estadisticas()["x"]
+
+        st = asyncio.run(correr())
+        self.assertGreaterEqual(len(llamadas), 3)
+        self.assertEqual(st["ejecuciones"], len(llamadas))
+        self.assertEqual(st["ultimo_resultado"], len(llamadas))
+        self.assertEqual(st["programa"], "cada 0.01s")
+        self.assertIsNotNone(st["max_ms"])
+        self.assertIsNone(st["proxima"])
+
+    def test_sin_superposicion(self):
+        activas, maximo = [0], [0]
+        lock = threading.Lock()
+
+        def lenta():
+            with lock:
+                activas[0] += 1
+                maximo[0] = max(maximo[0], activas[0])
+            time.sleep(0.05)
+            with lock:
+                activas[0] -= 1
+
+        async def correr():
+            prog = Programador()
+            prog.cada("lenta", 0.01, lenta)
+            await prog.iniciar()
+            await asyncio.sleep(0.03)
+            self.assertFalse(await prog.ejecutar("lenta"))  # ya está corriendo: se omite
+            await asyncio.sleep(0.15)
+            await prog.detener()
+            return prog.estadisticas()["lenta"]
+
+        st = asyncio.run(correr())
+        self.assertEqual(maximo[0], 1)
+        self.assertGreater(st["omitidas"], 1)
+
+    def test_fallo_no_corta_el_bucle(self):
+        def falla():
+            raise RuntimeError("sin disco")
+
+        async def correr():
+            prog = Programador()
+            prog.cada("falla", 0.01, falla)
+            await prog.iniciar()
+            await asyncio.sleep(0.08)
+            await prog.detener()
+            return prog.estadisticas()["falla"]
+
+        st = asyncio.run(correr())
+        self.assertGreaterEqual(st["fallos"], 2)
+        self.assertEqual(st["fallos"], st["ejecuciones"])
+        self.assertEqual(st["ultimo_error"], "RuntimeError: sin disco")
+
+    def test_apagado_espera_y_vacia_pendientes(self):
+        eventos = []
+
+        def lenta():
+            time.sleep(0.1)
+            eventos.append("lenta")
+
+        async def correr():
+            prog = Programador()
+            prog.cada("lenta", 0.01, lenta)
+            prog.cada("guardar", 3600, lambda: eventos.append("guardar"), al_apagar=True)
+            await prog.iniciar()
+            await asyncio.sleep(0.05)   # "lenta" está a mitad de camino
+            await prog.detener()
+
+        asyncio.run(correr())
+        # Esperó a la que corría y después corrió la de apagado (una sola vez)
+        self.assertEqual(eventos, ["lenta", "guardar"])
+
+    def test_nombre_repetido(self):
+        prog = Programador()
+        prog.cada("x", 1, lambda: None)
+        with self.assertRaises(ValueError):
+            prog.cron("x", "* * * * *", lambda: None)
+        with self.assertRaises(ValueError):
+            prog.cada("y", 0, lambda: None)
+
+
+class TestMantenimiento(unittest.TestCase):
+    def setUp(self):
+        self.s = Store()
+        self.ll = self.s.registrar_llanta("L-1", "X", "Sport", "205/55 R16", 100)
+        self.s.ajustar_inventario(self.ll.id, delta=10, umbral_minimo=3)
+        self.c = self.s.registrar_cliente("Ana", "1")
+        self.a = self.s.registrar_asesor("Luis", "2")
+
+    def test_tareas_estandar(self):
+        prog = programar_mantenimiento(Programador(), self.s)
+        self.assertEqual(set(prog.tareas), {"vencimientos", "reportes", "bajo_stock"})
+
+        async def correr():
+            await prog.ejecutar("bajo_stock")
+            primero = prog.tareas["bajo_stock"].ultimo_resultado
+            self.s.registrar_venta(self.c.id, self.a.id, [(self.ll.id, 7)])
+            await prog.ejecutar("bajo_stock")
+            await prog.ejecutar("reportes")
+            return primero, prog.tareas["bajo_stock"].ultimo_resultado
+
+        primero, segundo = asyncio.run(correr())
+        self.assertEqual(primero, {"alertas": 0, "nuevas": [], "resueltas": 0})
+        self.assertEqual(segundo["alertas"], 1)
+        self.assertEqual(segundo["nuevas"][0]["sku"], "L-1")
+        self.assertEqual(prog.tareas["reportes"].ultimo_resultado, {"filas": 1})
+
+    def test_vencimientos(self):
+        r = self.s.reservar_stock(self.ll.id, 2, ttl_segundos=60, ahora=datetime.now() - timedelta(hours=1))
+        prog = programar_mantenimiento(Programador(), self.s)
+        asyncio.run(prog.ejecutar("vencimientos"))
+        self.assertEqual(prog.tareas["vencimientos"].ultimo_resultado, {"reservas": 1, "cotizaciones": 0})
+        self.assertEqual(self.s.inventarios.get(self.ll.id).cantidad_reservada, 0)
+        self.assertNotEqual(self.s.reservas.get(r.id).estado, "activa")
+
+
+@unittest.skipIf(TestClient is None, "fastapi no instalado")
+class TestTareasWeb(unittest.TestCase):
+    def test_lifespan_programa_tareas(self):
+        with TestClient(app) as http:
+            tareas = http.get("/api/tareas").json()
+            self.assertIn("vencimientos", tareas)
+            self.assertEqual(tareas["bajo_stock"]["programa"], "cada 3600s")
+            self.assertEqual(http.get("/api/lookup/L-205-55R16").status_code, 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
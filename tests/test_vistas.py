@@ -0,0 +1,109 @@
+import threading
+import unittest
+from datetime import datetime, timedelta
+from decimal import Decimal
+from app.kardex import AJUSTE
+from app.services import StoreService as Store
+
+class TestVistasCopyOnWrite(unittest.TestCase):
+    def setUp(self):
+        s = self.store = Store()
+        self.ll1 = s.registrar_llanta("L-205-55R16", "X", "Sport", "205/55 R16", 120)
+        s.ajustar_inventario(self.ll1.id, delta=15, umbral_minimo=5)
+        self.cl = s.registrar_cliente("María López", "12345678")
+        self.asr = s.registrar_asesor("Carlos Pérez", "87654321")
+        self.v1 = s.registrar_venta(self.cl.id, self.asr.id, [(self.ll1.id, 2)])
+
+    def test_vista_no_ve_escrituras_posteriores(self):
+        snap = self.store.snapshot()
+        self.store.registrar_venta(self.cl.id, self.asr.id, [(self.ll1.id, 3)])
+        self.store.actualizar_precio_llanta(self.ll1.id, 150)
+        self.store.reservar_stock(self.ll1.id, 4)
+        self.store.registrar_llanta("L-195-65R15", "Y", "City", "195/65 R15", 90)
+
+        self.assertEqual(len(snap.listar_ventas()), 1)
+        self.assertIsNone(snap.ventas.get(2))
+        self.assertEqual(snap.inventarios.get(self.ll1.id).cantidad_disponible, 13)
+        self.assertEqual(snap.consultar_inventario()[0]["reservado"], 0)
+        self.assertEqual(snap.llantas.get(self.ll1.id).precio_venta, Decimal("120.00"))
+        self.assertEqual(len(snap.llantas.list()), 1)
+        self.assertEqual(snap.disponibilidad(self.ll1.id)["total"], 13)
+        # El store vivo sí ve todo
+        self.assertEqual(self.store.inventarios.get(self.ll1.id).cantidad_disponible, 10)
+        self.assertEqual(self.store.llantas.get(self.ll1.id).precio_venta, Decimal("150.00"))
+
+    def test_vista_se_reutiliza_sin_cambios(self):
+        a = self.store.snapshot()
+        self.assertIs(self.store.snapshot(), a)
+        self.store.ajustar_inventario(self.ll1.id, delta=1)
+        b = self.store.snapshot()
+        self.assertIsNot(b, a)
+        self.assertEqual(b.inventarios.get(self.ll1.id).cantidad_disponible, 14)
+        self.assertEqual(a.inventarios.get(self.ll1.id).cantidad_disponible, 13)
+
+    def test_escritura_copia_solo_la_clave(self):
+        ll2 = self.store.registrar_llanta("L-195-65R15", "Y", "City", "195/65 R15", 90)
+        self.store.ajustar_inventario(ll2.id, delta=5, umbral_minimo=1)
+        inv = self.store.inventarios
+        by_key, por_sede_ll2 = inv._by_key, inv._by_llanta[ll2.id]
+        snap = self.store.snapshot()
+        self.store.registrar_venta(self.cl.id, self.asr.id, [(self.ll1.id, 1)])
+        # Los dicts siguen siendo los mismos; solo la fila vendida se clonó
+        self.assertIs(inv._by_key, by_key)
+        self.assertIs(inv._by_llanta[ll2.id], por_sede_ll2)
+        self.assertIs(inv.get(ll2.id), snap.inventarios.get(ll2.id))
+        self.assertIsNot(inv.get(self.ll1.id), snap.inventarios.get(self.ll1.id))
+        self.assertEqual(snap.inventarios.total(self.ll1.id), 13)
+        self.assertEqual(len(snap.inventarios.list()), 2)
+
+    def test_vistas_de_distintos_momentos(self):
+        a = self.store.snapshot()
+        self.store.ajustar_inventario(self.ll1.id, delta=1)
+        b = self.store.snapshot()
+        self.store.ajustar_inventario(self.ll1.id, delta=1)
+        self.store.registrar_llanta("L-195-65R15", "Y", "City", "195/65 R15", 90)
+        self.assertEqual(a.inventarios.get(self.ll1.id).cantidad_disponible, 13)
+        self.assertEqual(b.inventarios.get(self.ll1.id).cantidad_disponible, 14)
+        self.assertEqual(self.store.inventarios.get(self.ll1.id).cantidad_disponible, 15)
+        self.assertEqual((len(a.llantas), len(b.llantas), len(self.store.llantas)), (1, 1, 2))
+
+    def test_kardex_reorden_y_comisiones_congelados(self):
+        snap = self.store.snapshot()
+        futuro = datetime.now() + timedelta(days=1)
+        lineas = list(snap.kardex_csv())
+        sugerencias = snap.sugerencias_reorden(solo_necesarias=False)
+        liquidacion = snap.liquidacion_comisiones()
+        self.store.registrar_venta(self.cl.id, self.asr.id, [(self.ll1.id, 5)])
+        # Un movimiento con fecha anterior reemplaza la serie sin tocar la de la vista
+        self.store.kardex.registrar(1, self.ll1.id, AJUSTE, 100, fecha=datetime(2020, 1, 1))
+
+        self.assertEqual(snap.stock_a_fecha(self.ll1.id, futuro), 13)
+        self.assertEqual(list(snap.kardex_csv()), lineas)
+        self.assertEqual(snap.sugerencias_reorden(solo_necesarias=False), sugerencias)
+        self.assertEqual(snap.liquidacion_comisiones(), liquidacion)
+        self.assertEqual(self.store.stock_a_fecha(self.ll1.id, futuro), 108)
+        self.assertNotEqual(self.store.liquidacion_comisiones(), liquidacion)
+
+    def test_lecturas_concurrentes_con_ventas(self):
+        self.store.ajustar_inventario(self.ll1.id, delta=1000)
+        errores = []
+
+        def vender():
+            for _ in range(200):
+                self.store.registrar_venta(self.cl.id, self.asr.id, [(self.ll1.id, 1)])
+
+        def leer():
+            for _ in range(200):
+                snap = self.store.snapshot()
+                vendidas = sum(d.cantidad for _, dets in snap.listar_ventas() for d in dets)
+                # Stock y ventas de la misma vista siempre cuadran
+                if snap.inventarios.get(self.ll1.id).cantidad_disponible + vendidas != 1015:
+                    errores.append(snap.version)
+
+        hilos = [threading.Thread(target=vender), threading.Thread(target=leer)]
+        for h in hilos:
+            h.start()
+        for h in hilos:
+            h.join()
+        self.assertEqual(errores, [])
+        self.assertEqual(len(self.store.ventas), 201)
@@ -1,14 +1,112 @@
 # web/server.py
-from fastapi import FastAPI, Request, Form
-from fastapi.responses import RedirectResponse
+from fastapi import FastAPI, Request, Form, Header, HTTPException, Body
+from fastapi.responses import RedirectResponse, StreamingResponse, JSONResponse
 from fastapi.templating import Jinja2Templates
+from fastapi.routing import APIRoute
 from starlette import status
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from functools import wraps
+from urllib.parse import urlencode
+from uuid import uuid4
+import asyncio
+import os
 
 from app.services import (
-    StoreService, StockInsuficiente, DevolucionInvalida, LlantaNoEncontrada, VentaNoEncontrada
+    StoreService, StockInsuficiente, DevolucionInvalida, LlantaNoEncontrada, VentaNoEncontrada,
+    ReservaInvalida, SedeNoEncontrada, ClienteNoEncontrado, CotizacionInvalida
 )
+from app.repositories import SEDE_PRINCIPAL
+from app.perfilado import Perfilador
+from app.items import parsear_items, ItemsInvalidos
+from app.tareas import Programador, programar_mantenimiento
 
-app = FastAPI(title="Serviteca (Web mínima)")
+# -------- Tareas en segundo plano --------
+# Arrancan y se detienen con la app (lifespan). Opcionales por entorno:
+#   SERVITECA_SNAPSHOT=tienda.snap   se carga al iniciar, se guarda cada
+#                                    SERVITECA_SNAPSHOT_CADA s (600) y al apagar
+#   SERVITECA_ARCHIVO_DIR=archivo    archiva ventas de más de SERVITECA_ARCHIVO_DIAS
+#                                    (90) según SERVITECA_ARCHIVO_CRON ("30 3 * * *")
+#   SERVITECA_TAREAS=0               no programa nada
+programador: Programador | None = None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global store, programador
+    ruta = os.environ.get("SERVITECA_SNAPSHOT")
+    if ruta and os.path.exists(ruta):
+        store = StoreService.load(ruta)
+    seed_minimo()
+    if os.environ.get("SERVITECA_TAREAS", "1") == "0":
+        yield
+        return
+    programador = programar_mantenimiento(
+        Programador(),
+        store,
+        snapshot=ruta,
+        snapshot_cada=float(os.environ.get("SERVITECA_SNAPSHOT_CADA", "600")),
+        archivo=os.environ.get("SERVITECA_ARCHIVO_DIR"),
+        archivo_dias=int(os.environ.get("SERVITECA_ARCHIVO_DIAS", "90")),
+        archivo_cron=os.environ.get("SERVITECA_ARCHIVO_CRON", "30 3 * * *"),
+    )
+    await programador.iniciar()
+    try:
+        yield
+    finally:
+        await programador.detener()
+
+app = FastAPI(title="Serviteca (Web mínima)", lifespan=lifespan)
+
+# -------- Perfilado bajo demanda (opcional) --------
+# Solo con SERVITECA_PERFIL_DIR definido se instalan middleware y rutas
+# envueltas; si no, no hay ningún costo. Se perfila una fracción de las
+# solicitudes (SERVITECA_PERFIL_MUESTREO, 0..1) o las que traigan "X-Perfil: 1".
+perfilador: Perfilador | None = None
+_captura_pedida: ContextVar[str | None] = ContextVar("captura_pedida", default=None)
+
+def _envolver_endpoint(endpoint):
+    """El endpoint corre en el threadpool: el cProfile tiene que encenderse ahí."""
+    if asyncio.iscoroutinefunction(endpoint):
+        @wraps(endpoint)
+        async def envoltura_async(*args, **kwargs):
+            nombre = _captura_pedida.get()
+            if nombre is None:
+                return await endpoint(*args, **kwargs)
+            with perfilador.capturar(nombre):
+                return await endpoint(*args, **kwargs)
+        return envoltura_async
+
+    @wraps(endpoint)
+    def envoltura(*args, **kwargs):
+        nombre = _captura_pedida.get()
+        if nombre is None:
+            return endpoint(*args, **kwargs)
+        with perfilador.capturar(nombre):
+            return endpoint(*args, **kwargs)
+    return envoltura
+
+class RutaPerfilada(APIRoute):
+    def __init__(self, path, endpoint, **kwargs):
+        super().__init__(path, _envolver_endpoint(endpoint), **kwargs)
+
+if os.environ.get("SERVITECA_PERFIL_DIR"):
+    perfilador = Perfilador(
+        os.environ["SERVITECA_PERFIL_DIR"],
+        muestreo=float(os.environ.get("SERVITECA_PERFIL_MUESTREO", "0")),
+        max_capturas=int(os.environ.get("SERVITECA_PERFIL_MAX", "50")),
+    )
+    app.router.route_class = RutaPerfilada
+
+    @app.middleware("http")
+    async def perfilado(request: Request, call_next):
+        if request.headers.get("x-perfil") != "1" and not perfilador.muestrear():
+            return await call_next(request)
+        token = _captura_pedida.set(f"{request.method}-{request.url.path}")
+        try:
+            return await call_next(request)
+        finally:
+            _captura_pedida.reset(token)
 
 # Instancia única (persistencia en memoria por proceso)
 store = StoreService()
@@ -23,8 +121,6 @@ def seed_minimo():
     if not store.asesores.list():
         store.registrar_asesor("Carlos Pérez", "87654321")
 
-seed_minimo()
-
 templates = Jinja2Templates(directory="web/templates")
 
 
@@ -34,15 +130,25 @@ def root():
 
 
 # -------- Panel único --------
+PANEL_ULTIMAS = 50  # ventas y devoluciones que muestra el panel
+
 @app.get("/inventario")
 def inventario(request: Request, msg: str | None = None, error: str | None = None):
-    filas = store.consultar_inventario()
-    bajo = store.reporte_bajo_stock()
-    clientes = store.clientes.list()
-    asesores = store.asesores.list()
-    llantas = store.llantas.list()
-    ventas = store.listar_ventas()
-    devoluciones = store.listar_devoluciones()
+    # Lectura sobre una vista congelada: no bloquea ventas concurrentes
+    snap = store.snapshot()
+    filas = snap.consultar_inventario()
+    bajo = snap.reporte_bajo_stock()
+    clientes = snap.clientes.list()
+    asesores = snap.asesores.list()
+    llantas = snap.llantas.list()
+    # Solo lo más reciente: el historial completo se consulta por cliente
+    ventas = snap.ultimas_ventas(PANEL_ULTIMAS)
+    devoluciones = snap.ultimas_devoluciones(PANEL_ULTIMAS)
+    reservas = snap.listar_reservas(solo_activas=True)
+    cotizaciones = snap.listar_cotizaciones()
+    sedes = snap.sedes.list()
+    reorden = snap.sugerencias_reorden()
+    ranking = snap.ranking_asesores()
     return templates.TemplateResponse(
         "inventario.html",
         {
@@ -54,6 +160,13 @@ def inventario(request: Request, msg: str | None = None, error: str | None = Non
             "llantas": llantas,
             "ventas": ventas,
             "devoluciones": devoluciones,
+            "reservas": reservas,
+            "cotizaciones": cotizaciones,
+            "sedes": sedes,
+            "reorden": reorden,
+            "ranking": ranking,
+            # Clave nueva por render: si el POST se reintenta, se reconoce como el mismo
+            "idem_key": uuid4().hex,
             "msg": msg,
             "error": error,
         },
@@ -93,10 +206,11 @@ def ajustar_inventario(
     llanta_id: int = Form(...),
     delta: int = Form(...),
     umbral: str = Form(""),
+    sede_id: int = Form(SEDE_PRINCIPAL),
 ):
     try:
         umbral_min = int(umbral) if umbral.strip() else None
-        store.ajustar_inventario(llanta_id, delta=delta, umbral_minimo=umbral_min)
+        store.ajustar_inventario(llanta_id, delta=delta, umbral_minimo=umbral_min, sede_id=sede_id)
         return RedirectResponse("/inventario?msg=Inventario+actualizado", status_code=302)
     except Exception as e:
         return RedirectResponse(f"/inventario?error={str(e)}", status_code=302)
@@ -114,6 +228,16 @@ def crear_cliente(
     return RedirectResponse("/inventario?msg=Cliente+creado", status_code=302)
 
 
+@app.get("/clientes/historial")
+def historial_cliente(request: Request, cliente_id: int | None = None, documento: str | None = None,
+                      pagina: int = 1):
+    try:
+        hist = store.snapshot().historial_cliente(cliente_id, documento or None, pagina)
+    except ClienteNoEncontrado as e:
+        return RedirectResponse(f"/inventario?error={str(e)}", status_code=302)
+    return templates.TemplateResponse("cliente.html", {"request": request, "h": hist})
+
+
 @app.post("/asesores")
 def crear_asesor(
     nombre: str = Form(...),
@@ -130,32 +254,26 @@ def crear_venta(
     cliente_id: int = Form(...),
     asesor_id: int = Form(...),
     items_text: str = Form(...),
+    sede_id: int = Form(SEDE_PRINCIPAL),
+    idempotency_key: str = Form(""),
+    idempotency_header: str | None = Header(None, alias="Idempotency-Key"),
 ):
     """
-    items_text formato: "1x2,3x1" -> [(1,2), (3,1)]
+    items_text formato: "1x2,3x1" -> [(1,2), (3,1)] (ver app/items.py)
+    Clave de idempotencia opcional (header Idempotency-Key o campo del form):
+    un reintento con la misma clave no vuelve a descontar stock.
     """
     try:
-        items = []
-        raw = items_text.strip()
-        if not raw:
-            return RedirectResponse("/inventario?error=No+hay+items", status_code=302)
-        for parte in raw.split(","):
-            parte = parte.strip()
-            if not parte:
-                continue
-            if "x" not in parte.lower():
-                return RedirectResponse("/inventario?error=Formato+de+items+invalido", status_code=302)
-            a, b = parte.lower().split("x", 1)
-            ll_id = int(a.strip())
-            cant = int(b.strip())
-            items.append((ll_id, cant))
-
-        store.registrar_venta(cliente_id, asesor_id, items)
+        items = parsear_items(items_text)
+        clave = idempotency_header or idempotency_key or None
+        store.registrar_venta(cliente_id, asesor_id, items, sede_id=sede_id, clave_idempotencia=clave)
         return RedirectResponse("/inventario?msg=Venta+registrada", status_code=302)
 
+    except ItemsInvalidos as e:
+        return RedirectResponse("/inventario?" + urlencode({"error": f"Ítems: {e}"}), status_code=302)
     except StockInsuficiente as e:
         return RedirectResponse(f"/inventario?error=Stock+insuficiente:+{str(e)}", status_code=302)
-    except LlantaNoEncontrada as e:
+    except (LlantaNoEncontrada, SedeNoEncontrada) as e:
         return RedirectResponse(f"/inventario?error={str(e)}", status_code=302)
     except Exception as e:
         return RedirectResponse(f"/inventario?error=Error:+{str(e)}", status_code=302)
@@ -167,30 +285,247 @@ def crear_devolucion(
     venta_id: int = Form(...),
     items_text: str = Form(...),
     motivo: str = Form(...),
+    idempotency_key: str = Form(""),
+    idempotency_header: str | None = Header(None, alias="Idempotency-Key"),
 ):
     """
-    items_text formato: "1x2,3x1" -> [(1,2), (3,1)]
+    items_text formato: "1x2,3x1" -> [(1,2), (3,1)] (ver app/items.py)
     """
     try:
-        items = []
-        raw = items_text.strip()
-        if not raw:
-            return RedirectResponse("/inventario?error=No+hay+items+en+devolucion", status_code=302)
-        for parte in raw.split(","):
-            parte = parte.strip()
-            if not parte:
-                continue
-            if "x" not in parte.lower():
-                return RedirectResponse("/inventario?error=Formato+de+items+invalido+(devolucion)", status_code=302)
-            a, b = parte.lower().split("x", 1)
-            ll_id = int(a.strip())
-            cant = int(b.strip())
-            items.append((ll_id, cant))
-
-        store.registrar_devolucion(venta_id, items, motivo)
+        items = parsear_items(items_text)
+        clave = idempotency_header or idempotency_key or None
+        store.registrar_devolucion(venta_id, items, motivo, clave_idempotencia=clave)
         return RedirectResponse("/inventario?msg=Devolucion+registrada", status_code=302)
 
+    except ItemsInvalidos as e:
+        return RedirectResponse("/inventario?" + urlencode({"error": f"Ítems (devolución): {e}"}), status_code=302)
     except (DevolucionInvalida, VentaNoEncontrada) as e:
         return RedirectResponse(f"/inventario?error={str(e)}", status_code=302)
     except Exception as e:
         return RedirectResponse(f"/inventario?error=Error:+{str(e)}", status_code=302)
+
+
+# -------- Reservas --------
+@app.post("/reservas")
+def crear_reserva(
+    llanta_id: int = Form(...),
+    cantidad: int = Form(...),
+    minutos: int = Form(15),
+    sede_id: int = Form(SEDE_PRINCIPAL),
+):
+    try:
+        r = store.reservar_stock(llanta_id, cantidad, ttl_segundos=minutos * 60, sede_id=sede_id)
+        return RedirectResponse(f"/inventario?msg=Reserva+{r.id}+creada", status_code=302)
+    except StockInsuficiente as e:
+        return RedirectResponse(f"/inventario?error=Stock+insuficiente:+{str(e)}", status_code=302)
+    except (ReservaInvalida, SedeNoEncontrada) as e:
+        return RedirectResponse(f"/inventario?error={str(e)}", status_code=302)
+
+
+@app.post("/reservas/liberar")
+def liberar_reserva(reserva_id: int = Form(...)):
+    try:
+        store.liberar_reserva(reserva_id)
+        return RedirectResponse("/inventario?msg=Reserva+liberada", status_code=302)
+    except ReservaInvalida as e:
+        return RedirectResponse(f"/inventario?error={str(e)}", status_code=302)
+
+
+@app.post("/reservas/convertir")
+def convertir_reservas(
+    reserva_ids: str = Form(...),
+    cliente_id: int = Form(...),
+    asesor_id: int = Form(...),
+):
+    """
+    reserva_ids formato: "1,2,3"
+    """
+    try:
+        ids = [int(x) for x in reserva_ids.split(",") if x.strip()]
+        store.convertir_reservas(ids, cliente_id, asesor_id)
+        return RedirectResponse("/inventario?msg=Venta+registrada+desde+reservas", status_code=302)
+    except (ReservaInvalida, StockInsuficiente) as e:
+        return RedirectResponse(f"/inventario?error={str(e)}", status_code=302)
+    except Exception as e:
+        return RedirectResponse(f"/inventario?error=Error:+{str(e)}", status_code=302)
+
+
+# -------- Cotizaciones --------
+@app.post("/cotizaciones")
+def crear_cotizacion(
+    cliente_id: int = Form(...),
+    asesor_id: int = Form(...),
+    items_text: str = Form(...),
+    dias: int = Form(15),
+    sede_id: int = Form(SEDE_PRINCIPAL),
+):
+    """
+    items_text formato: "1x4,3x1" (ver app/items.py). Precios del momento, válidos `dias` días.
+    """
+    try:
+        c = store.cotizar(cliente_id, asesor_id, parsear_items(items_text), dias_validez=dias, sede_id=sede_id)
+        return RedirectResponse(f"/inventario?msg=Cotizacion+{c.id}+creada:+total+{c.total}", status_code=302)
+    except ItemsInvalidos as e:
+        return RedirectResponse("/inventario?" + urlencode({"error": f"Ítems (cotización): {e}"}), status_code=302)
+    except (CotizacionInvalida, LlantaNoEncontrada, SedeNoEncontrada) as e:
+        return RedirectResponse(f"/inventario?error={str(e)}", status_code=302)
+    except Exception as e:
+        return RedirectResponse(f"/inventario?error=Error:+{str(e)}", status_code=302)
+
+
+@app.post("/cotizaciones/convertir")
+def convertir_cotizacion(cotizacion_id: int = Form(...), asesor_id: int | None = Form(None)):
+    try:
+        v = store.convertir_cotizacion(cotizacion_id, asesor_id)
+        return RedirectResponse(f"/inventario?msg=Venta+{v.id}+registrada+desde+cotizacion", status_code=302)
+    except StockInsuficiente as e:
+        return RedirectResponse(f"/inventario?error=Stock+insuficiente:+{str(e)}", status_code=302)
+    except CotizacionInvalida as e:
+        return RedirectResponse(f"/inventario?error={str(e)}", status_code=302)
+    except Exception as e:
+        return RedirectResponse(f"/inventario?error=Error:+{str(e)}", status_code=302)
+
+
+@app.post("/cotizaciones/anular")
+def anular_cotizacion(cotizacion_id: int = Form(...)):
+    try:
+        store.anular_cotizacion(cotizacion_id)
+        return RedirectResponse("/inventario?msg=Cotizacion+anulada", status_code=302)
+    except CotizacionInvalida as e:
+        return RedirectResponse(f"/inventario?error={str(e)}", status_code=302)
+
+
+# -------- Sedes --------
+@app.post("/sedes")
+def crear_sede(
+    nombre: str = Form(...),
+    direccion: str = Form(""),
+):
+    store.registrar_sede(nombre, direccion or None)
+    return RedirectResponse("/inventario?msg=Sede+creada", status_code=302)
+
+
+@app.post("/inventario/transferir")
+def transferir_stock(
+    llanta_id: int = Form(...),
+    sede_origen: int = Form(...),
+    sede_destino: int = Form(...),
+    cantidad: int = Form(...),
+):
+    try:
+        store.transferir_stock(llanta_id, sede_origen, sede_destino, cantidad)
+        return RedirectResponse("/inventario?msg=Transferencia+realizada", status_code=302)
+    except StockInsuficiente as e:
+        return RedirectResponse(f"/inventario?error=Stock+insuficiente:+{str(e)}", status_code=302)
+    except Exception as e:
+        return RedirectResponse(f"/inventario?error={str(e)}", status_code=302)
+
+
+@app.get("/api/disponibilidad/{llanta_id}")
+def api_disponibilidad(llanta_id: int, cantidad: int | None = None):
+    """
+    Stock por sede de una llanta. Con ?cantidad=N solo devuelve las sedes que
+    pueden vender N unidades (p. ej. "¿qué sede tiene 4 de 205/55 R16?").
+    """
+    try:
+        disp = store.snapshot().disponibilidad(llanta_id)
+    except LlantaNoEncontrada as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    if cantidad is not None:
+        disp["sedes"] = [s for s in disp["sedes"] if s["disponible"] >= cantidad]
+    return disp
+
+
+# -------- Kardex --------
+@app.get("/kardex.csv")
+def kardex_csv(llanta_id: int | None = None):
+    """Exporta el kardex en streaming (todas las llantas o solo ?llanta_id=N)."""
+    return StreamingResponse(
+        store.snapshot().kardex_csv(llanta_id),
+        media_type="text/csv",
+        headers={"Content-Disposition": "attachment; filename=kardex.csv"},
+    )
+
+
+# -------- Consulta rápida del POS --------
+MAX_LOTE_LOOKUP = 500
+
+
+def _precio_stock_json(reg) -> dict:
+    # Dict armado a mano: evita el recorrido genérico de jsonable_encoder por dataclass
+    return {
+        "llanta_id": reg.llanta_id,
+        "sku": reg.sku,
+        "marca": reg.marca,
+        "modelo": reg.modelo,
+        "medida": reg.medida,
+        "precio": float(reg.precio),
+        "stock": reg.stock,
+        "disponible": reg.disponible,
+        "sedes": [{"sede_id": s, "disponible": d} for s, d in reg.por_sede],
+    }
+
+
+@app.get("/api/lookup/{sku}")
+def api_lookup(sku: str):
+    """Precio y stock de una llanta por sku (cache de lectura, sin tocar el lock del store)."""
+    try:
+        return JSONResponse(_precio_stock_json(store.precio_stock(sku)))
+    except LlantaNoEncontrada as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@app.post("/api/lookup")
+def api_lookup_lote(skus: list[str] = Body(..., embed=True)):
+    """Lote: {"skus": [...]} (hasta MAX_LOTE_LOOKUP) -> {encontrados: {sku: ...}, faltantes: [...]}."""
+    if len(skus) > MAX_LOTE_LOOKUP:
+        raise HTTPException(status_code=400, detail=f"Máximo {MAX_LOTE_LOOKUP} skus por consulta")
+    encontrados, faltantes = store.precio_stock_lote(skus)
+    return JSONResponse({
+        "encontrados": {sku: _precio_stock_json(reg) for sku, reg in encontrados.items()},
+        "faltantes": faltantes,
+    })
+
+
+@app.get("/api/kardex/{llanta_id}/stock")
+def api_stock_a_fecha(llanta_id: int, fecha: datetime, sede_id: int | None = None):
+    try:
+        cantidad = store.snapshot().stock_a_fecha(llanta_id, fecha, sede_id)
+    except LlantaNoEncontrada as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {"llanta_id": llanta_id, "fecha": fecha, "sede_id": sede_id, "cantidad": cantidad}
+
+
+# -------- Consultas (API) --------
+@app.get("/api/clientes/historial")
+def api_historial_cliente(cliente_id: int | None = None, documento: str | None = None,
+                          pagina: int = 1, por_pagina: int = 20):
+    """Compras de un cliente (por id o documento), paginadas, para reclamos de garantía."""
+    try:
+        return store.snapshot().historial_cliente(cliente_id, documento, pagina, por_pagina)
+    except ClienteNoEncontrado as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@app.get("/api/cotizaciones")
+def api_cotizaciones(cliente_id: int | None = None, solo_vigentes: bool = True):
+    """Cotizaciones vigentes (o todas) con sus líneas y precios cotizados."""
+    return store.snapshot().listar_cotizaciones(solo_vigentes, cliente_id)
+
+
+@app.get("/api/comisiones")
+def api_comisiones(periodo: str | None = None):
+    """Liquidación de comisiones del período (AAAA-MM; por defecto el mes actual)."""
+    return store.snapshot().liquidacion_comisiones(periodo)
+
+
+# -------- Estadísticas --------
+@app.get("/api/stats")
+def api_stats():
+    return store.estadisticas()
+
+
+@app.get("/api/tareas")
+def api_tareas():
+    """Métricas de las tareas en segundo plano (ejecuciones, duración, omitidas, errores)."""
+    return programador.estadisticas() if programador is not None else {}